@@ -6,14 +6,14 @@ from dotenv import load_dotenv
 
 import click
 from csef.session import SessionManager
-from csef.pipeline import PipelineStorageManager, PipelineManager
 from csef.utils.helper import load_config
 
-from csef.data.preprocessing import preprocess_raw_data
-
 
 load_dotenv('.env')
 
+# The pipeline and the data modules are imported by the commands using them,
+# so the other commands start without importing the cloud clients and the ML libraries
+
 
 @click.group()
 @click.option(
@@ -35,6 +35,8 @@ def do_something():
 
 @pip_cli.command(name='preprocessing')
 def preprocessing():
+    from csef.data.preprocessing import preprocess_raw_data
+
     print('perform preprocessing pipeline')
     preprocess_raw_data()
 
@@ -58,6 +60,8 @@ def preprocessing():
 )
 @click.pass_obj
 def pip_upload_data(ctx, data_version, data_tag, compress):
+    from csef.pipeline import PipelineStorageManager
+
     PipelineStorageManager().upload_data_files(data_version, data_tag, compress)
 
 
@@ -68,8 +72,26 @@ def pip_upload_data(ctx, data_version, data_tag, compress):
     required=True,
     help='The path to config file need to be processed'
 )
+@click.option(
+    '-refresh-cache/-no-refresh-cache', '--refresh-cache/--no-refresh-cache',
+    help='Execute all blocks again instead of loading their cached outputs',
+    default=False
+)
+@click.option(
+    '-r', '--resume',
+    default=None,
+    help='The session id of a failed session to resume from its last completed block'
+)
+@click.option(
+    '-rs', '--result-store',
+    type=click.Choice(['datastore', 'sqlite']),
+    default='datastore',
+    help='The backend storing the results and the logs of the session'
+)
 @click.pass_obj
 def pip_run(ctx, **kwargs):
+    from csef.pipeline import PipelineManager
+
     # Set the environment variable for the process running on the cloud
     proj_home = os.path.dirname(os.path.realpath(__file__))
     gcloud_creds_path = os.path.join(proj_home, '../gcloud-creds.json')
@@ -96,5 +118,31 @@ def pip_run(ctx, **kwargs):
         .finish()
 
 
+@pip_cli.command(name='profile-report')
+@click.option(
+    '-s', '--session-id',
+    multiple=True,
+    required=True,
+    help='The session id to report, repeat it to compare sessions'
+)
+def pip_profile_report(session_id):
+    """Compare the profile of the blocks between sessions"""
+    from tabulate import tabulate
+    from csef.pipeline import PipelineStorageManager, PipelineRecorder
+    from csef.pipeline.profiling import build_profile_report
+
+    block_stats_by_session = {}
+    for sid in session_id:
+        try:
+            block_stats_by_session[sid] = PipelineRecorder().load_stats('block_stats', sid)
+        except KeyError:
+            # Download the session files if they are not in local
+            PipelineStorageManager().sync_training_files(sid)
+            block_stats_by_session[sid] = PipelineRecorder().load_stats('block_stats', sid)
+
+    report = build_profile_report(block_stats_by_session)
+    print(tabulate(report, headers='keys', floatfmt='.2f'))
+
+
 def main():
     pip_cli()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Columnar on-disk cache of the parsed raw data files."""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from csef.utils.helper import md5sum
+
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def _compact_values(values):
+    """
+    Convert the values of a column to a compact dtype which can be memory-mapped
+    :param values: The numpy array of the column
+    :return: The tuple of (compact values, null mask or None)
+    """
+    kind = values.dtype.kind
+
+    if kind in 'iu':
+        info = np.iinfo(np.int32)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(np.int32), None
+    elif kind == 'f':
+        return values.astype(np.float32), None
+    elif kind == 'M':
+        return values.astype('datetime64[ns]'), None
+    elif kind == 'O':
+        # Strings are stored with a fixed width, the missing values are kept in a separated mask
+        null_mask = pd.isnull(values)
+        values = np.where(null_mask, '', values).astype(str)
+        return values, (null_mask if null_mask.any() else None)
+
+    return values, None
+
+
+def write_table(df, cache_dir):
+    """
+    Write a DataFrame to the cache folder, one `.npy` file per column plus a small JSON manifest
+    :param df: The DataFrame
+    :param cache_dir: The folder of the table, it's created atomically
+    """
+    parent_dir = os.path.dirname(cache_dir)
+    if not os.path.isdir(parent_dir):
+        os.makedirs(parent_dir)
+
+    tmp_dir = tempfile.mkdtemp(dir=parent_dir)
+
+    manifest = {
+        'index_name': df.index.name,
+        'columns': []
+    }
+
+    columns = [('__index__', df.index.values)] + [(name, df[name].values) for name in df.columns]
+
+    for i, (name, values) in enumerate(columns):
+        values, null_mask = _compact_values(values)
+        file_name = 'col{}.npy'.format(i)
+        np.save(os.path.join(tmp_dir, file_name), values)
+
+        column = {
+            'name': name,
+            'file': file_name,
+            'is_object': null_mask is not None or values.dtype.kind == 'U'
+        }
+
+        if null_mask is not None:
+            column['null_file'] = 'col{}.null.npy'.format(i)
+            np.save(os.path.join(tmp_dir, column['null_file']), null_mask)
+
+        manifest['columns'].append(column)
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.rename(tmp_dir, cache_dir)
+
+
+def read_columns(cache_dir, columns=None, mmap_mode='r'):
+    """
+    Read the columns of a cached table as memory-mapped arrays, nothing is loaded until it's used
+    :param cache_dir: The folder of the table
+    :param columns: The list of column names need to read. Default is all columns
+    :param mmap_mode: The memory-map mode passed to `np.load`
+    :return: The tuple of (manifest, dict of column name to array)
+    """
+    with open(os.path.join(cache_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    arrays = {}
+
+    for column in manifest['columns']:
+        if columns is not None and column['name'] not in columns and column['name'] != '__index__':
+            continue
+
+        values = np.load(os.path.join(cache_dir, column['file']), mmap_mode=mmap_mode)
+
+        if column['is_object']:
+            values = values.astype(object)
+            if 'null_file' in column:
+                values[np.load(os.path.join(cache_dir, column['null_file']))] = np.nan
+
+        arrays[column['name']] = values
+
+    return manifest, arrays
+
+
+def read_table(cache_dir, columns=None):
+    """
+    Read a cached table back to a DataFrame
+    :param cache_dir: The folder of the table
+    :param columns: The list of column names need to read. Default is all columns
+    :return: The DataFrame
+    """
+    manifest, arrays = read_columns(cache_dir, columns)
+
+    index = pd.Index(arrays.pop('__index__'), name=manifest['index_name'])
+    names = [column['name'] for column in manifest['columns'] if column['name'] in arrays]
+
+    return pd.DataFrame({name: arrays[name] for name in names}, index=index, columns=names)
+
+
+def get_table_cache_dir(file_path, cache_path):
+    """
+    Get the cache folder of a source file, keyed by the md5 sum of the file so any change of the
+    source file leads to a new folder
+    :param file_path: The path to the source file
+    :param cache_path: The root folder of the cache
+    :return: The cache folder of the table
+    """
+    table_name = os.path.splitext(os.path.basename(str(file_path)))[0]
+    return os.path.join(str(cache_path), '{}-{}'.format(table_name, md5sum(str(file_path))))
+
+
+def load_csv(file_path, cache_path, **read_csv_kwargs):
+    """
+    Load a CSV file through the cache. The file is parsed and cached at the first load,
+    the next loads read the cached columns.
+    :param file_path: The path to the CSV file
+    :param cache_path: The root folder of the cache
+    :param read_csv_kwargs: The params passed to `pd.read_csv` when the file is parsed
+    :return: The DataFrame
+    """
+    cache_dir = get_table_cache_dir(file_path, cache_path)
+
+    if not os.path.isfile(os.path.join(cache_dir, MANIFEST_FILE)):
+        write_table(pd.read_csv(file_path, **read_csv_kwargs), cache_dir)
+
+        # Remove the outdated versions of this table
+        prefix = os.path.basename(cache_dir).rsplit('-', 1)[0] + '-'
+        for name in os.listdir(str(cache_path)):
+            path = os.path.join(str(cache_path), name)
+            if name.startswith(prefix) and path != cache_dir and os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+                shutil.rmtree(path)
+
+    return read_table(cache_dir)
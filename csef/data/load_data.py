@@ -3,27 +3,45 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
-
-def load_data(data_path=None):
-
+from csef.data import cache
+
+
+RAW_TABLES = {
+    'consumption_train': {'index_col': 0, 'parse_dates': ['timestamp']},
+    'cold_start_test': {'index_col': 0, 'parse_dates': ['timestamp']},
+    'submission_format': {'index_col': 'pred_id', 'parse_dates': ['timestamp']},
+    'meta': {'index_col': 0}
+}
+
+
+def load_data(data_path=None, use_cache=True, cache_path=None):
+    """
+    Load the raw data files. The parsed files are cached in a columnar format, keyed by
+    the md5 sum of each file, so the next loads don't need to parse the CSV files again.
+    :param data_path: The folder of the raw data
+    :param use_cache: Use the cache of the parsed files or not
+    :param cache_path: The folder of the cache. Default is `data/interim/raw-cache`
+    :return: The dict of DataFrames
+    """
     if not data_path:
         data_path = Path('..', '..', 'data', 'raw')
 
-    consumption_train = pd.read_csv(data_path / 'consumption_train.csv',
-                                    index_col=0, parse_dates=['timestamp'])
-    cold_start_test = pd.read_csv(data_path / 'cold_start_test.csv',
-                                  index_col=0, parse_dates=['timestamp'])
-    submission_format = pd.read_csv(data_path / 'submission_format.csv',
-                                    index_col='pred_id',
-                                    parse_dates=['timestamp'])
-    meta = pd.read_csv(data_path / 'meta.csv', index_col=0)
+    data_path = Path(data_path)
+
+    if not cache_path:
+        cache_path = data_path.parent / 'interim' / 'raw-cache'
+
+    data = {}
+
+    for table_name, read_csv_kwargs in RAW_TABLES.items():
+        file_path = data_path / '{}.csv'.format(table_name)
 
-    return {
-        'consumption_train': consumption_train,
-        'cold_start_test': cold_start_test,
-        'submission_format': submission_format,
-        'meta': meta
-    }
+        if use_cache:
+            data[table_name] = cache.load_csv(file_path, cache_path, **read_csv_kwargs)
+        else:
+            data[table_name] = pd.read_csv(file_path, **read_csv_kwargs)
+
+    return data
 
 
 def sampling_data(df, frac=0.01, RANDOM_SEED=2018):
@@ -37,22 +55,56 @@ def sampling_data(df, frac=0.01, RANDOM_SEED=2018):
     return df[df.series_id.isin(training_series)]
 
 
-def train_test_split(df, n_test=24, group_col='series_id'):
-    df = df.copy()
-
-    train_df = pd.DataFrame()
-    test_df = pd.DataFrame()
+def _get_group_positions(df, group_col):
+    """
+    Get the position of each row inside its group and the size of its group
+    :param df: The DataFrame
+    :param group_col: The group column
+    :return: The tuple of (positions, group sizes) as numpy arrays
+    """
+    grouped = df.groupby(group_col, sort=False)
+    positions = grouped.cumcount().values
+    sizes = grouped[group_col].transform('size').values
 
-    for ser_id, ser_data in df.groupby(group_col):
-        split_train, split_test = ser_data[:-n_test], ser_data[-n_test:]
+    return positions, sizes
 
-        split_train[group_col] = ser_id
-        split_test[group_col] = ser_id
 
-        train_df = train_df.append(split_train)
-        test_df = test_df.append(split_test)
-
-    return train_df, test_df
+def train_test_split(df, n_test=24, group_col='series_id'):
+    """
+    Split the last `n_test` rows of each group to the test set
+    :param df: The DataFrame
+    :param n_test: The number of test rows of each group
+    :param group_col: The group column
+    :return: The tuple of (train df, test df)
+    """
+    positions, sizes = _get_group_positions(df, group_col)
+    test_mask = positions >= sizes - n_test
+
+    return df[~test_mask], df[test_mask]
+
+
+def rolling_origin_splits(df, n_test=24, n_folds=3, step=None, group_col='series_id'):
+    """
+    Generate the train and test sets for rolling-origin validation. The test window of each fold
+    is moved forward by `step` rows per group, the train set is all rows before the test window.
+    The last fold is the same as `train_test_split`.
+    :param df: The DataFrame
+    :param n_test: The number of test rows of each group
+    :param n_folds: The number of folds
+    :param step: The number of rows the origin moves between two folds. Default is `n_test`
+    :param group_col: The group column
+    :return: The generator of (train df, test df)
+    """
+    if step is None:
+        step = n_test
+
+    positions, sizes = _get_group_positions(df, group_col)
+
+    for fold in range(n_folds):
+        test_end = sizes - (n_folds - 1 - fold) * step
+        test_start = test_end - n_test
+
+        yield df[positions < test_start], df[(positions >= test_start) & (positions < test_end)]
 
 
 def describe_training_data(train_df):
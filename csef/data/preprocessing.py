@@ -1,19 +1,86 @@
 # math and data manipulation
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
 
+def drop_nan_samples(X, y):
+    """
+    Keep the samples without missing value in X and y, like the `dropna` of the lagged features
+    :param X: The samples with shape (samples, ...)
+    :param y: The targets with shape (samples, ...)
+    :return: The X and y without the samples containing NaN
+    """
+    if len(X) == 0:
+        return X, y
+
+    mask = ~(np.isnan(X.reshape(len(X), -1)).any(1) | np.isnan(y.reshape(len(y), -1)).any(1))
+
+    # Keep the views if there is no missing value
+    if mask.all():
+        return X, y
+
+    return X[mask], y[mask]
+
+
+def make_lagged_windows(values, lag, chronological=False, dropna=True):
+    """
+    Build the lagged samples of one series or a stacked batch of series with a sliding window.
+
+    The windows are strided views over `values`, so no data is copied for a single series.
+    By default the lags are ordered like `create_lagged_features` (lag 1 first), set
+    `chronological` to get the oldest value first.
+
+    :param values: The 1-D series values or a 2-D array with one series per row
+    :param lag: The number of lagged values for each sample
+    :param chronological: Order the lags from the oldest to the latest value
+    :param dropna: Drop the samples with a missing value in the lags or the target
+    :return: The X with shape (samples, 1, lag) and the y with shape (samples,)
+    """
+    values = np.asarray(values)
+    is_batch = values.ndim == 2
+
+    if not is_batch:
+        values = values.ravel()
+
+    # A series not longer than the lag gives no sample
+    n_samples = max(values.shape[-1] - lag, 0)
+
+    item_stride = values.strides[-1]
+    windows = np.lib.stride_tricks.as_strided(
+        values,
+        shape=values.shape[:-1] + (n_samples, lag),
+        strides=values.strides[:-1] + (item_stride, item_stride),
+        writeable=False
+    )
+
+    if not chronological:
+        windows = windows[..., ::-1]
+
+    y = values[..., lag:]
+
+    if is_batch:
+        # Stack the samples of all series, this is the only place we need to copy
+        X, y = windows.reshape(-1, 1, lag), y.reshape(-1)
+    else:
+        X = windows[:, np.newaxis, :]
+
+    if dropna and values.dtype.kind == 'f':
+        X, y = drop_nan_samples(X, y)
+
+    return X, y
+
+
 def create_lagged_features(df, lag=1, train_col='consumption'):
     if not type(df) == pd.DataFrame:
         df = pd.DataFrame(df, columns=[train_col])
 
-    def _rename_lag(ser, j):
-        ser.name = ser.name + f'_{j}'
-        return ser
+    values = df[train_col].values
+    X, y = make_lagged_windows(values, lag, dropna=False)
 
     # add a column lagged by `i` steps
-    for i in range(1, lag + 1):
-        df = df.join(df['consumption'].shift(i).pipe(_rename_lag, i))
+    columns = [train_col] + ['{}_{}'.format(train_col, i) for i in range(1, lag + 1)]
+    df = pd.DataFrame(np.column_stack([y, X[:, 0, :]]), index=df.index[lag:], columns=columns)
 
     df.dropna(inplace=True)
     return df
@@ -26,14 +93,8 @@ def prepare_training_data(df, lag, train_col='consumption'):
     scaler = MinMaxScaler(feature_range=(-1, 1))
     df_vals = scaler.fit_transform(df.values.reshape(-1, 1))
 
-    # convert consumption series to lagged features
-    df_lagged = create_lagged_features(df_vals, lag=lag, train_col=train_col)
-
-    # X, y format taking the first column (original time series) to be the y
-    X = df_lagged.drop(train_col, axis=1).values
-    y = df_lagged[train_col].values
-
+    # X, y format taking the latest value to be the y,
     # keras expects 3 dimensional X
-    X = X.reshape(X.shape[0], 1, X.shape[1])
+    X, y = make_lagged_windows(df_vals.ravel(), lag)
 
     return X, y, scaler
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def get_minmax_params(data_min, data_max, feature_range=(-1, 1)):
+    """
+    Compute the scale and the offset of min-max scaling, the same way as `MinMaxScaler`
+    :param data_min: The min values
+    :param data_max: The max values
+    :param feature_range: The range of the scaled values
+    :return: The tuple of (scale, min), the scaled values are `values * scale + min`
+    """
+    data_min = np.asarray(data_min, dtype=np.float64)
+
+    # A constant series keeps the unit scale
+    data_range = np.asarray(data_max, dtype=np.float64) - data_min
+    data_range = np.where(data_range == 0.0, 1.0, data_range)
+
+    scale = (feature_range[1] - feature_range[0]) / data_range
+
+    return scale, feature_range[0] - data_min * scale
+
+
+class ScalerBank(object):
+    """
+    The min-max scalers of many series, kept in contiguous arrays indexed by series.
+    Each series is scaled like a `MinMaxScaler` fitted on the values of that series.
+    """
+
+    def __init__(self, feature_range=(-1, 1)):
+        self.feature_range = tuple(feature_range)
+        self.series_ids = None
+        self.data_min = None
+        self.data_max = None
+        self.scale_ = None
+        self.min_ = None
+
+    def fit_stats(self, series_ids, data_min, data_max):
+        """
+        Set the scalers from the min and max values computed elsewhere
+        :param series_ids: The array of series ids
+        :param data_min: The min value of each series
+        :param data_max: The max value of each series
+        :return: Self
+        """
+        order = np.argsort(series_ids, kind='mergesort')
+
+        self.series_ids = np.asarray(series_ids)[order]
+        self.data_min = np.asarray(data_min, dtype=np.float64)[order]
+        self.data_max = np.asarray(data_max, dtype=np.float64)[order]
+
+        self.scale_, self.min_ = get_minmax_params(self.data_min, self.data_max, self.feature_range)
+
+        return self
+
+    def fit(self, df, group_col='series_id', train_col='consumption'):
+        """
+        Compute the min and max of all series in one grouped pass
+        :param df: The DataFrame contains the series
+        :param group_col: The series id column
+        :param train_col: The value column
+        :return: Self
+        """
+        stats = df.groupby(group_col)[train_col].agg(['min', 'max'])
+        return self.fit_stats(stats.index.values, stats['min'].values, stats['max'].values)
+
+    def _get_positions(self, series_ids):
+        series_ids = np.asarray(series_ids)
+        positions = np.searchsorted(self.series_ids, series_ids)
+        positions = np.minimum(positions, len(self.series_ids) - 1)
+
+        unknown = self.series_ids[positions] != series_ids
+        if np.any(unknown):
+            raise KeyError('The series {} are not fitted'.format(np.unique(series_ids[unknown])[:10]))
+
+        return positions
+
+    def _get_params(self, values, series_ids):
+        positions = self._get_positions(series_ids)
+
+        # The first axes of the values are aligned with the series ids
+        shape = positions.shape + (1,) * (values.ndim - positions.ndim)
+
+        return self.scale_[positions].reshape(shape), self.min_[positions].reshape(shape)
+
+    def transform(self, values, series_ids):
+        """
+        Scale the values of many series at once
+        :param values: The array whose first axes are aligned with `series_ids`
+        :param series_ids: The series id or the array of series ids
+        :return: The scaled values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        scale, min_ = self._get_params(values, series_ids)
+
+        return values * scale + min_
+
+    def inverse_transform(self, values, series_ids):
+        """
+        Revert the scaled values of many series at once back to the original range
+        :param values: The array whose first axes are aligned with `series_ids`
+        :param series_ids: The series id or the array of series ids
+        :return: The values in the original range
+        """
+        values = np.asarray(values, dtype=np.float64)
+        scale, min_ = self._get_params(values, series_ids)
+
+        return (values - min_) / scale
+
+    def get_scaler(self, ser_id):
+        """
+        Get the scaler of a single series, it has the `transform` and `inverse_transform` of `MinMaxScaler`
+        :param ser_id: The series id
+        :return: The SeriesScaler
+        """
+        self._get_positions(ser_id)
+        return SeriesScaler(self, ser_id)
+
+    def save(self, path):
+        """
+        Save the scaler params to a `.npz` file
+        :param path: The file path
+        """
+        np.savez(path, series_ids=self.series_ids, data_min=self.data_min,
+                 data_max=self.data_max, feature_range=np.asarray(self.feature_range))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the scaler params from a `.npz` file
+        :param path: The file path
+        :return: The ScalerBank
+        """
+        with np.load(path) as params:
+            bank = cls(feature_range=params['feature_range'].tolist())
+            return bank.fit_stats(params['series_ids'], params['data_min'], params['data_max'])
+
+
+class SeriesScaler(object):
+    """The view of a single series in a ScalerBank"""
+
+    def __init__(self, bank, ser_id):
+        self.bank = bank
+        self.ser_id = ser_id
+
+    def transform(self, X):
+        return self.bank.transform(X, self.ser_id)
+
+    def inverse_transform(self, X):
+        return self.bank.inverse_transform(X, self.ser_id)
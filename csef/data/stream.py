@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import threading
+from queue import Queue, Full, Empty
+
+import numpy as np
+
+from csef.data import cache
+from csef.data.preprocessing import make_lagged_windows
+from csef.data.scaler import ScalerBank, get_minmax_params
+
+
+# The markers sent by the prefetch thread
+_END = object()
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class SeriesStream(object):
+    """
+    Stream the lagged samples of many series, one series at a time.
+
+    The series are read from two flat columns (which can be memory-mapped), scaled and windowed
+    on the fly by a background thread which prefetches the next series while the current one is
+    trained, so the memory stays flat whatever the number of series. The rows of each series must
+    be contiguous. The min-max scaler of each series is recorded while streaming and available
+    as `scaler_bank` once the stream is consumed.
+    """
+
+    def __init__(self, series_ids, values, n_input, prefetch=2, chunk_size=1000000, feature_range=(-1, 1)):
+        self.series_ids = series_ids
+        self.values = values
+        self.n_input = n_input
+        self.prefetch = prefetch
+        self.chunk_size = chunk_size
+        self.feature_range = feature_range
+        self.scaler_bank = None
+        self._runs = None
+
+    @classmethod
+    def from_frame(cls, df, n_input, group_col='series_id', train_col='consumption', **kwargs):
+        """
+        Stream the series of a DataFrame
+        :param df: The DataFrame contains the series
+        :param n_input: The number of lagged values of each sample
+        :param group_col: The series id column
+        :param train_col: The value column
+        :return: The SeriesStream
+        """
+        series_ids = df[group_col].values
+
+        # Keep the rows of each series together, the sort is stable to keep the time order
+        if np.count_nonzero(series_ids[1:] != series_ids[:-1]) + 1 > df[group_col].nunique():
+            order = np.argsort(series_ids, kind='mergesort')
+            return cls(series_ids[order], df[train_col].values[order], n_input, **kwargs)
+
+        return cls(series_ids, df[train_col].values, n_input, **kwargs)
+
+    @classmethod
+    def from_cache(cls, cache_dir, n_input, group_col='series_id', train_col='consumption', **kwargs):
+        """
+        Stream the series of a cached raw table, the columns are memory-mapped
+        :param cache_dir: The cache folder of the table, see `csef.data.cache`
+        :param n_input: The number of lagged values of each sample
+        :param group_col: The series id column
+        :param train_col: The value column
+        :return: The SeriesStream
+        """
+        _, arrays = cache.read_columns(cache_dir, columns=[group_col, train_col])
+        return cls(arrays[group_col], arrays[train_col], n_input, **kwargs)
+
+    def get_runs(self):
+        """
+        Find the rows of each series, the id column is read chunk by chunk
+        :return: The array of run boundaries, series `i` is at rows [runs[i], runs[i + 1])
+        """
+        if self._runs is None:
+            n_rows = len(self.series_ids)
+            starts = [np.zeros(1, dtype=np.int64)]
+
+            for chunk_start in range(0, n_rows, self.chunk_size):
+                # Overlap one row to compare the last row of the chunk with the next one
+                chunk = np.asarray(self.series_ids[chunk_start:chunk_start + self.chunk_size + 1])
+                starts.append(chunk_start + 1 + np.flatnonzero(chunk[1:] != chunk[:-1]))
+
+            starts.append(np.array([n_rows], dtype=np.int64))
+            self._runs = np.concatenate(starts) if n_rows else np.zeros(0, dtype=np.int64)
+
+        return self._runs
+
+    def __len__(self):
+        return max(len(self.get_runs()) - 1, 0)
+
+    def _iter_samples(self):
+        runs = self.get_runs()
+        ser_ids, data_min, data_max = [], [], []
+        scaler_bank = ScalerBank(self.feature_range)
+
+        for start, end in zip(runs[:-1], runs[1:]):
+            ser_id = self.series_ids[start]
+            ser_values = np.asarray(self.values[start:end], dtype=np.float64)
+
+            ser_ids.append(ser_id)
+            # The missing values are ignored like `MinMaxScaler`, the samples containing them are dropped
+            data_min.append(np.nanmin(ser_values))
+            data_max.append(np.nanmax(ser_values))
+
+            scale, min_ = get_minmax_params(data_min[-1], data_max[-1], self.feature_range)
+            X, y = make_lagged_windows(ser_values * scale + min_, self.n_input, dropna=True)
+
+            yield ser_id, X, y
+
+        self.scaler_bank = scaler_bank.fit_stats(ser_ids, data_min, data_max)
+
+    def _produce(self, queue, stop):
+        """Prepare the samples in the background and hand them over through the queue"""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        try:
+            for item in self._iter_samples():
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_Failure(e))
+            return
+
+        put(_END)
+
+    def __iter__(self):
+        """
+        Iterate the samples of each series
+        :return: The generator of (series id, X, y)
+        """
+        queue = Queue(maxsize=max(self.prefetch, 1))
+        stop = threading.Event()
+
+        producer = threading.Thread(target=self._produce, args=(queue, stop))
+        producer.daemon = True
+        producer.start()
+
+        try:
+            while True:
+                try:
+                    item = queue.get(timeout=0.1)
+                except Empty:
+                    if not producer.is_alive() and queue.empty():
+                        break
+                    continue
+
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+
+                yield item
+        finally:
+            stop.set()
+            producer.join()
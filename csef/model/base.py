@@ -1,27 +1,51 @@
 # -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
 
 import numpy as np
-import pandas as pd
 from tqdm import tqdm
 
 from tensorflow import keras
 
+from csef.utils.helper import load_class
 from csef.utils.logging import getLogger
 from csef.data import preprocessing
+from csef.data.scaler import ScalerBank
+from csef.data.stream import SeriesStream
+from csef.model.export import export_stateless, get_verify_inputs
+from csef.model.forecast import recursive_forecast
+from csef.model.parallel import parallel_fit
 
 
 logger = getLogger(logger_name=__name__)
 
+ARTIFACT_MANIFEST_FILE = 'model.json'
+ARTIFACT_WEIGHTS_FILE = 'weights.npz'
+ARTIFACT_OPTIMIZER_FILE = 'optimizer.npz'
+ARTIFACT_SCALERS_FILE = 'scalers.npz'
+
 
 class BaseModel(object):
 
+    _predict_function = None
+    scaler_bank = None
+
+    # The last samples of the training, used to check the exported predictor
+    recent_samples = None
+    n_recent_samples = 32
+
     default_config = {
         'loss': 'mean_absolute_error',
         'optimizer': 'adam',
         'stateful': True,
         'loss': 'mean_absolute_error',
         'train_col': 'consumption',
-        'group_col': 'series_id'
+        'group_col': 'series_id',
+        'series_per_batch': 1,
+        'n_workers': 1,
+        'sync_interval': 10
     }
 
     def __init__(self, config, is_init_model=True):
@@ -36,12 +60,15 @@ class BaseModel(object):
         self.n_input = config['n_input']
         self.n_nodes = config['n_nodes']
         self.n_batch = config['n_batch']
+        self.n_workers = config['n_workers']
+        self.sync_interval = config['sync_interval']
 
         self.loss = config['loss']
         self.optimizer = config['optimizer']
         self.stateful = config['stateful']
         self.train_col = config['train_col']
         self.group_col = config['group_col']
+        self.series_per_batch = config['series_per_batch']
 
         if is_init_model:
             self.model = self._build_model()
@@ -56,35 +83,88 @@ class BaseModel(object):
     def reset_states(self):
         self.model.reset_states()
 
+    def _get_predict_function(self):
+        """
+        Compile the inference function of the model once. Calling it is much cheaper than `predict`,
+        the state updates are kept so stateful layers still carry their states between calls.
+        """
+        if self._predict_function is None:
+            self._predict_function = keras.backend.function(
+                self.model.inputs,
+                self.model.outputs,
+                updates=self.model.state_updates
+            )
+
+        return self._predict_function
+
     def fit(self, train_df):
-        n_series = train_df[self.group_col].nunique()
+        return self.fit_stream(SeriesStream.from_frame(train_df, self.n_input, self.group_col, self.train_col))
 
-        for ser_id, ser_data in tqdm(train_df.groupby(self.group_col),
-                                     total=n_series,
-                                     desc="Fitting the data"):
-            # prepare the data
-            X, y, _ = preprocessing.prepare_training_data(ser_data[self.train_col], self.n_input)
-            self.model.fit(X, y, epochs=1, batch_size=self.n_batch, verbose=0, shuffle=False)
-            self.model.reset_states()
+    def fit_stream(self, stream):
+        """
+        Fit the model series by series from a stream, the states are reset at the end of each series
+        :param stream: The SeriesStream, e.g. `SeriesStream.from_cache` to read the cached raw data
+        :return: Self
+        """
+        series = self._keep_recent_samples((X, y) for _, X, y in stream)
+        series = tqdm(series, total=len(stream), desc="Fitting the data")
+
+        if self.n_workers > 1:
+            parallel_fit(self, series, self.n_workers, self.sync_interval)
+        else:
+            for X, y in series:
+                self.model.fit(X, y, epochs=1, batch_size=self.n_batch, verbose=0, shuffle=False)
+                self.model.reset_states()
+
+        # the scalers are recorded while streaming
+        self.scaler_bank = stream.scaler_bank
 
         return self
 
-    def predict(self, df, scaler, num_pred_hours=24, is_inverse_transform=True):
+    def _keep_recent_samples(self, series):
+        for X, y in series:
+            if len(X):
+                self.recent_samples = np.array(X[-self.n_recent_samples:])
+            yield X, y
 
-        # allocate prediction frame
-        preds_scaled = np.zeros(num_pred_hours)
+    def forecast(self, windows, num_pred_hours=24, reset_states=False):
+        """
+        Forecast many series together with one batched call per forecast hour
+        :param windows: The scaled last `n_input` values of each series, shape (n_series, n_input)
+        :param num_pred_hours: The number of hours need to forecast
+        :param reset_states: Reset the states of the model before each batch of series
+        :return: The scaled forecasts with shape (n_series, num_pred_hours)
+        """
+        predict_function = self._get_predict_function()
+
+        return recursive_forecast(
+            lambda X: predict_function([X])[0],
+            windows,
+            num_pred_hours,
+            batch_size=self.model.input_shape[0],
+            before_batch=self.model.reset_states if reset_states else None
+        )
+
+    def export_stateless(self, verify_inputs=None, verify=True):
+        """
+        Export the model to an inference-only stateless predictor with a variable batch size
+        :param verify_inputs: The inputs to check the predictor against the model, see `export.verify_stateless`.
+            Default is the last samples of the training
+        :param verify: Check the predictor against the model
+        :return: The StatelessPredictor
+        """
+        if verify and verify_inputs is None:
+            verify_inputs = get_verify_inputs(self.model, self.recent_samples)
+
+        return export_stateless(self.model, verify_inputs=verify_inputs, verify=verify)
+
+    def predict(self, df, scaler, num_pred_hours=24, is_inverse_transform=True):
 
         # initial X is last lag values from the cold start
         X = scaler.transform(df.values.reshape(-1, 1))[-self.n_input:]
 
         # forecast
-        for i in range(num_pred_hours):
-            # predict scaled value for next time step
-            yhat = self.model.predict(X.reshape(1, 1, self.n_input), batch_size=1)[0][0]
-            preds_scaled[i] = yhat
-
-            # update X to be latest data plus prediction
-            X = pd.Series(X.ravel()).shift(-1).fillna(yhat).values
+        preds_scaled = self.forecast(X.reshape(1, -1), num_pred_hours=num_pred_hours)[0]
 
         # revert scale back to original range
         if is_inverse_transform:
@@ -94,65 +174,222 @@ class BaseModel(object):
 
         return hourly_preds
 
-    def make_submission(self, submission_df, cold_start_test):
+    def _pack_submission_batches(self, pred_windows, series_per_batch):
+        """
+        Pack the series with the same prediction window into batches, keeping the series order
+        :param pred_windows: The Series maps each series id to its prediction window
+        :param series_per_batch: The max number of series in a batch
+        :return: The list of (prediction window, list of series ids)
+        """
+        batches = []
+        pending = {}
+
+        for ser_id, pred_window in pred_windows.items():
+            batch = pending.setdefault(pred_window, [])
+            batch.append(ser_id)
+
+            if len(batch) == series_per_batch:
+                batches.append((pred_window, pending.pop(pred_window)))
+
+        batches.extend(pending.items())
+
+        return batches
+
+    def make_submission(self, submission_df, cold_start_test, series_per_batch=None):
         """
         make the submission file
+
+        The series with the same prediction window are packed into batches, every batch is
+        fine-tuned with one fit call and forecast together.
+
         :param submission_df: The submission sample
         :param cold_start_test: The test data
+        :param series_per_batch: The max number of series per batch. Default is the `series_per_batch`
+            config, 1 fine-tunes and forecasts the series one by one
         :return: The submission df
         """
+        if series_per_batch is None:
+            series_per_batch = self.series_per_batch
+
         my_submission_df = submission_df.copy()
 
         pred_window_to_num_preds = {'hourly': 24, 'daily': 7, 'weekly': 2}
         pred_window_to_num_pred_hours = {'hourly': 24, 'daily': 7 * 24, 'weekly': 2 * 7 * 24}
 
-        num_test_series = my_submission_df[self.group_col].nunique()
+        # Index the rows of every series once instead of masking the whole frames per series
+        submission_rows = my_submission_df.groupby(self.group_col).indices
+        cold_start_rows = cold_start_test.groupby(self.group_col).indices
+        cold_start_values = cold_start_test[self.train_col].values
+
+        # scale all cold start series in one pass
+        scaler_bank = ScalerBank().fit(cold_start_test, self.group_col, self.train_col)
+
+        pred_windows = my_submission_df.groupby(self.group_col)['prediction_window'].first()
+        batches = self._pack_submission_batches(pred_windows, series_per_batch)
+
+        predictions = my_submission_df[self.train_col].values.astype(float)
+        result_rows = []
+        result_values = []
 
         self.model.reset_states()
 
-        for ser_id, pred_df in tqdm(my_submission_df.groupby(self.group_col),
-                                    total=num_test_series,
-                                    desc="Forecasting from Cold Start Data"):
-            # get info about this series' prediction window
-            pred_window = pred_df.prediction_window.unique()[0]
+        for pred_window, ser_ids in tqdm(batches, desc="Forecasting from Cold Start Data"):
+            # get info about the prediction window of these series
             num_preds = pred_window_to_num_preds[pred_window]
             num_pred_hours = pred_window_to_num_pred_hours[pred_window]
 
             # prepare cold start data
-            series_data = cold_start_test[cold_start_test[self.group_col] == ser_id][self.train_col]
-            cold_X, cold_y, scaler = preprocessing.prepare_training_data(series_data, self.n_input)
+            cold_X, cold_y, windows = [], [], []
+
+            for ser_id in ser_ids:
+                series_values = scaler_bank.transform(cold_start_values[cold_start_rows[ser_id]], ser_id)
+                X, y = preprocessing.make_lagged_windows(series_values, self.n_input)
 
-            # fine tune our lstm model to this site using cold start data
-            self.model.fit(cold_X, cold_y, epochs=1, batch_size=self.n_batch, verbose=0, shuffle=False)
+                cold_X.append(X)
+                cold_y.append(y)
+                windows.append(series_values[-self.n_input:])
+
+            # fine tune our lstm model to these sites using cold start data
+            self.model.fit(np.concatenate(cold_X), np.concatenate(cold_y),
+                           epochs=1, batch_size=self.n_batch, verbose=0, shuffle=False)
 
             # make hourly forecasts for duration of pred window
-            preds = self.predict(series_data, scaler, num_pred_hours=num_pred_hours)
+            preds_scaled = self.forecast(np.stack(windows), num_pred_hours=num_pred_hours)
+            preds = scaler_bank.inverse_transform(preds_scaled, ser_ids)
 
             # reduce by taking sum over each sub window in pred window
-            reduced_preds = [pred.sum() for pred in np.split(preds, num_preds)]
+            result_rows.extend(submission_rows[ser_id] for ser_id in ser_ids)
+            result_values.append(preds.reshape(len(ser_ids), num_preds, -1).sum(axis=2).ravel())
 
-            # store result in submission DataFrame
-            ser_id_mask = my_submission_df[self.group_col] == ser_id
-            my_submission_df.loc[ser_id_mask, self.train_col] = reduced_preds
+        # store all results in submission DataFrame at once
+        if result_rows:
+            predictions[np.concatenate(result_rows)] = np.concatenate(result_values)
+        my_submission_df[self.train_col] = predictions
 
         return my_submission_df
 
+    def _get_scaler_bank_path(self, model_path):
+        return '{}.scalers.npz'.format(os.path.splitext(model_path)[0])
+
     def save_model(self, model_path):
         keras.models.save_model(
             self.model,
             model_path
         )
 
+        # Keep the fitted scalers next to the model
+        if self.scaler_bank is not None:
+            self.scaler_bank.save(self._get_scaler_bank_path(model_path))
+
     def load_model(self, model_path):
         self.model = keras.models.load_model(
             model_path
         )
+        self._predict_function = None
+
+        scaler_bank_path = self._get_scaler_bank_path(model_path)
+        if os.path.isfile(scaler_bank_path):
+            self.scaler_bank = ScalerBank.load(scaler_bank_path)
+
+    @staticmethod
+    def _get_optimizer_variables(optimizer):
+        """The variables of the optimizer, a list or a method depending on the optimizer version"""
+        variables = optimizer.variables
+
+        return list(variables) if isinstance(variables, (list, tuple)) else list(variables())
+
+    def save_artifact(self, artifact_path):
+        """
+        Save the model as an artifact folder, it keeps together the model class and config (n_input,
+        n_batch ...), the architecture, the weights, the optimizer state and the fitted scalers.
+        The files are written in a temporary folder renamed once they're all saved.
+        :param artifact_path: The folder of the artifact
+        """
+        parent_path = os.path.dirname(os.path.abspath(artifact_path))
+        if not os.path.isdir(parent_path):
+            os.makedirs(parent_path)
+
+        tmp_path = tempfile.mkdtemp(dir=parent_path, prefix='.tmp-')
+
+        try:
+            manifest = {
+                'class_name': '{}.{}'.format(self.__class__.__module__, self.__class__.__name__),
+                'config': self.config,
+                'architecture': self.model.to_json()
+            }
+
+            with open(os.path.join(tmp_path, ARTIFACT_MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, default=str)
+
+            np.savez(os.path.join(tmp_path, ARTIFACT_WEIGHTS_FILE), *self.model.get_weights())
+
+            optimizer = getattr(self.model, 'optimizer', None)
+            if optimizer is not None:
+                np.savez(os.path.join(tmp_path, ARTIFACT_OPTIMIZER_FILE),
+                         *[variable.numpy() for variable in self._get_optimizer_variables(optimizer)])
+
+            if self.scaler_bank is not None:
+                self.scaler_bank.save(os.path.join(tmp_path, ARTIFACT_SCALERS_FILE))
+
+            if os.path.isdir(artifact_path):
+                shutil.rmtree(artifact_path)
+            os.rename(tmp_path, artifact_path)
+        except:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _load_arrays(file_path):
+        with np.load(file_path) as arrays:
+            return [arrays['arr_{}'.format(i)] for i in range(len(arrays.files))]
+
+    @classmethod
+    def load_artifact(cls, artifact_path, compile=True):
+        """
+        Load a model saved by `save_artifact`
+        :param artifact_path: The folder of the artifact
+        :param compile: Compile the model and restore the optimizer state to continue the training.
+            Set to False for the fast path which only restores the weights, the model is ready for `forecast`
+        :return: The model instance of the saved class
+        """
+        with open(os.path.join(artifact_path, ARTIFACT_MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        instance = load_class(manifest['class_name'])(manifest['config'], is_init_model=False)
+
+        model = keras.models.model_from_json(manifest['architecture'])
+        model.set_weights(cls._load_arrays(os.path.join(artifact_path, ARTIFACT_WEIGHTS_FILE)))
+
+        if compile:
+            model.compile(loss=instance.loss, optimizer=instance.optimizer)
+
+            # The optimizer variables only exist once it's built for the variables of the model
+            optimizer_path = os.path.join(artifact_path, ARTIFACT_OPTIMIZER_FILE)
+            optimizer_weights = cls._load_arrays(optimizer_path) if os.path.isfile(optimizer_path) else []
+            if optimizer_weights:
+                model.optimizer.build(model.trainable_variables)
+
+                optimizer_variables = cls._get_optimizer_variables(model.optimizer)
+                if len(optimizer_variables) != len(optimizer_weights):
+                    raise ValueError('The optimizer state of the artifact has {} variables, {} expected'
+                                     .format(len(optimizer_weights), len(optimizer_variables)))
+
+                for variable, value in zip(optimizer_variables, optimizer_weights):
+                    variable.assign(value)
+
+        instance.model = model
+
+        scalers_path = os.path.join(artifact_path, ARTIFACT_SCALERS_FILE)
+        if os.path.isfile(scalers_path):
+            instance.scaler_bank = ScalerBank.load(scalers_path)
+
+        return instance
 
 
 class GeneralModel(BaseModel):
     """This get the config to build model"""
 
-    def __init__(self, config):
+    def __init__(self, config, is_init_model=True):
         assert 'model' in config
 
         # Each model definition including
@@ -160,7 +397,7 @@ class GeneralModel(BaseModel):
         # layer_config: {}
         self.model_definitions = config['model']
 
-        super().__init__(config)
+        super().__init__(config, is_init_model)
 
     def __layer_type_mapping(self, layer_type):
         return getattr(keras.layers, layer_type)
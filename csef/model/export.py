@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Export the trained stateful models to inference-only stateless graphs."""
+import numpy as np
+from tensorflow import keras
+
+from csef.model.forecast import recursive_forecast
+
+
+class StatelessPredictor(object):
+    """
+    The inference-only copy of a model with a variable batch dimension.
+
+    The states of the recurrent layers are passed in and returned explicitly instead of being
+    kept in the layers, so any number of series can be forecast in one call.
+    """
+
+    def __init__(self, model, state_sizes):
+        """
+        :param model: The keras model maps [X] + states to [y] + new states
+        :param state_sizes: The size of each state input, in the order of the model inputs
+        """
+        self.model = model
+        self.state_sizes = state_sizes
+        self._predict_function = keras.backend.function(model.inputs, model.outputs)
+
+    def initial_states(self, batch_size):
+        """
+        Get the zero states, same as the states of a stateful model after `reset_states`
+        :param batch_size: The number of series
+        :return: The list of states
+        """
+        return [np.zeros((batch_size, state_size), dtype=np.float32) for state_size in self.state_sizes]
+
+    def predict(self, X, states=None):
+        """
+        Predict one step
+        :param X: The inputs with shape (batch, timesteps, n_input)
+        :param states: The list of states returned by the previous step. Default is the zero states
+        :return: The tuple of (predictions with shape (batch,), new states)
+        """
+        if states is None:
+            states = self.initial_states(len(X))
+
+        outputs = self._predict_function([X] + list(states))
+
+        return outputs[0].reshape(len(X), -1)[:, 0], outputs[1:]
+
+    def forecast(self, windows, num_pred_hours=24, states=None):
+        """
+        Forecast many series together in one batch
+        :param windows: The scaled last `n_input` values of each series, shape (n_series, n_input)
+        :param num_pred_hours: The number of hours need to forecast
+        :param states: The initial states of the series. Default is the zero states
+        :return: The scaled forecasts with shape (n_series, num_pred_hours)
+        """
+        current = {'states': states}
+
+        def step(X):
+            y, current['states'] = self.predict(X, current['states'])
+            return y
+
+        return recursive_forecast(step, windows, num_pred_hours)
+
+
+def _copy_layer(layer):
+    config = layer.get_config()
+    config.pop('batch_input_shape', None)
+
+    if isinstance(layer, keras.layers.RNN):
+        config.update(stateful=False, return_state=True)
+
+    return layer.__class__.from_config(config)
+
+
+def get_verify_inputs(model, samples=None, n_steps=3):
+    """
+    Build the inputs of `verify_stateless` from a small sample of recent windows
+    :param model: The stateful keras model
+    :param samples: The recent samples with shape (samples, timesteps, n_input), repeated if there are
+        too few of them. Default is random values in the scaled range
+    :param n_steps: The number of steps of the check
+    :return: The inputs with shape (n_steps, batch, timesteps, n_input)
+    """
+    batch_size = model.input_shape[0] or 1
+    sample_shape = tuple(model.input_shape[1:])
+    n_samples = n_steps * batch_size
+
+    if samples is None or len(samples) == 0:
+        samples = np.random.RandomState(2018).uniform(-1, 1, size=(n_samples,) + sample_shape)
+    else:
+        samples = np.resize(np.asarray(samples)[-n_samples:], (n_samples,) + sample_shape)
+
+    return samples.reshape((n_steps, batch_size) + sample_shape).astype(np.float32)
+
+
+def verify_stateless(model, predictor, X):
+    """
+    Compare the outputs of the stateful model and the predictor over a sequence of steps.
+    The states of the stateful model are reset before the check and restored after.
+    :param model: The stateful keras model
+    :param predictor: The StatelessPredictor
+    :param X: The inputs with shape (n_steps, batch, timesteps, n_input), the batch must be
+        the batch size of the stateful model
+    :return: The max absolute difference
+    """
+    saved_states = [(state, keras.backend.get_value(state))
+                    for layer in model.layers if getattr(layer, 'stateful', False) for state in layer.states]
+
+    model.reset_states()
+    states = None
+    max_diff = 0.0
+
+    try:
+        for X_step in X:
+            expected = model.predict_on_batch(X_step).reshape(len(X_step), -1)[:, 0]
+            y, states = predictor.predict(X_step, states)
+            max_diff = max(max_diff, float(np.max(np.abs(expected - y))))
+    finally:
+        for state, value in saved_states:
+            keras.backend.set_value(state, value)
+
+    return max_diff
+
+
+def export_stateless(model, verify_inputs=None, tolerance=1e-5, verify=True):
+    """
+    Copy the trained weights of a sequential model, e.g. a stateful LSTM, into a stateless graph
+    with a variable batch dimension.
+    :param model: The trained keras model
+    :param verify_inputs: The inputs to check the exported graph against the model, see `verify_stateless`.
+        Default is built by `get_verify_inputs`
+    :param tolerance: The max absolute difference accepted by the check
+    :param verify: Check the exported graph against the model
+    :return: The StatelessPredictor
+    """
+    inputs = keras.layers.Input(shape=model.input_shape[1:])
+    x = inputs
+
+    state_inputs = []
+    state_outputs = []
+    state_sizes = []
+
+    for layer in model.layers:
+        new_layer = _copy_layer(layer)
+
+        if isinstance(layer, keras.layers.RNN):
+            cell_state_sizes = layer.cell.state_size
+            if not isinstance(cell_state_sizes, (list, tuple)):
+                cell_state_sizes = [cell_state_sizes]
+
+            layer_states = [keras.layers.Input(shape=(state_size,)) for state_size in cell_state_sizes]
+            outputs = new_layer(x, initial_state=layer_states)
+
+            x = outputs[0]
+            state_inputs.extend(layer_states)
+            state_outputs.extend(outputs[1:])
+            state_sizes.extend(cell_state_sizes)
+        else:
+            x = new_layer(x)
+
+        new_layer.set_weights(layer.get_weights())
+
+    predictor = StatelessPredictor(
+        keras.models.Model(inputs=[inputs] + state_inputs, outputs=[x] + state_outputs),
+        state_sizes
+    )
+
+    if verify:
+        if verify_inputs is None:
+            verify_inputs = get_verify_inputs(model)
+
+        max_diff = verify_stateless(model, predictor, verify_inputs)
+        if max_diff > tolerance:
+            raise ValueError('The exported graph differs from the model by {}'.format(max_diff))
+
+    return predictor
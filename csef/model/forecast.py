@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def recursive_forecast(step, windows, num_pred_hours, batch_size=None, before_batch=None):
+    """
+    Forecast many series together, feeding each prediction back as the latest input.
+
+    The inputs and the predictions share one preallocated buffer per series, so the input window
+    of every step is just a view over it and the whole batch advances with a single model call.
+
+    :param step: The function maps a batch of inputs with shape (batch, 1, n_input) to the predictions
+    :param windows: The scaled input windows with shape (n_series, n_input), oldest value first
+    :param num_pred_hours: The number of hours need to forecast
+    :param batch_size: The fixed batch size of the model. None if the model accepts any batch size
+    :param before_batch: The function called before forecasting each batch, e.g. to reset the states
+    :return: The scaled predictions with shape (n_series, num_pred_hours)
+    """
+    windows = np.atleast_2d(windows)
+    n_series, n_input = windows.shape
+
+    if not batch_size:
+        batch_size = max(n_series, 1)
+
+    # Stateful models only accept their own batch size, so pad the last batch
+    n_rows = -(-n_series // batch_size) * batch_size
+
+    buffer = np.zeros((n_rows, n_input + num_pred_hours), dtype=np.float32)
+    buffer[:n_series, :n_input] = windows
+
+    for start in range(0, n_rows, batch_size):
+        rows = buffer[start:start + batch_size]
+
+        if before_batch is not None:
+            before_batch()
+
+        for i in range(num_pred_hours):
+            X = rows[:, np.newaxis, i:i + n_input]
+            rows[:, n_input + i] = np.asarray(step(X)).reshape(-1)
+
+    return buffer[:n_series, n_input:]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Fit one model on many series with a pool of worker processes."""
+import multiprocessing
+
+import numpy as np
+
+
+# The copy of the model held by each worker process
+_worker_model = None
+
+
+def average_weights(weights_list, sample_counts=None):
+    """
+    Average the weights of many copies of a model
+    :param weights_list: The list of weights, each one is returned by `get_weights` of a copy
+    :param sample_counts: The number of samples each copy was fitted on, used to weight the average
+    :return: The averaged weights
+    """
+    return [np.average(np.stack(layer_weights), axis=0, weights=sample_counts)
+            for layer_weights in zip(*weights_list)]
+
+
+def _init_worker(model_class, config):
+    """Build the model once per worker process"""
+    global _worker_model
+    _worker_model = model_class(config)
+
+
+def _fit_shard(args):
+    """
+    Fit the model of the worker on a shard of series, starting from the merged weights
+    :param args: The tuple of (weights, list of (X, y) of the series)
+    :return: The tuple of (fitted weights, number of samples)
+    """
+    weights, shard = args
+    model = _worker_model.model
+    model.set_weights(weights)
+
+    n_samples = 0
+    for X, y in shard:
+        model.fit(X, y, epochs=1, batch_size=_worker_model.n_batch, verbose=0, shuffle=False)
+        model.reset_states()
+        n_samples += len(y)
+
+    return model.get_weights(), n_samples
+
+
+def _iter_rounds(series, n_workers, sync_interval):
+    """Group the series into rounds, each round gives every worker up to `sync_interval` series"""
+    round_size = n_workers * sync_interval
+    items = []
+
+    for item in series:
+        items.append(item)
+        if len(items) == round_size:
+            yield [items[i::n_workers] for i in range(n_workers)]
+            items = []
+
+    if items:
+        yield [items[i::n_workers] for i in range(min(n_workers, len(items)))]
+
+
+def parallel_fit(model, series, n_workers, sync_interval):
+    """
+    Fit the model with the series sharded across worker processes. Every worker holds its own copy of
+    the model, after each worker fitted `sync_interval` series the weights of all copies are averaged
+    and sent back to the workers for the next round.
+    :param model: The BaseModel need to fit
+    :param series: The iterable of (X, y) of each series
+    :param n_workers: The number of worker processes
+    :param sync_interval: The number of series each worker fits between two weight merges
+    :return: The model
+    """
+    # Spawn the workers, the tensorflow session of this process can't be shared with forked ones
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(n_workers, initializer=_init_worker, initargs=(model.__class__, model.config))
+
+    try:
+        weights = model.model.get_weights()
+
+        for shards in _iter_rounds(series, n_workers, sync_interval):
+            results = [result for result in pool.map(_fit_shard, [(weights, shard) for shard in shards])
+                       if result[1] > 0]
+
+            if results:
+                weights = average_weights([result[0] for result in results],
+                                          [result[1] for result in results])
+
+        model.model.set_weights(weights)
+    finally:
+        pool.close()
+        pool.join()
+
+    return model
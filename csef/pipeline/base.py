@@ -22,6 +22,10 @@ class BaseBlockPip(object):
     executed = False
     config = {}
 
+    # The output of the block can be cached and restored instead of executing it again.
+    # The blocks with side effects (e.g. uploading files) must turn it off
+    cacheable = True
+
     def __init__(self, name, config, pip_manager, inputs_from=None):
         self.name = name
         self.pip_manager = pip_manager
@@ -39,6 +43,16 @@ class BaseBlockPip(object):
     def get_output(self):
         raise Exception('This method must be overridden!')
 
+    def set_output(self, output):
+        """
+        Restore the output of the block, e.g. loaded from the cache. By default each key of
+        the output is the attribute of the same name
+        :param output: The dict returned by `get_output`
+        """
+        for key, value in output.items():
+            setattr(self, key, value)
+        self.executed = True
+
     def execute(self, inputs=None):
         logger.info('###### Executing the block: {} ...'.format(self.name))
         self._execute(inputs)
@@ -46,4 +60,6 @@ class BaseBlockPip(object):
         logger.info('###### Finished the block: {}!'.format(self.name))
 
     def clean(self):
-        pass
+        """Release the output of the block, called once no other block needs it"""
+        for key in self.get_output():
+            setattr(self, key, None)
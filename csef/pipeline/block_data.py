@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 import gc
 import os
-import time
 import pandas as pd
 
 from csef.pipeline import PipelineStorageManager
@@ -70,14 +69,9 @@ class DataLoadingBlockPip(BaseBlockPip):
             logger.info('---> Downloading data ... ')
             PipelineStorageManager().sync_data_files(data_version, data_tag)
 
-            # Google api has rate condition and make the thread async
-            # so need to implement this code to make sure we have data before
-            sleep_counter = 0
-            while not os.path.isfile(train_local_path):
-                time.sleep(6)
-                sleep_counter += 1
-                if sleep_counter > 10:
-                    raise Exception("Had an issue when download data!")
+            # The files are in place once the sync returns
+            if not os.path.isfile(train_local_path):
+                raise Exception("Had an issue when download data!")
 
         logger.info('---> Loading data {} ... '.format(train_local_path))
         data_train = load_processed_data(train_local_path, is_full_path=True)
@@ -5,7 +5,7 @@ import pandas as pd
 from sklearn.externals import joblib
 from sklearn.pipeline import Pipeline
 
-from csef.pipeline import PipelineStorageManager
+from csef.pipeline import PipelineStorageManager, PipelineRecorder
 from csef.session import SessionManager
 from csef.utils.logging import getLogger
 from csef.pipeline.base import BaseBlockPip
@@ -19,6 +19,7 @@ class ModelTrainingBlockPip(BaseBlockPip):
     """ This block used for training model """
 
     pipeline = None
+    cacheable = False
 
     def _build_pipeline(self):
         """
@@ -112,6 +113,11 @@ class ModelTrainingBlockPip(BaseBlockPip):
         pipeline.fit(X, y)
         timer(start_time)
 
+        # Save the fit stats of the classifier, e.g. the eval curves and the feature importances
+        classifier = named_steps.get('OutOfFoldClassifier')
+        if hasattr(classifier, 'get_fit_stats'):
+            PipelineRecorder().dump_stats('fit_stats-{}'.format(self.name), classifier.get_fit_stats())
+
         # Save the pipeline
         if dump_pipeline:
             pipeline_local_path = "{}/{}".format(session_folder, pipeline_file_name)
@@ -158,4 +164,4 @@ class ModelTrainingBlockPip(BaseBlockPip):
 class ModelTuningBlockPip(BaseBlockPip):
     """ This block used for tuning model """
 
-    pass
+    cacheable = False
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed on-disk cache of the block outputs."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from csef.utils.logging import getLogger
+
+
+logger = getLogger(logger_name=__name__)
+
+OUTPUT_FILE = 'output.pkl'
+META_FILE = 'meta.json'
+
+
+class BlockOutputCache(object):
+    """
+    Cache the outputs of the blocks under a hash of what produced them. The outputs are dumped
+    with joblib and loaded back with the numpy arrays memory-mapped (copy on write), the least
+    recently used entries are evicted when the cache grows over `max_size_mb`.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=20480):
+        """
+        :param cache_dir: The folder of the cache
+        :param max_size_mb: The maximum size of the cache in MB
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def get_key(block, upstream_keys, context=None):
+        """
+        Hash the class name and the config of the block, the keys of its upstream blocks and the context
+        :param block: The block
+        :param upstream_keys: The cache keys of the blocks it takes inputs from
+        :param context: The dict of the session values changing the outputs, e.g. the data version
+        :return: The hex digest
+        """
+        content = json.dumps({
+            'class_name': '{}.{}'.format(block.__class__.__module__, block.__class__.__name__),
+            'config': block.config,
+            'upstream_keys': upstream_keys,
+            'context': context or {}
+        }, sort_keys=True, default=str)
+
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _get_entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def __contains__(self, key):
+        return os.path.isfile(os.path.join(self._get_entry_dir(key), META_FILE))
+
+    def load(self, key):
+        """
+        Load the output of a block, the numpy arrays are memory-mapped
+        :param key: The cache key
+        :return: The output
+        """
+        entry_dir = self._get_entry_dir(key)
+        import joblib
+
+        output = joblib.load(os.path.join(entry_dir, OUTPUT_FILE), mmap_mode='c')
+
+        # Touch the entry for the LRU eviction
+        os.utime(os.path.join(entry_dir, META_FILE), None)
+
+        return output
+
+    def save(self, key, output, block_name=None):
+        """
+        Dump the output of a block, the entry is written in a temporary folder then renamed
+        :param key: The cache key
+        :param output: The output
+        :param block_name: The name of the block, only kept as information
+        """
+        import joblib
+
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+
+        try:
+            joblib.dump(output, os.path.join(tmp_dir, OUTPUT_FILE))
+
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump({
+                    'block_name': block_name,
+                    'created': time.time(),
+                    'size': self._get_size(tmp_dir)
+                }, f)
+
+            entry_dir = self._get_entry_dir(key)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.rename(tmp_dir, entry_dir)
+        except:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.evict(keep=key)
+
+    @staticmethod
+    def _get_size(folder):
+        return sum(os.path.getsize(os.path.join(folder, file_name)) for file_name in os.listdir(folder))
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in the maximum size
+        :param keep: The key never evicted, e.g. the entry just saved
+        """
+        entries = []
+
+        for key in os.listdir(self.cache_dir):
+            meta_file = os.path.join(self._get_entry_dir(key), META_FILE)
+            if not os.path.isfile(meta_file):
+                continue
+
+            with open(meta_file) as f:
+                size = json.load(f)['size']
+            entries.append((os.path.getmtime(meta_file), key, size))
+
+        total_size = sum(size for _, _, size in entries)
+
+        for _, key, size in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+
+            logger.info('---> Evicting the cached output {}'.format(key))
+            shutil.rmtree(self._get_entry_dir(key), ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        """Remove all entries"""
+        for key in os.listdir(self.cache_dir):
+            shutil.rmtree(self._get_entry_dir(key), ignore_errors=True)
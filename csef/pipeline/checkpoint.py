@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints of the executed blocks to resume a failed session."""
+import json
+import os
+import shutil
+import threading
+import time
+
+from csef.utils.helper import get_proj_home
+
+
+MANIFEST_FILE = 'checkpoint.json'
+
+
+def get_checkpoint_folder(session_id):
+    """The folder of the checkpoints of a session, `models/<session_id>/checkpoints`"""
+    return os.path.join(get_proj_home(), 'models', str(session_id), 'checkpoints')
+
+
+class SessionCheckpoint(object):
+    """
+    Save the output of each executed block of a session so a failed session can be resumed.
+    A block is restored only if its fingerprint (class, config and upstream fingerprints) did not change.
+
+    The outputs already in the block cache are only referenced by their cache key, the others are saved
+    in the checkpoint folder. The checkpoints are cleared once the session succeeds.
+    """
+
+    def __init__(self, session_id, block_cache=None):
+        """
+        :param session_id: The session id
+        :param block_cache: The `BlockOutputCache` of the pipeline, None if disabled
+        """
+        self.session_id = session_id
+        self.checkpoint_dir = get_checkpoint_folder(session_id)
+        self.block_cache = block_cache
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(self.checkpoint_dir):
+            os.makedirs(self.checkpoint_dir)
+
+        self.manifest = self._load_manifest()
+
+        # The session can be resumed even if it fails before the first block is completed
+        self._write_manifest()
+
+    @staticmethod
+    def exists(session_id):
+        """Check a session has checkpoints to resume from"""
+        return os.path.isfile(os.path.join(get_checkpoint_folder(session_id), MANIFEST_FILE))
+
+    def _load_manifest(self):
+        manifest_file = os.path.join(self.checkpoint_dir, MANIFEST_FILE)
+
+        if not os.path.isfile(manifest_file):
+            return {'created': time.time(), 'blocks': {}}
+
+        with open(manifest_file) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        manifest_file = os.path.join(self.checkpoint_dir, MANIFEST_FILE)
+        tmp_file = manifest_file + '.tmp'
+
+        with open(tmp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=4, sort_keys=True)
+        os.replace(tmp_file, manifest_file)
+
+    def is_completed(self, block_name, fingerprint):
+        """
+        Check the block was executed with the same fingerprint
+        :param block_name: The name of the block
+        :param fingerprint: The fingerprint of the block
+        :return: True if its output can be restored
+        """
+        checkpoint = self.manifest['blocks'].get(block_name)
+
+        if checkpoint is None or checkpoint['fingerprint'] != fingerprint:
+            return False
+
+        # The cached output can be evicted from the cache
+        if 'cache_key' in checkpoint:
+            return self.block_cache is not None and checkpoint['cache_key'] in self.block_cache
+
+        return os.path.isfile(os.path.join(self.checkpoint_dir, checkpoint['file']))
+
+    def save(self, block, fingerprint, cache_key=None):
+        """
+        Save the output of an executed block
+        :param block: The block
+        :param fingerprint: The fingerprint of the block
+        :param cache_key: The key of the output in the block cache, None if it's not cached
+        """
+        checkpoint = {
+            'fingerprint': fingerprint,
+            'finished': time.time()
+        }
+
+        if cache_key is not None and self.block_cache is not None and cache_key in self.block_cache:
+            checkpoint['cache_key'] = cache_key
+        else:
+            import joblib
+
+            checkpoint['file'] = '{}.pkl'.format(block.name)
+            file_path = os.path.join(self.checkpoint_dir, checkpoint['file'])
+
+            joblib.dump(block.get_output(), file_path + '.tmp')
+            os.replace(file_path + '.tmp', file_path)
+
+        with self._lock:
+            self.manifest['blocks'][block.name] = checkpoint
+            self._write_manifest()
+
+    def restore(self, block):
+        """
+        Restore the output of a completed block, the numpy arrays are memory-mapped
+        :param block: The block
+        """
+        checkpoint = self.manifest['blocks'][block.name]
+
+        if 'cache_key' in checkpoint:
+            block.set_output(self.block_cache.load(checkpoint['cache_key']))
+            return
+
+        import joblib
+
+        block.set_output(joblib.load(os.path.join(self.checkpoint_dir, checkpoint['file']), mmap_mode='c'))
+
+    def clear(self):
+        """Remove the checkpoints of the session, once it succeeded"""
+        with self._lock:
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+            self.manifest['blocks'] = {}
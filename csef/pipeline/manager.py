@@ -4,8 +4,12 @@ import json
 import os
 from datetime import datetime
 import traceback
-
-import pandas as pd
+import sys
+import gc
+import threading
+import time
+import tempfile
+from glob import glob
 
 from os import listdir
 from os.path import isfile, join
@@ -13,12 +17,16 @@ from os.path import isfile, join
 from csef.utils.helper import load_class, dir_init, get_proj_home, dict_deep_update
 from csef.utils.git import get_commit_id, get_global_username
 from csef.utils.design_patterns import SingletonDecorator
-from csef.utils.google_datastore import GoogleDataStore
-from csef.utils.google_storage import GoogleStorage
+from csef.utils.result_store import get_result_store
+from csef.utils.transfer import TransferEngine, GoogleStorageBucket
 from csef.utils.logging import getLogger
+from csef.utils.log_shipper import get_log_shipper
+from csef.utils.resource_usage import format_bytes
 from csef.session import SessionManager
-
-from csef.utils.ensembles import generate_submission_avg, generate_submission_geomean, generate_submission_rankavg, generate_submission_vote
+from csef.pipeline.scheduler import BlockGraph, SerialExecutor, get_input_names
+from csef.pipeline.cache import BlockOutputCache
+from csef.pipeline.checkpoint import SessionCheckpoint
+from csef.pipeline.profiling import BlockProfiler, describe_output, get_total_bytes
 
 
 logger = getLogger(logger_name=__name__)
@@ -39,10 +47,28 @@ def load_config(config_file):
 class PipelineRecorder(object):
     """
     PipelineRecorder
+
+    The records are pushed behind: `push` only sends the sessions with changes, at most every
+    `push_interval` seconds (a timer pushes the pending changes), and `finish` pushes the rest.
+    The result store can't update a part of an entity, each push sends and normalizes the whole session entity,
+    so it's kept small instead: the large arrays are dumped to the stats files and replaced by their reference.
     """
 
     _cache = {}
 
+    # The values sent to the remote storage, with the large arrays replaced, and the keys changed since the last push
+    _payload = {}
+    _dirty = {}
+    _last_push = {}
+    _timer = None
+    _lock = threading.RLock()
+
+    # The minimum delay in seconds between two pushes of a session
+    push_interval = 30
+
+    # The arrays or lists with more elements are dumped to the stats files
+    max_embedded_size = 1000
+
     session_id = None
     config_file = None
     remote_log = False
@@ -66,20 +92,77 @@ class PipelineRecorder(object):
         :return: Self
         """
 
-        # Init the session when start the recording
-        if self.session_id not in self._cache:
-            self._cache[self.session_id] = {}
+        with self._lock:
+            # Init the session when start the recording
+            if self.session_id not in self._cache:
+                self._cache[self.session_id] = {}
 
-        self._cache[self.session_id] = dict_deep_update(self._cache[self.session_id], data)
+            self._cache[self.session_id] = dict_deep_update(self._cache[self.session_id], data)
+            self._dirty.setdefault(self.session_id, set()).update(data.keys())
 
         return self
 
-    def push(self):
+    def _externalize(self, session_id, path, value):
+        """Replace the large arrays of a value by the reference of their stats file"""
+        if isinstance(value, dict):
+            return {k: self._externalize(session_id, path + [str(k)], v) for k, v in value.items()}
+
+        # The value can't be a numpy array if numpy is not imported
+        numpy = sys.modules.get('numpy')
+        is_array = isinstance(value, list) or (numpy is not None and isinstance(value, numpy.ndarray))
+
+        if is_array and len(value) > self.max_embedded_size:
+            key = '.'.join(path)
+            self.dump_stats(key, value, session_id)
+            return {'stats_ref': key}
+
+        return value
+
+    def _push_session(self, session_id):
+        with self._lock:
+            dirty_keys = self._dirty.pop(session_id, set())
+            if not dirty_keys:
+                return
+
+            payload = self._payload.setdefault(session_id, {})
+            data = self._cache[session_id]
+            for key in dirty_keys:
+                payload[key] = self._externalize(session_id, [str(key)], data[key])
+
+            self._last_push[session_id] = time.time()
+            payload = dict(payload)
+
+        get_result_store().upsert_pipeline_result(payload, session_id)
+
+    def _push_pending(self):
+        with self._lock:
+            self._timer = None
+            session_ids = list(self._dirty)
+
+        for session_id in session_ids:
+            self._push_session(session_id)
+
+    def push(self, force=False):
         """
-        Push the current data to remote storage (Google datastore).
+        Push the changes of the current session to remote storage (Google datastore).
+        :param force: Push now even if the last push is too recent
         :return: Self
         """
-        GoogleDataStore().upsert_pipeline_result(self._cache[self.session_id])
+        with self._lock:
+            if not self._dirty.get(self.session_id):
+                return self
+
+            wait_time = self.push_interval - (time.time() - self._last_push.get(self.session_id, 0))
+
+            if not force and wait_time > 0:
+                # Push the pending changes later
+                if self._timer is None:
+                    self._timer = threading.Timer(wait_time, self._push_pending)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return self
+
+        self._push_session(self.session_id)
 
         return self
 
@@ -91,13 +174,32 @@ class PipelineRecorder(object):
         """
         return self.record(data).push()
 
+    def finish(self):
+        """
+        Push all pending changes now
+        :return: Self
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        self._push_pending()
+
+        return self
+
     def pull_session(self, session_id):
         """
         Pull data for a session from the remote storage
         :param session_id: The session id need to pull data.
         :return: Self
         """
-        self._cache[session_id] = GoogleDataStore().get_result_by_session(session_id)
+        data = get_result_store().get_result_by_session(session_id)
+
+        with self._lock:
+            self._cache[session_id] = data
+            self._payload[session_id] = dict(data) if data else {}
+            self._dirty.pop(session_id, None)
         return self
 
     def get_session(self, session_id):
@@ -121,7 +223,10 @@ class PipelineRecorder(object):
         :param session_id: The session need to clean
         :return: Self
         """
-        self._cache[session_id] = {}
+        with self._lock:
+            self._cache[session_id] = {}
+            self._payload.pop(session_id, None)
+            self._dirty.pop(session_id, None)
         return self
 
     def clean_current_session(self):
@@ -132,19 +237,53 @@ class PipelineRecorder(object):
         """
         return self.clean_session(self.session_id)
 
-    def dump_stats(self, key, data):
+    def _get_stats_store(self, session_id=None):
+        from csef.utils.stats_store import StatsStore
+
+        if session_id is None:
+            session_id = self.session_id
+
+        return StatsStore(os.path.join(os.environ['PROJ_HOME'], 'models', str(session_id)))
+
+    def dump_stats(self, key, data, session_id=None):
         """
-        Some stats too big and can not save to google datastore, so need to save to json file to read later
+        Some stats too big and can not save to google datastore, so need to save to the stats files to read later.
+        The numeric arrays are saved natively.
         :param data: The data need to save
         :param key: The key quick be used as name for the file.
+        :param session_id: The session of the stats, default is the current session
+        """
+        self._get_stats_store(session_id).write(key, data)
+
+    def append_stats(self, key, name, values, session_id=None):
+        """
+        Append values to a series of the stats, e.g. the eval metric while training
+        :param key: The key of the stats
+        :param name: The name of the series
+        :param values: A value or an array of values
+        :param session_id: The session of the stats, default is the current session
+        """
+        self._get_stats_store(session_id).append(key, name, values)
+
+    def load_stats(self, key, session_id=None, lazy=True):
+        """
+        Load the stats dumped by a session, also the JSON files of the older sessions
+        :param key: The key of the stats
+        :param session_id: The session of the stats, default is the current session
+        :param lazy: Memory-map the arrays instead of reading them
+        :return: The data
         """
-        file_path = os.path.join(os.environ['PROJ_HOME'], 'models', str(self.session_id), key + '.json')
+        stats_store = self._get_stats_store(session_id)
 
-        # Some data can be
-        data = GoogleDataStore().normalize_data(data)
+        if key in stats_store:
+            return stats_store.read(key, lazy=lazy)
 
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=4, sort_keys=True, default=str)
+        json_file = os.path.join(stats_store.folder, key + '.json')
+        if not os.path.isfile(json_file):
+            raise KeyError('No stats {} in {}'.format(key, stats_store.folder))
+
+        with open(json_file) as f:
+            return json.load(f)
 
 
 @SingletonDecorator
@@ -154,6 +293,8 @@ class PipelineStorageManager(object):
     config_file = None
     remote_log = False
 
+    _transfer_engine = None
+
     # Assume this bucket created by console browser
     # TODO: think about how to reuse this for another project
     bucket_name = 'ml-hcdr-bucket'
@@ -190,24 +331,20 @@ class PipelineStorageManager(object):
         submission_file_name = 'submissions/{}'.format(submission_file_name)
         source_file_name = os.path.join(os.environ['PROJ_HOME'], submission_file_name)
 
-        GoogleStorage().upload_blob(self.bucket_name, source_file_name, submission_file_name)
+        self._get_transfer_engine().upload_files({source_file_name: submission_file_name}, prefix='submissions')
         print('Uploaded submission file {}'.format(source_file_name))
 
+    def _get_transfer_engine(self):
+        if self._transfer_engine is None:
+            self._transfer_engine = TransferEngine(GoogleStorageBucket(self.bucket_name))
+        return self._transfer_engine
+
     def sync_submission_files(self):
         """ Download all submission file to local """
-        blobs = GoogleStorage().list_blobs_with_prefix(self.bucket_name, 'submissions')
-
-        for blob in blobs:
-            destination_file_name = os.path.join(os.environ['PROJ_HOME'], blob.name)
-
-            # Check if the local file exist before download file
-            if not os.path.isfile(destination_file_name):
-                blob.download_to_filename(destination_file_name)
-                print('Downloaded file {destination_file_name}'.format(destination_file_name=destination_file_name))
+        self.sync_files('submissions')
 
     def sync_files(self, folder):
         """Sync file from storage to local"""
-        blobs = GoogleStorage().list_blobs_with_prefix(self.bucket_name, folder)
 
         # Create the session folder if not existing
         project_home = os.environ['PROJ_HOME']
@@ -215,38 +352,14 @@ class PipelineStorageManager(object):
         if not os.path.isdir(root_folder):
             os.makedirs(root_folder)
 
-        # Start download files
-        for blob in blobs:
-            destination_file_name = os.path.join(project_home, blob.name)
-
-            # Check if the local file exist before download file
-            if not os.path.isfile(destination_file_name):
-
-                # Create folder to avoid exception when download
-                destination_file_folder = os.path.dirname(destination_file_name)
-                if not os.path.isdir(destination_file_folder):
-                    os.makedirs(destination_file_folder)
-
-                blob.download_to_filename(destination_file_name)
-                print('Downloaded file {}'.format(destination_file_name))
+        # Download the missing and changed files in parallel
+        self._get_transfer_engine().sync_folder(folder, project_home)
 
     def upload_files(self, folder):
         """Upload file from local to storage"""
 
-        # Load all blobs in the session to make sure only upload needed files
-        blobs = GoogleStorage().list_blobs_with_prefix(self.bucket_name, folder)
-        blobs = [blob.name for blob in blobs]
-
-        project_home = os.environ['PROJ_HOME']
-        root_folder = os.path.join(project_home, folder)
-
-        for file in os.listdir(root_folder):
-            file_name = "{folder}/{file}".format(folder=folder, file=file)
-            if file_name not in blobs:
-                source_file_name = os.path.join(project_home, file_name)
-                GoogleStorage().upload_blob(
-                    self.bucket_name, source_file_name, file_name)
-                print('Uploaded file {}'.format(source_file_name))
+        # Only the new and changed files are uploaded
+        self._get_transfer_engine().upload_folder(folder, os.environ['PROJ_HOME'])
 
     def upload_training_files(self, session_id):
         """Upload training files (in models folder) of a session id"""
@@ -266,6 +379,8 @@ class PipelineStorageManager(object):
 
         # Try to compress the data before upload
         if compress:
+            import pandas as pd
+
             project_home = os.environ['PROJ_HOME']
             root_folder = os.path.join(project_home, data_folder)
 
@@ -298,6 +413,8 @@ class PipelineStorageManager(object):
     def reformat_submission_files(self, submission_local_path=None):
         """ Re-format the values of the submission files at locally if need """
         if submission_local_path is not None:
+            import pandas as pd
+
             sub_files = [f for f in listdir(submission_local_path) if isfile(join(submission_local_path, f))]
             for sub_file in sub_files:
                 submission_local_file_path = '{}/{}'.format(submission_local_path, sub_file)
@@ -309,36 +426,48 @@ class PipelineStorageManager(object):
                     os.remove(submission_local_file_path)
 
     def ensembling_submission_files(self, kind_of_ensembles_supported=None):
+        from csef.utils.ensembles import blend_submission_files, generate_submissions, get_file_weights
+
         if kind_of_ensembles_supported is None:
             kind_of_ensembles_supported = ['vote', 'vote_weighted',
                                            'rankavg', 'avg', 'geomean']
 
-            # Save ensembled submissions file in `ensemble-submissions` folder at root project
-            ensemble_submission_local_path = os.path.join(os.environ['PROJ_HOME'], 'ensemble-submissions')
+        # Save ensembled submissions file in `ensemble-submissions` folder at root project
+        ensemble_submission_local_path = os.path.join(os.environ['PROJ_HOME'], 'ensemble-submissions')
+
+        # Create directory if doesn't exist
+        # Delete the contents of a current directory
+        dir_init(ensemble_submission_local_path)
+
+        # The ties of the votes are won by the first file, in the glob order
+        submission_files = glob('./submissions/*.csv')
+
+        if len(submission_files) < 1:
+            return
+
+        outputs = []
+        for kind_of_ensemble in kind_of_ensembles_supported:
+            ensemble_submission_file_name = self \
+                .generate_ensemble_submission_filename(kind_of_ensemble)
+            ensemble_submission_file_name = 'ensemble-submissions/{}'.format(ensemble_submission_file_name)
+
+            # The votes are on the values as written in the files, so they're streamed from the files
+            if kind_of_ensemble == 'vote':
+                blend_submission_files(submission_files, ensemble_submission_file_name, method='vote')
+            elif kind_of_ensemble == 'vote_weighted':
+                blend_submission_files(submission_files, ensemble_submission_file_name, method='vote',
+                                       weights=get_file_weights(submission_files, weights='weighted'))
+            elif kind_of_ensemble in ['rankavg', 'avg', 'geomean']:
+                outputs.append((ensemble_submission_file_name, kind_of_ensemble, None))
+            else:
+                print('{} does not support now!'.format(kind_of_ensemble))
 
-            # Create directory if doesn't exist
-            # Delete the contents of a current directory
-            dir_init(ensemble_submission_local_path)
-
-            for kind_of_ensemble in kind_of_ensembles_supported:
-                ensemble_submission_file_name = self \
-                    .generate_ensemble_submission_filename(kind_of_ensemble)
-                ensemble_submission_file_name = 'ensemble-submissions/{}'.format(ensemble_submission_file_name)
-
-                if kind_of_ensemble == 'vote':
-                    generate_submission_vote('./submissions/*.csv', ensemble_submission_file_name)
-                elif kind_of_ensemble == 'vote_weighted':
-                    # FIXME: Current this approach same the result with `vote`
-                    generate_submission_vote('./submissions/*.csv', ensemble_submission_file_name, weights='weighted')
-                elif kind_of_ensemble == 'rankavg':
-                    generate_submission_rankavg('./submissions/*.csv', ensemble_submission_file_name)
-                elif kind_of_ensemble == 'avg':
-                    generate_submission_avg('./submissions/*.csv', ensemble_submission_file_name)
-                elif kind_of_ensemble == 'geomean':
-                    generate_submission_geomean('./submissions/*.csv', ensemble_submission_file_name)
+        if len(outputs) < 1:
+            return
 
-        else:
-            print('{} does not support now!'.format(kind_of_ensemble))
+        # Read all submission files once into a memory-mapped matrix, then write every ensemble from it
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            generate_submissions(submission_files, outputs, mmap_path=os.path.join(tmp_dir, 'submissions.f32'))
 
     def sync_and_ensemble_top_submission_files(self, sids):
         """
@@ -350,27 +479,20 @@ class PipelineStorageManager(object):
         if len(sids) < 1:
             self.sync_submission_files()
         else:
-            blobs = GoogleStorage().list_blobs_with_prefix(self.bucket_name, 'submissions')
             submission_local_path = os.path.join(os.environ['PROJ_HOME'], 'submissions')
+            session_ids = set(str(sid) for sid in sids)
 
             # Create directory if doesn't exist
             # Delete the contents of a current directory
             dir_init(submission_local_path)
 
-            for blob in blobs:
-                for sid in sids:
-                    session_id = str(sid)
-                    # Hard code to download only stable version
-                    if (session_id in blob.name) and ('stable' in blob.name):
-                        destination_file_name = os.path.join(os.environ['PROJ_HOME'], blob.name)
+            def is_top_submission(remote_file):
+                # The submission file name ends with `.{tag}.{session_id}.csv`
+                # Hard code to download only stable version
+                parts = os.path.splitext(os.path.basename(remote_file.name))[0].rsplit('.', 2)
+                return len(parts) == 3 and parts[1] == 'stable' and parts[2] in session_ids
 
-                        # Check if the local file exist before download file
-                        if not os.path.isfile(destination_file_name):
-                            blob.download_to_filename(destination_file_name)
-                            print('Downloaded file {}'.format(destination_file_name))
-
-                        # Break out from the inside loop
-                        break
+            self._get_transfer_engine().sync_folder('submissions', os.environ['PROJ_HOME'], is_top_submission)
 
             # Re-format the submission files before blending
             self.reformat_submission_files(submission_local_path)
@@ -388,7 +510,20 @@ class PipelineManager(object):
     finished = False
     is_error = False
     _blocks = []
+    _graph = None
     _current_idx = 0
+    executor = None
+    block_cache = None
+    checkpoint = None
+    _cache_keys = {}
+    _fingerprints = {}
+    release_outputs = True
+    _consumers_left = {}
+    _release_lock = threading.Lock()
+    profiler = None
+
+    # The session props changing the outputs of the blocks, they are part of the cache keys
+    cache_context_props = ['data_version', 'data_tag', 'data_extension', 'make_submission', 'sample', 'seed']
 
     def _get_inputs(self, input_keys):
 
@@ -398,14 +533,140 @@ class PipelineManager(object):
         outputs = {}
 
         # The input_keys can be list or single string
-        input_keys_list = input_keys if type(input_keys) == list else [input_keys]
+        input_keys_list = get_input_names(input_keys)
 
-        for block in self._blocks:
-            if block.name in input_keys_list and block.executed:
+        for input_key in input_keys_list:
+            block = self._graph[input_key]
+            if block.executed:
                 outputs[block.name] = block.get_output()
 
         return outputs if len(input_keys_list) > 1 else outputs[input_keys]
 
+    def _build_executor(self, executor_definition=None):
+        """
+        Build the executor of the blocks from the `executor` config, default is the serial executor
+        :param executor_definition: The dict with `class_name` and `config` of the executor
+        :return: The executor
+        """
+        if not executor_definition:
+            return SerialExecutor()
+
+        return load_class(executor_definition['class_name'])(executor_definition.get('config', {}))
+
+    def _build_block_cache(self, cache_definition=None):
+        """
+        Build the cache of the block outputs from the `block_cache` config, it's enabled by default
+        :param cache_definition: The dict with `enabled`, `cache_dir` and `max_size_mb`, or False
+        :return: The cache or None if disabled
+        """
+        if cache_definition is False:
+            return None
+
+        cache_definition = dict({
+            'enabled': True,
+            'cache_dir': os.path.join(get_proj_home(), 'cache', 'blocks'),
+            'max_size_mb': 20480
+        }, **(cache_definition or {}))
+
+        if not cache_definition['enabled']:
+            return None
+
+        return BlockOutputCache(cache_definition['cache_dir'], cache_definition['max_size_mb'])
+
+    def _get_cache_key(self, block):
+        """The cache key of the block, None if the block or one of its upstream blocks can't be cached"""
+        if self.block_cache is None or not block.cacheable:
+            return None
+
+        upstream_keys = [self._cache_keys.get(name) for name in get_input_names(block.inputs_from)]
+        if None in upstream_keys:
+            return None
+
+        context = {prop: SessionManager().get_prop(prop) for prop in self.cache_context_props}
+
+        return self.block_cache.get_key(block, upstream_keys, context)
+
+    def _get_fingerprint(self, block):
+        """The fingerprint of the block in the session, its class, config and upstream fingerprints"""
+        upstream_fingerprints = [self._fingerprints[name] for name in get_input_names(block.inputs_from)]
+
+        return BlockOutputCache.get_key(block, upstream_fingerprints)
+
+    def _execute_block(self, block):
+        inputs_description = {name: describe_output(self._graph[name].get_output())
+                              for name in get_input_names(block.inputs_from)}
+
+        stats, reports = self.profiler.profile(lambda: self._execute_or_restore_block(block))
+
+        stats.update({
+            'inputs': inputs_description,
+            'outputs': describe_output(block.get_output())
+        })
+        stats['output_bytes'] = get_total_bytes(stats['outputs'])
+
+        logger.info('###### Profile of the block {}: {:.2f}s wall, {:.2f}s CPU, peak RSS {} (before: {})'
+                    .format(block.name, stats['wall_time'], stats['cpu_time'],
+                            format_bytes(stats['peak_rss']), format_bytes(stats['rss_before'])))
+
+        PipelineRecorder().record({
+            'block_stats': {
+                block.name: stats
+            }
+        })
+
+        if reports:
+            PipelineRecorder().dump_stats('profile-{}'.format(block.name), reports)
+
+        if self.release_outputs:
+            self._release_inputs(block)
+
+    def _release_inputs(self, block):
+        """Release the outputs of the upstream blocks of a finished block when it was their last consumer"""
+        released_blocks = []
+
+        with self._release_lock:
+            for name in get_input_names(block.inputs_from):
+                self._consumers_left[name] -= 1
+                if self._consumers_left[name] == 0:
+                    released_blocks.append(self._graph[name])
+
+        for released_block in released_blocks:
+            logger.info('###### Releasing the output of the block: {}'.format(released_block.name))
+            released_block.clean()
+
+        if released_blocks:
+            gc.collect()
+
+    def _execute_or_restore_block(self, block):
+        fingerprint = self._fingerprints[block.name] = self._get_fingerprint(block)
+
+        # Restore the blocks completed before the session failed
+        if self.checkpoint is not None and self.checkpoint.is_completed(block.name, fingerprint):
+            logger.info('###### Restoring the checkpoint of the block: {} ...'.format(block.name))
+            self.checkpoint.restore(block)
+            self._cache_keys[block.name] = self._get_cache_key(block)
+            return
+
+        self._execute_block_with_cache(block)
+
+        # The output already in the block cache is only referenced by its cache key
+        if self.checkpoint is not None:
+            self.checkpoint.save(block, fingerprint, self._cache_keys[block.name])
+
+    def _execute_block_with_cache(self, block):
+        cache_key = self._cache_keys[block.name] = self._get_cache_key(block)
+
+        if cache_key is not None and not SessionManager().get_prop('refresh_cache') and cache_key in self.block_cache:
+            logger.info('###### Loading the cached output of the block: {} ...'.format(block.name))
+            block.set_output(self.block_cache.load(cache_key))
+            return
+
+        inputs = self._get_inputs(block.inputs_from)
+        block.execute(inputs)
+
+        if cache_key is not None:
+            self.block_cache.save(cache_key, block.get_output(), block.name)
+
     def init(self, config, args):
         """
         The class manage the pipeline with config and args.
@@ -423,10 +684,31 @@ class PipelineManager(object):
             'commit_id': get_commit_id(),
             'owner': get_global_username()
         })
-        SessionManager().renew(args)
+
+        # Resume a failed session with its session id
+        resume_session_id = args.get('resume')
+        if resume_session_id is not None:
+            if not SessionCheckpoint.exists(resume_session_id):
+                raise ValueError('No checkpoint to resume the session {}'.format(resume_session_id))
+
+            if str(resume_session_id).isdigit():
+                resume_session_id = int(resume_session_id)
+
+        SessionManager().renew(args, session_id=resume_session_id)
         session_id = SessionManager().session_id
 
-        logger.info("### Start the pipeline session id {}".format(session_id))
+        # Checkpoint the executed blocks to be able to resume the session
+        self.block_cache = self._build_block_cache(config.get('block_cache'))
+
+        if config.get('checkpoint', True) or resume_session_id is not None:
+            self.checkpoint = SessionCheckpoint(session_id, self.block_cache)
+        else:
+            self.checkpoint = None
+
+        if resume_session_id is None:
+            logger.info("### Start the pipeline session id {}".format(session_id))
+        else:
+            logger.info("### Resume the pipeline session id {}".format(session_id))
         logger.info("### {}".format(args))
 
         # Starting record the session
@@ -436,6 +718,12 @@ class PipelineManager(object):
             'metadata': config['metadata'],
             'is_finished': False
         })
+        if resume_session_id is not None:
+            pipeline_data.update({
+                'created': datetime.fromtimestamp(self.checkpoint.manifest['created']),
+                'resumed_on': datetime.now(),
+                'error': None
+            })
         PipelineRecorder().record_and_push(pipeline_data)
 
         self.running = False
@@ -464,6 +752,17 @@ class PipelineManager(object):
 
             self._blocks.append(block_instance)
 
+        # The `inputs_from` of the blocks make the graph to schedule them
+        self._graph = BlockGraph(self._blocks)
+        self.executor = self._build_executor(config.get('executor'))
+        self.profiler = BlockProfiler(config.get('profiling'))
+        self._cache_keys = {}
+        self._fingerprints = {}
+
+        # Count the consumers of each output to release it after the last one, the final outputs are kept
+        self.release_outputs = config.get('release_outputs', True)
+        self._consumers_left = {name: len(dependents) for name, dependents in self._graph.dependents.items()}
+
         return self
 
     def run(self):
@@ -471,9 +770,7 @@ class PipelineManager(object):
         self.running = True
 
         try:
-            for block in self._blocks:
-                inputs = self._get_inputs(block.inputs_from)
-                block.execute(inputs)
+            self.executor.run(self._graph, self._execute_block)
 
             self.is_error = False
         except:
@@ -499,12 +796,25 @@ class PipelineManager(object):
         self.running = False
 
         # Finish the session
-        PipelineRecorder().record_and_push({
+        # Keep the profile of the blocks with the session files
+        block_stats = PipelineRecorder().get_current_session().get('block_stats')
+        if block_stats:
+            PipelineRecorder().dump_stats('block_stats', block_stats)
+
+        PipelineRecorder().record({
             'is_finished': True,
             'is_error': self.is_error,
             'finished_on': datetime.now()
-        })
+        }).finish()
+
+        # The checkpoints are only kept to resume a failed session
+        if self.checkpoint is not None and not self.is_error:
+            self.checkpoint.clear()
 
         logger.info("### Finished the pipeline session id {}".format(SessionManager().session_id))
 
+        # Ship the remaining logs
+        if SessionManager().get_prop('remote_log'):
+            get_log_shipper().flush(timeout=30)
+
         return self
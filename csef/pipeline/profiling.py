@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Timing, memory and size instrumentation of the pipeline blocks."""
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+
+from csef.utils.resource_usage import get_current_rss, get_peak_rss, reset_peak_rss
+
+
+def describe_value(value):
+    """
+    Describe the type, the shape and the size in bytes of a value
+    :param value: The value, e.g. a DataFrame or a numpy array
+    :return: The dict of the description
+    """
+    description = {'type': type(value).__name__}
+
+    # The value can't be a numpy array or a pandas object if they're not imported
+    np = sys.modules.get('numpy')
+    pd = sys.modules.get('pandas')
+
+    if pd is not None and isinstance(value, pd.DataFrame):
+        description['shape'] = list(value.shape)
+        description['bytes'] = int(value.memory_usage(index=True).sum())
+    elif pd is not None and isinstance(value, pd.Series):
+        description['shape'] = list(value.shape)
+        description['bytes'] = int(value.memory_usage(index=True))
+    elif np is not None and isinstance(value, np.ndarray):
+        description['shape'] = list(value.shape)
+        description['bytes'] = int(value.nbytes)
+    elif isinstance(value, (list, tuple, dict)):
+        description['shape'] = [len(value)]
+
+    return description
+
+
+def describe_output(output):
+    """Describe each value of the output dict of a block"""
+    if not isinstance(output, dict):
+        return {}
+
+    return {key: describe_value(value) for key, value in output.items() if value is not None}
+
+
+def get_total_bytes(descriptions):
+    """Sum the bytes of the described values"""
+    return sum(description.get('bytes', 0) for description in descriptions.values())
+
+
+class BlockProfiler(object):
+    """
+    Profile the execution of a block: wall time, CPU time, peak RSS and its delta, and optionally
+    the top functions of cProfile and the top allocations of tracemalloc.
+
+    The CPU time and the peak RSS are for the process, with the parallel executor they include
+    the blocks running at the same time.
+    """
+
+    config = {
+        'cprofile': False,
+        'tracemalloc': False,
+        'top_n': 20
+    }
+
+    def __init__(self, config=None):
+        self.config = dict(self.config, **(config or {}))
+
+        if self.config['tracemalloc'] and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def profile(self, func):
+        """
+        Run and profile a function
+        :param func: The function without argument, e.g. the execution of a block
+        :return: The dict of the stats and the dict of the reports (too big to be recorded)
+        """
+        reset_peak_rss()
+        rss_before = get_current_rss()
+        snapshot_before = tracemalloc.take_snapshot() if self.config['tracemalloc'] else None
+        profiler = cProfile.Profile() if self.config['cprofile'] else None
+
+        start_time = time.time()
+        start_cpu_time = time.process_time()
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            func()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+        stats = {
+            'wall_time': time.time() - start_time,
+            'cpu_time': time.process_time() - start_cpu_time,
+            'rss_before': rss_before,
+            'peak_rss': get_peak_rss(),
+        }
+        stats['peak_rss_delta'] = stats['peak_rss'] - rss_before if rss_before is not None else None
+
+        reports = {}
+
+        if profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(self.config['top_n'])
+            reports['cprofile'] = stream.getvalue()
+
+        if snapshot_before is not None:
+            top_stats = tracemalloc.take_snapshot().compare_to(snapshot_before, 'lineno')
+            reports['tracemalloc'] = [str(stat) for stat in top_stats[:self.config['top_n']]]
+
+        return stats, reports
+
+
+REPORT_METRICS = ['wall_time', 'cpu_time', 'peak_rss_delta', 'output_bytes']
+
+
+def build_profile_report(block_stats_by_session, metrics=None):
+    """
+    Build the table comparing the profile of the blocks between sessions
+    :param block_stats_by_session: The dict of session id to the `block_stats` of the session
+    :param metrics: The list of metrics to compare, default is `REPORT_METRICS`
+    :return: The DataFrame with one row per block and one column per metric and session
+    """
+    import pandas as pd
+
+    if metrics is None:
+        metrics = REPORT_METRICS
+
+    # The blocks in the order they appear in the sessions
+    block_names = []
+    for block_stats in block_stats_by_session.values():
+        block_names += [block_name for block_name in block_stats if block_name not in block_names]
+
+    report = pd.DataFrame(index=block_names)
+    for metric in metrics:
+        for session_id, block_stats in block_stats_by_session.items():
+            report['{}[{}]'.format(metric, session_id)] = [block_stats.get(block_name, {}).get(metric)
+                                                           for block_name in block_names]
+
+    return report
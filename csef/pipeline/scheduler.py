@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from csef.utils.logging import getLogger
+
+
+logger = getLogger(logger_name=__name__)
+
+
+def get_input_names(inputs_from):
+    """
+    Get the list of block names from the `inputs_from` of a block
+    :param inputs_from: The name, the list of names or None
+    :return: The list of names
+    """
+    if not inputs_from:
+        return []
+
+    return inputs_from if type(inputs_from) == list else [inputs_from]
+
+
+class BlockGraph(object):
+    """The DAG of the pipeline blocks, an edge goes from a block to the blocks taking its output"""
+
+    def __init__(self, blocks):
+        """
+        :param blocks: The list of blocks in the order of the config
+        """
+        self.blocks = blocks
+        self.index = {}
+        self.dependencies = {}
+        self.dependents = {}
+
+        for block in blocks:
+            if block.name in self.index:
+                raise ValueError('The block name {} is duplicated!'.format(block.name))
+            self.index[block.name] = block
+            self.dependents[block.name] = []
+
+        for block in blocks:
+            self.dependencies[block.name] = get_input_names(block.inputs_from)
+
+            for input_name in self.dependencies[block.name]:
+                if input_name not in self.index:
+                    raise ValueError('The block {} takes inputs from an unknown block {}!'
+                                     .format(block.name, input_name))
+                self.dependents[input_name].append(block.name)
+
+        self.order = self._sort()
+
+    def _sort(self):
+        """Sort the blocks in a topological order, the blocks ready at the same time keep the config order"""
+        n_pending = {name: len(dependencies) for name, dependencies in self.dependencies.items()}
+        position = {block.name: i for i, block in enumerate(self.blocks)}
+
+        ready = [block.name for block in self.blocks if n_pending[block.name] == 0]
+        order = []
+
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+
+            for dependent in self.dependents[name]:
+                n_pending[dependent] -= 1
+                if n_pending[dependent] == 0:
+                    ready.append(dependent)
+            ready.sort(key=position.get)
+
+        if len(order) < len(self.blocks):
+            raise ValueError('The pipeline has a cycle between the blocks {}!'
+                             .format([name for name in n_pending if n_pending[name] > 0]))
+
+        return order
+
+    def __getitem__(self, name):
+        return self.index[name]
+
+    def __contains__(self, name):
+        return name in self.index
+
+
+class SerialExecutor(object):
+    """Execute the blocks one by one in the topological order"""
+
+    def __init__(self, config=None):
+        self.config = config or {}
+
+    def run(self, graph, execute_block):
+        """
+        :param graph: The `BlockGraph` of the pipeline
+        :param execute_block: The function executing one block
+        """
+        for name in graph.order:
+            execute_block(graph[name])
+
+
+class ParallelExecutor(object):
+    """
+    Execute the independent blocks concurrently in a thread pool. A block starts as soon as
+    all blocks it takes inputs from are finished. The blocks share their outputs in memory,
+    so threads are used rather than processes, the heavy numpy/pandas work releases the GIL.
+    """
+
+    config = {
+        'n_workers': 4
+    }
+
+    def __init__(self, config=None):
+        self.config = dict(self.config, **(config or {}))
+
+    def run(self, graph, execute_block):
+        """
+        :param graph: The `BlockGraph` of the pipeline
+        :param execute_block: The function executing one block
+        """
+        n_pending = {name: len(dependencies) for name, dependencies in graph.dependencies.items()}
+        position = {name: i for i, name in enumerate(graph.order)}
+
+        with ThreadPoolExecutor(max_workers=int(self.config['n_workers'])) as pool:
+            running = {}
+
+            def submit(names):
+                for name in sorted(names, key=position.get):
+                    logger.info('###### Scheduling the block: {}'.format(name))
+                    running[pool.submit(execute_block, graph[name])] = name
+
+            submit([name for name in graph.order if n_pending[name] == 0])
+
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+
+                ready = []
+                for future in done:
+                    name = running.pop(future)
+
+                    error = future.exception()
+                    if error is not None:
+                        # Do not start new blocks, wait for the running ones and raise the error
+                        for other in running:
+                            other.cancel()
+                        raise error
+
+                    for dependent in graph.dependents[name]:
+                        n_pending[dependent] -= 1
+                        if n_pending[dependent] == 0:
+                            ready.append(dependent)
+
+                submit(ready)
@@ -16,7 +16,9 @@ class SessionManager(object):
         'make_submission': False,
         'sample': 1,
         'remote_log': False,
-        'remote_result': False
+        'remote_result': False,
+        'result_store': 'datastore',
+        'result_store_path': None
     }
 
     def renew(self, props, session_id=None):
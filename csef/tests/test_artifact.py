@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from csef.model.base import ARTIFACT_OPTIMIZER_FILE, BaseModel
+from csef.model.lstm import SimpleLSTM
+
+
+class ArtifactTestCase(unittest.TestCase):
+    """
+    Check a fitted model is restored from its artifact with the same weights, optimizer state and forecasts
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.model = SimpleLSTM({'n_input': 4, 'n_nodes': 3, 'n_batch': 2})
+
+        rng = np.random.RandomState(2018)
+        cls.model.fit(pd.DataFrame({
+            'series_id': np.repeat([1, 2], 20),
+            'consumption': rng.rand(40) * 100
+        }))
+        cls.windows = rng.rand(2, 4)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.artifact_path = os.path.join(self.folder, 'artifact')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _assert_same_model(self, loaded):
+        self.assertIsInstance(loaded, SimpleLSTM)
+        self.assertEqual(loaded.n_input, 4)
+
+        for expected, weights in zip(self.model.model.get_weights(), loaded.model.get_weights()):
+            np.testing.assert_array_equal(weights, expected)
+
+        self.model.reset_states()
+        loaded.reset_states()
+        np.testing.assert_allclose(loaded.forecast(self.windows, 3), self.model.forecast(self.windows, 3), rtol=1e-6)
+        np.testing.assert_array_equal(loaded.scaler_bank.series_ids, self.model.scaler_bank.series_ids)
+
+    def test_save_and_load_compiled(self):
+        self.model.save_artifact(self.artifact_path)
+        self.assertEqual(os.listdir(self.folder), ['artifact'])
+
+        loaded = BaseModel.load_artifact(self.artifact_path, compile=True)
+        self._assert_same_model(loaded)
+
+        expected_variables = BaseModel._get_optimizer_variables(self.model.model.optimizer)
+        variables = BaseModel._get_optimizer_variables(loaded.model.optimizer)
+        self.assertEqual(len(variables), len(expected_variables))
+        for expected, variable in zip(expected_variables, variables):
+            np.testing.assert_array_equal(variable.numpy(), expected.numpy())
+
+    def test_load_weights_only(self):
+        self.model.save_artifact(self.artifact_path)
+        os.remove(os.path.join(self.artifact_path, ARTIFACT_OPTIMIZER_FILE))
+
+        self._assert_same_model(BaseModel.load_artifact(self.artifact_path, compile=False))
+
+        # The artifact without optimizer state is still compiled
+        self._assert_same_model(BaseModel.load_artifact(self.artifact_path, compile=True))
+
+    def test_failed_save_keeps_no_files(self):
+        with mock.patch.object(self.model.scaler_bank, 'save', side_effect=IOError('Disk full')):
+            with self.assertRaises(IOError):
+                self.model.save_artifact(self.artifact_path)
+
+        self.assertEqual(os.listdir(self.folder), [])
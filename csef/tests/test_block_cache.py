@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from csef.pipeline.cache import BlockOutputCache, META_FILE
+
+
+class BlockOutputCacheTestCase(unittest.TestCase):
+    """
+    Check the least recently used entries are evicted first and the entry just saved is kept
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+        # About two outputs of 200 KB fit in the cache
+        self.cache = BlockOutputCache(self.folder, max_size_mb=0.5)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _save(self, key, used_time=None):
+        self.cache.save(key, np.full(25000, float(ord(key))), key)
+
+        if used_time is not None:
+            os.utime(os.path.join(self.folder, key, META_FILE), (used_time, used_time))
+
+    def _get_keys(self):
+        return sorted(key for key in os.listdir(self.folder) if key in self.cache)
+
+    def test_lru_eviction(self):
+        self._save('a', used_time=1000)
+        self._save('b', used_time=2000)
+        self.assertEqual(self._get_keys(), ['a', 'b'])
+
+        # Loading an entry makes it the most recently used
+        np.testing.assert_array_equal(self.cache.load('a'), np.full(25000, 97.))
+
+        self._save('c')
+        self.assertEqual(self._get_keys(), ['a', 'c'])
+
+        self._save('d')
+        self.assertEqual(self._get_keys(), ['c', 'd'])
+
+        # No temporary folder is left
+        self.assertEqual(sorted(os.listdir(self.folder)), ['c', 'd'])
+
+    def test_keep_the_saved_entry(self):
+        self._save('a', used_time=2000)
+        self._save('b', used_time=1000)
+
+        # The kept entry is not evicted even if it's the least recently used, or alone over the maximum size
+        self.cache.max_size = 1
+        self.cache.evict(keep='b')
+        self.assertEqual(self._get_keys(), ['b'])
+
+        self._save('c')
+        self.assertEqual(self._get_keys(), ['c'])
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from csef.pipeline.cache import BlockOutputCache
+from csef.pipeline.checkpoint import SessionCheckpoint
+
+
+class FakeBlock(object):
+    def __init__(self, name, output=None):
+        self.name = name
+        self.output = output
+
+    def get_output(self):
+        return self.output
+
+    def set_output(self, output):
+        self.output = output
+
+
+class SessionCheckpointTestCase(unittest.TestCase):
+    """
+    Check the cached outputs are only referenced, the others pickled, and the checkpoints can be cleared
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.env_patch = mock.patch.dict(os.environ, {'PROJ_HOME': self.folder})
+        self.env_patch.start()
+        self.block_cache = BlockOutputCache(os.path.join(self.folder, 'cache', 'blocks'))
+
+    def tearDown(self):
+        self.env_patch.stop()
+        shutil.rmtree(self.folder)
+
+    def test_cached_output_is_referenced(self):
+        checkpoint = SessionCheckpoint(1, self.block_cache)
+        block = FakeBlock('features', np.arange(10))
+
+        self.block_cache.save('abc', block.get_output(), block.name)
+        checkpoint.save(block, 'fingerprint', 'abc')
+
+        self.assertEqual(os.listdir(checkpoint.checkpoint_dir), ['checkpoint.json'])
+
+        restored = FakeBlock('features')
+        resumed = SessionCheckpoint(1, self.block_cache)
+        self.assertTrue(resumed.is_completed('features', 'fingerprint'))
+        self.assertFalse(resumed.is_completed('features', 'other'))
+        resumed.restore(restored)
+        np.testing.assert_array_equal(restored.get_output(), np.arange(10))
+
+        # The block is executed again once its output is evicted from the cache
+        shutil.rmtree(os.path.join(self.block_cache.cache_dir, 'abc'))
+        self.assertFalse(resumed.is_completed('features', 'fingerprint'))
+
+    def test_uncached_output_is_saved(self):
+        checkpoint = SessionCheckpoint(2, self.block_cache)
+        checkpoint.save(FakeBlock('model', {'score': 0.5}), 'fingerprint')
+
+        restored = FakeBlock('model')
+        resumed = SessionCheckpoint(2)
+        self.assertTrue(resumed.is_completed('model', 'fingerprint'))
+        resumed.restore(restored)
+        self.assertEqual(restored.get_output(), {'score': 0.5})
+
+    def test_clear(self):
+        self.assertFalse(SessionCheckpoint.exists(3))
+
+        checkpoint = SessionCheckpoint(3)
+        self.assertTrue(SessionCheckpoint.exists(3))
+
+        checkpoint.save(FakeBlock('model', [1, 2]), 'fingerprint')
+        checkpoint.clear()
+
+        self.assertFalse(os.path.isdir(checkpoint.checkpoint_dir))
+        self.assertFalse(SessionCheckpoint.exists(3))
+        self.assertFalse(checkpoint.is_completed('model', 'fingerprint'))
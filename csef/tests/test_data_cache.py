@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from csef.data import cache
+
+
+class DataCacheTestCase(unittest.TestCase):
+    """
+    Check the cached tables are read back the same and refreshed when the source file changes
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        df = pd.DataFrame({
+            'series_id': [100003, 100003, 100004],
+            'timestamp': pd.to_datetime(['2017-10-24 00:00', '2017-10-24 01:00', '2017-10-24 00:00']),
+            'consumption': [1.5, np.nan, 3.25],
+            'surface': ['medium', None, 'large']
+        }, index=pd.Index([7, 8, 9], name='pred_id'))
+
+        cache_dir = os.path.join(self.folder, 'table')
+        cache.write_table(df, cache_dir)
+        result = cache.read_table(cache_dir)
+
+        self.assertEqual(result.index.name, 'pred_id')
+        self.assertEqual(list(result.columns), list(df.columns))
+        np.testing.assert_array_equal(result.index.values, df.index.values)
+        np.testing.assert_array_equal(result['series_id'].values, df['series_id'].values)
+        np.testing.assert_array_equal(result['timestamp'].values, df['timestamp'].values)
+        np.testing.assert_allclose(result['consumption'].values, df['consumption'].values)
+        self.assertEqual(result['surface'].iloc[0], 'medium')
+        self.assertTrue(pd.isnull(result['surface'].iloc[1]))
+
+        _, arrays = cache.read_columns(cache_dir, columns=['consumption'])
+        self.assertEqual(sorted(arrays), ['__index__', 'consumption'])
+        self.assertIsInstance(arrays['consumption'], np.memmap)
+
+    def test_invalidation(self):
+        file_path = os.path.join(self.folder, 'meta.csv')
+        cache_path = os.path.join(self.folder, 'cache')
+
+        pd.DataFrame({'series_id': [1, 2], 'value': [0.5, 1.5]}).to_csv(file_path, index=False)
+        self.assertEqual(cache.load_csv(file_path, cache_path)['value'].tolist(), [0.5, 1.5])
+        first_dir = cache.get_table_cache_dir(file_path, cache_path)
+
+        pd.DataFrame({'series_id': [1, 2], 'value': [2.5, 3.5]}).to_csv(file_path, index=False)
+        self.assertEqual(cache.load_csv(file_path, cache_path)['value'].tolist(), [2.5, 3.5])
+
+        # The cache of the previous version is removed
+        second_dir = cache.get_table_cache_dir(file_path, cache_path)
+        self.assertNotEqual(second_dir, first_dir)
+        self.assertEqual(os.listdir(cache_path), [os.path.basename(second_dir)])
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import unittest
+from functools import reduce
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from csef.utils.ensembles import engine
+from csef.utils.ensembles.engine import SubmissionMerger, blend_submission_files, generate_submissions
+from csef.utils.ensembles.rank import rank_average
+
+
+class SubmissionFilesTestCase(unittest.TestCase):
+    """Write small submission files, the second one is not sorted by id"""
+
+    n_rows = 50
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+        rng = np.random.RandomState(2018)
+        self.files = []
+        for i in range(3):
+            df = pd.DataFrame({'pred_id': np.arange(self.n_rows) * 3, 'consumption': rng.rand(self.n_rows) * 100})
+            if i == 1:
+                df = df.sample(frac=1, random_state=rng)
+            self.files.append(self._write(df, 'submission-{}.csv'.format(i)))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, df, file_name):
+        file_path = os.path.join(self.folder, file_name)
+        df.to_csv(file_path, index=False)
+        return file_path
+
+    def _get_merged(self):
+        """The plain pandas merge of the files on the id"""
+        frames = [pd.read_csv(file_path).rename(columns={'consumption': 'value_{}'.format(i)})
+                  for i, file_path in enumerate(self.files)]
+
+        return reduce(lambda left, right: left.merge(right, on='pred_id'), frames).sort_values('pred_id')
+
+
+class SubmissionMergerTestCase(SubmissionFilesTestCase):
+    """
+    Check the streaming merge against a plain pandas merge, with chunks smaller than the files
+    """
+    def _assert_avg(self, chunk_size):
+        outfile = os.path.join(self.folder, 'avg.csv')
+        blend_submission_files(self.files, outfile, method='avg', chunk_size=chunk_size)
+
+        merged = self._get_merged()
+        result = pd.read_csv(outfile)
+
+        self.assertEqual(list(result.columns), ['pred_id', 'consumption'])
+        np.testing.assert_array_equal(result['pred_id'].values, merged['pred_id'].values)
+        np.testing.assert_allclose(result['consumption'].values, merged.iloc[:, 1:].mean(axis=1).values, atol=1e-6)
+
+    def test_merge(self):
+        for chunk_size in [1, 7, 1000]:
+            self._assert_avg(chunk_size)
+
+    def test_different_chunk_boundaries(self):
+        iter_file_chunks = engine._iter_file_chunks
+        chunk_sizes = {file_path: chunk_size for file_path, chunk_size in zip(self.files, [4, 7, 11])}
+
+        # Each file is read with its own chunk size
+        def iter_chunks(file_path, chunk_size, as_text=False):
+            return iter_file_chunks(file_path, chunk_sizes[file_path], as_text)
+
+        with mock.patch.object(engine, '_iter_file_chunks', side_effect=iter_chunks):
+            chunks = list(SubmissionMerger(self.files, 5))
+            self._assert_avg(5)
+
+        self.assertGreater(len(chunks), self.n_rows // 11)
+        np.testing.assert_array_equal(np.concatenate([ids for ids, _ in chunks]), np.arange(self.n_rows) * 3)
+        np.testing.assert_array_equal(np.concatenate([matrix for _, matrix in chunks]),
+                                      self._get_merged().iloc[:, 1:].values)
+
+    def test_mismatched_ids(self):
+        df = pd.read_csv(self.files[0])
+
+        other_ids = df.copy()
+        other_ids.loc[10, 'pred_id'] = 31
+        shorter = df.iloc[:-1]
+
+        for other_df in [other_ids, shorter]:
+            files = [self.files[0], self._write(other_df, 'other.csv')]
+
+            for chunk_size in [7, 1000]:
+                with self.assertRaisesRegex(ValueError, 'same ids'):
+                    list(SubmissionMerger(files, chunk_size))
+
+
+class GenerateSubmissionsTestCase(SubmissionFilesTestCase):
+    """
+    Check one pass writes every blend, the same with the matrix in memory or memory-mapped
+    """
+    def _generate(self, folder, mmap_path=None):
+        os.makedirs(folder)
+        outputs = [(os.path.join(folder, '{}.csv'.format(method)), method, weights) for method, weights in [
+            ('avg', None), ('linear', [0.5, 0.3, 0.2]), ('geomean', [1, 2, 1]), ('vote', None), ('rankavg', None)
+        ]]
+
+        generate_submissions(self.files, outputs, mmap_path=mmap_path, chunk_size=7)
+
+        return {method: outfile for outfile, method, _ in outputs}
+
+    def _read(self, file_path):
+        with open(file_path) as f:
+            return f.read()
+
+    def test_write_blends(self):
+        in_memory = self._generate(os.path.join(self.folder, 'in-memory'))
+        memory_mapped = self._generate(os.path.join(self.folder, 'memory-mapped'),
+                                       mmap_path=os.path.join(self.folder, 'matrix.mmap'))
+
+        for method, outfile in in_memory.items():
+            self.assertEqual(self._read(outfile), self._read(memory_mapped[method]))
+
+        merged = self._get_merged()
+        matrix = merged.iloc[:, 1:].values.astype(np.float32).astype(np.float64)
+        expected = {
+            'avg': matrix.mean(axis=1),
+            'linear': matrix.dot([0.5, 0.3, 0.2]),
+            'geomean': np.exp(np.average(np.log(matrix), axis=1, weights=[1, 2, 1])),
+            'vote': matrix[:, 0],
+            'rankavg': rank_average(matrix.astype(np.float32))
+        }
+
+        for method, values in expected.items():
+            result = pd.read_csv(in_memory[method])
+
+            self.assertEqual(list(result.columns), ['pred_id', 'consumption'])
+            np.testing.assert_array_equal(result['pred_id'].values, merged['pred_id'].values)
+            np.testing.assert_allclose(result['consumption'].values, values, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+from scipy.stats import rankdata as scipy_rankdata
+
+from csef.utils.ensembles.rank import rankdata, external_rankdata, rank_average
+from csef.utils.ensembles.stacking import BlendingWeightsOptimizer
+
+
+class RankAverageTestCase(unittest.TestCase):
+    """
+    Check the ranks against scipy and the external sort against the in-memory ranks
+    """
+    def setUp(self):
+        # Few distinct values to get many ties
+        self.values = np.random.RandomState(2018).randint(0, 50, size=1000).astype(float)
+
+    def test_rankdata_matches_scipy(self):
+        for method in ['ordinal', 'average', 'min', 'max', 'dense']:
+            np.testing.assert_allclose(rankdata(self.values, method),
+                                       scipy_rankdata(self.values, method) - 1)
+
+    def test_external_rankdata_matches_rankdata(self):
+        for method in ['ordinal', 'average', 'min', 'max']:
+            np.testing.assert_allclose(external_rankdata(self.values, method, chunk_size=128),
+                                       rankdata(self.values, method))
+
+    def test_rank_average(self):
+        matrix = np.column_stack([self.values, self.values[::-1], np.arange(1000.)])
+
+        ranks = rank_average(matrix)
+
+        np.testing.assert_allclose(ranks, rank_average(matrix, chunk_size=100))
+        self.assertEqual(ranks.min(), 0)
+        self.assertEqual(ranks.max(), 1)
+        np.testing.assert_allclose(rank_average(matrix[:, :1], method='min'),
+                                   rankdata(self.values, 'min') / 999.)
+
+
+class BlendingWeightsOptimizerTestCase(unittest.TestCase):
+    """
+    Check the optimizer finds the blend of the good models and drops the others
+    """
+    def test_fit(self):
+        rng = np.random.RandomState(2018)
+        y = rng.rand(2000) * 10
+        predictions = np.column_stack([
+            y + rng.laplace(scale=0.5, size=2000),
+            y + rng.laplace(scale=0.5, size=2000),
+            rng.rand(2000) * 10
+        ])
+
+        optimizer = BlendingWeightsOptimizer(min_weight=0.05).fit(predictions, y)
+
+        self.assertTrue(np.all(optimizer.weights_ >= 0))
+        np.testing.assert_array_equal(optimizer.selected_, [0, 1])
+        np.testing.assert_allclose(optimizer.weights_.sum(), 1, atol=0.05)
+        self.assertLess(optimizer.mae_, np.abs(predictions[:, 0] - y).mean())
+        np.testing.assert_allclose(np.abs(optimizer.predict(predictions) - y).mean(), optimizer.mae_)
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from csef.model.export import export_stateless, get_verify_inputs, verify_stateless
+from csef.model.lstm import SimpleLSTM
+
+
+class ExportStatelessTestCase(unittest.TestCase):
+    """
+    Check the exported stateless predictor gives the same outputs as the stateful LSTM
+    """
+    def setUp(self):
+        self.model = SimpleLSTM({'n_input': 4, 'n_nodes': 3, 'n_batch': 2})
+
+        rng = np.random.RandomState(2018)
+        self.train_df = pd.DataFrame({
+            'series_id': np.repeat([1, 2], 20),
+            'consumption': rng.rand(40) * 100
+        })
+
+    def test_verify_stateless(self):
+        self.model.fit(self.train_df)
+        self.assertEqual(self.model.recent_samples.shape, (16, 1, 4))
+
+        # The check runs on the recent samples by default
+        predictor = self.model.export_stateless()
+
+        verify_inputs = get_verify_inputs(self.model.model, self.model.recent_samples)
+        self.assertEqual(verify_inputs.shape, (3, 2, 1, 4))
+        self.assertLessEqual(verify_stateless(self.model.model, predictor, verify_inputs), 1e-5)
+
+    def test_verify_fails_on_different_weights(self):
+        predictor = export_stateless(self.model.model)
+
+        weights = predictor.model.get_weights()
+        predictor.model.set_weights([w + 1 for w in weights])
+
+        self.assertGreater(verify_stateless(self.model.model, predictor, get_verify_inputs(self.model.model)), 1e-5)
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from csef.model.forecast import recursive_forecast
+
+
+class RecursiveForecastTestCase(unittest.TestCase):
+    """
+    Check the batched forecast against the series by series loop, with a fixed batch size
+    """
+    n_input = 5
+    num_pred_hours = 7
+
+    def setUp(self):
+        self.windows = np.random.RandomState(2018).rand(11, self.n_input).astype(np.float32)
+
+        # The number of steps since the last reset, like the states of a stateful model
+        self.n_steps = 0
+
+    def _predict(self, X):
+        self.n_steps += 1
+        return X[:, 0, -1] * 0.5 + X[:, 0, :].mean(axis=1) * 0.4 + self.n_steps * 0.01
+
+    def _forecast_baseline(self):
+        """Forecast each series alone, the states are reset before each series"""
+        predictions = []
+
+        for window in self.windows:
+            self.n_steps = 0
+            history = list(window)
+
+            for _ in range(self.num_pred_hours):
+                X = np.array(history[-self.n_input:], dtype=np.float32).reshape(1, 1, self.n_input)
+                history.append(self._predict(X)[0])
+
+            predictions.append(history[self.n_input:])
+
+        return np.array(predictions, dtype=np.float32)
+
+    def test_batches_match_baseline(self):
+        batch_shapes = []
+        n_resets = []
+
+        def step(X):
+            batch_shapes.append(X.shape)
+            return self._predict(X)
+
+        def before_batch():
+            n_resets.append(1)
+            self.n_steps = 0
+
+        for batch_size in [4, 11, None]:
+            batch_shapes = []
+            n_resets = []
+
+            predictions = recursive_forecast(step, self.windows, self.num_pred_hours, batch_size, before_batch)
+
+            np.testing.assert_allclose(predictions, self._forecast_baseline(), rtol=1e-6)
+            self.assertEqual(predictions.shape, (11, self.num_pred_hours))
+
+            # The last batch is padded to the batch size of the model
+            expected_size = batch_size or 11
+            self.assertEqual(set(batch_shapes), {(expected_size, 1, self.n_input)})
+            self.assertEqual(len(n_resets), -(-11 // expected_size))
+            self.assertEqual(len(batch_shapes), len(n_resets) * self.num_pred_hours)
+
+    def test_single_window(self):
+        predictions = recursive_forecast(self._predict, self.windows[0], self.num_pred_hours, batch_size=3,
+                                         before_batch=lambda: setattr(self, 'n_steps', 0))
+
+        self.windows = self.windows[:1]
+        np.testing.assert_allclose(predictions, self._forecast_baseline(), rtol=1e-6)
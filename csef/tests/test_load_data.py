@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from csef.data.load_data import train_test_split, rolling_origin_splits
+
+
+class SplitTestCase(unittest.TestCase):
+    """
+    Check the boundaries of the splits inside each series, the rows of the series are interleaved
+    """
+    def setUp(self):
+        # Series 1 has 10 rows and series 2 has 8 rows, the step is the position in the series
+        self.df = pd.DataFrame({
+            'series_id': [1, 2] * 8 + [1, 1],
+            'step': list(np.repeat(np.arange(8), 2)) + [8, 9]
+        })
+
+    def _get_steps(self, df, ser_id):
+        return df[df['series_id'] == ser_id]['step'].tolist()
+
+    def test_train_test_split(self):
+        train, test = train_test_split(self.df, n_test=3)
+
+        self.assertEqual(self._get_steps(train, 1), list(range(7)))
+        self.assertEqual(self._get_steps(test, 1), [7, 8, 9])
+        self.assertEqual(self._get_steps(train, 2), list(range(5)))
+        self.assertEqual(self._get_steps(test, 2), [5, 6, 7])
+
+        # The rows keep their original order
+        self.assertTrue(train.index.is_monotonic_increasing and test.index.is_monotonic_increasing)
+
+    def test_rolling_origin_splits(self):
+        folds = list(rolling_origin_splits(self.df, n_test=2, n_folds=3))
+
+        self.assertEqual(len(folds), 3)
+        self.assertEqual(self._get_steps(folds[0][0], 1), list(range(4)))
+        self.assertEqual(self._get_steps(folds[0][1], 1), [4, 5])
+        self.assertEqual(self._get_steps(folds[1][1], 1), [6, 7])
+        self.assertEqual(self._get_steps(folds[0][1], 2), [2, 3])
+        self.assertEqual(self._get_steps(folds[2][0], 2), list(range(6)))
+
+        # The last fold is the same as the train test split
+        train, test = train_test_split(self.df, n_test=2)
+        pd.testing.assert_frame_equal(folds[-1][0], train)
+        pd.testing.assert_frame_equal(folds[-1][1], test)
+
+        folds = list(rolling_origin_splits(self.df, n_test=2, n_folds=2, step=1))
+        self.assertEqual(self._get_steps(folds[0][1], 1), [7, 8])
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from csef.utils.log_shipper import LogShipper, SequentialKeyGenerator
+
+
+class MemorySink(object):
+    """Keep the shipped batches in memory, like the datastore `put_multi`"""
+
+    def __init__(self, blocked=None):
+        self.batches = []
+        self.blocked = blocked
+
+    def __call__(self, records):
+        if self.blocked is not None:
+            self.blocked.wait()
+        self.batches.append(list(records))
+
+
+class LogShipperTestCase(unittest.TestCase):
+    """
+    Check the batching, the flushes and the spill of the log shipper
+    """
+    def test_batches_and_flush(self):
+        sink = MemorySink()
+        shipper = LogShipper(sink, batch_size=4, flush_interval=60)
+
+        for i in range(10):
+            shipper.emit((('Log', i), {'message': i}))
+        self.assertTrue(shipper.flush(timeout=5))
+
+        self.assertEqual([len(batch) for batch in sink.batches], [4, 4, 2])
+        self.assertEqual([record[1]['message'] for batch in sink.batches for record in batch], list(range(10)))
+
+        shipper.emit((('Log', 10), {'message': 10}))
+        shipper.close()
+        self.assertEqual(shipper.n_shipped, 11)
+
+    def test_spill_when_queue_is_full(self):
+        blocked = threading.Event()
+        spill_file = os.path.join(tempfile.mkdtemp(), 'spill.jsonl')
+        shipper = LogShipper(MemorySink(blocked), max_queue_size=2, batch_size=1, spill_file=spill_file)
+
+        for i in range(10):
+            shipper.emit((('Log', i), {'message': i}))
+
+        blocked.set()
+        shipper.close()
+
+        with open(spill_file) as f:
+            spilled = [json.loads(line) for line in f]
+
+        self.assertEqual(len(spilled), shipper.n_spilled)
+        self.assertEqual(shipper.n_shipped + shipper.n_spilled, 10)
+
+    def test_sequential_keys(self):
+        generator = SequentialKeyGenerator()
+        keys = [generator.next() for _ in range(1000)]
+
+        self.assertEqual(keys, sorted(set(keys)))
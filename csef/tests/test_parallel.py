@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from csef.model.parallel import average_weights, _iter_rounds
+
+
+class AverageWeightsTestCase(unittest.TestCase):
+    """
+    Check the weights of the copies are averaged layer by layer, weighted by their number of samples
+    """
+    def setUp(self):
+        self.weights_list = [
+            [np.zeros((2, 3)), np.array([1., 2.])],
+            [np.ones((2, 3)), np.array([3., 4.])],
+            [np.full((2, 3), 4.), np.array([5., 0.])]
+        ]
+
+    def test_uniform(self):
+        weights = average_weights(self.weights_list)
+
+        self.assertEqual([w.shape for w in weights], [(2, 3), (2,)])
+        np.testing.assert_allclose(weights[0], np.full((2, 3), 5. / 3))
+        np.testing.assert_allclose(weights[1], [3., 2.])
+
+        # None is the same as equal counts
+        for expected, w in zip(weights, average_weights(self.weights_list, [7, 7, 7])):
+            np.testing.assert_allclose(w, expected)
+
+    def test_sample_counts(self):
+        weights = average_weights(self.weights_list, sample_counts=[2, 1, 1])
+
+        np.testing.assert_allclose(weights[0], np.full((2, 3), 5. / 4))
+        np.testing.assert_allclose(weights[1], [(2 + 3 + 5) / 4., (4 + 4 + 0) / 4.])
+
+        # A copy fitted on no sample doesn't count
+        weights = average_weights(self.weights_list, sample_counts=[0, 3, 0])
+        np.testing.assert_allclose(weights[1], [3., 4.])
+
+
+class IterRoundsTestCase(unittest.TestCase):
+    """
+    Check each round gives every series to exactly one worker, at most `sync_interval` series per worker
+    """
+    def test_rounds(self):
+        for n_series, n_workers, sync_interval in [(0, 2, 3), (5, 2, 3), (12, 2, 3), (13, 4, 1), (3, 8, 2)]:
+            rounds = list(_iter_rounds(iter(range(n_series)), n_workers, sync_interval))
+            seen = []
+
+            for shards in rounds:
+                self.assertLessEqual(len(shards), n_workers)
+                self.assertTrue(all(0 < len(shard) <= sync_interval for shard in shards))
+
+                series = [item for shard in shards for item in shard]
+                self.assertEqual(len(series), len(set(series)))
+                seen += sorted(series)
+
+            # The rounds keep the order of the series, all full but the last one
+            self.assertEqual(seen, list(range(n_series)))
+            self.assertEqual(len(rounds), -(-n_series // (n_workers * sync_interval)))
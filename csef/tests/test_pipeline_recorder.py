@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from csef.pipeline.manager import PipelineRecorder
+from csef.session import SessionManager
+from csef.utils.result_store import SQLiteResultStore
+
+
+class PipelineRecorderTestCase(unittest.TestCase):
+    """
+    Check the records are pushed behind: the changes are coalesced, the large arrays are dumped to the stats
+    files and `finish` pushes the pending changes
+    """
+    session_id = 2018
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = SQLiteResultStore(':memory:')
+        self.upsert_multi = mock.patch.object(self.store, 'upsert_multi', wraps=self.store.upsert_multi).start()
+
+        mock.patch.dict(os.environ, {'PROJ_HOME': self.folder}).start()
+        mock.patch('csef.pipeline.manager.get_result_store', return_value=self.store).start()
+        mock.patch.dict(SessionManager()._props, {'config_file': 'lstm.yml'}).start()
+        mock.patch.object(SessionManager(), 'session_id', self.session_id).start()
+
+        self.recorder = PipelineRecorder()
+        mock.patch.object(self.recorder, 'push_interval', 0.2).start()
+        mock.patch.object(self.recorder, 'max_embedded_size', 10).start()
+        self.recorder.clean_current_session()
+        self.recorder._last_push.pop(self.session_id, None)
+
+    def tearDown(self):
+        self.recorder.finish()
+        self.recorder.clean_current_session()
+        mock.patch.stopall()
+        self.store.close()
+        shutil.rmtree(self.folder)
+
+    def _get_result(self):
+        return self.store.get(('Pipeline', 'lstm.yml', 'Result', self.session_id))
+
+    def test_changes_are_coalesced(self):
+        self.recorder.record_and_push({'is_finished': False})
+        self.assertEqual(self.upsert_multi.call_count, 1)
+
+        # The changes within the push interval wait for the timer
+        self.recorder.record_and_push({'score': {'mae': 1.5}})
+        self.recorder.record_and_push({'score': {'rmse': 2.5}})
+        self.recorder.record_and_push({'is_finished': True})
+        self.assertEqual(self.upsert_multi.call_count, 1)
+        self.assertFalse(self._get_result()['is_finished'])
+
+        time.sleep(1)
+
+        self.assertEqual(self.upsert_multi.call_count, 2)
+        result = self._get_result()
+        self.assertTrue(result['is_finished'])
+        self.assertEqual(result['score'], {'mae': 1.5, 'rmse': 2.5})
+        self.assertEqual(result['session_id'], self.session_id)
+
+        # Nothing is pushed without changes
+        self.recorder.push(force=True)
+        self.assertEqual(self.upsert_multi.call_count, 2)
+
+    def test_large_arrays_are_dumped(self):
+        importances = np.arange(100.)
+        self.recorder.record_and_push({'fit_stats': {'importances': importances, 'best_iteration': 10}})
+
+        self.assertEqual(self._get_result()['fit_stats'], {
+            'importances': {'stats_ref': 'fit_stats.importances'},
+            'best_iteration': 10
+        })
+
+        stats = self.recorder._get_stats_store().read('fit_stats.importances')
+        np.testing.assert_array_equal(stats, importances)
+
+    def test_finish_pushes_the_pending_changes(self):
+        self.recorder.record_and_push({'is_finished': False})
+        self.recorder.record({'block_stats': {'train': {'wall_time': 3.}}}).push()
+        self.recorder.record({'is_finished': True, 'is_error': False})
+        self.assertEqual(self.upsert_multi.call_count, 1)
+
+        self.recorder.finish()
+
+        self.assertEqual(self.upsert_multi.call_count, 2)
+        self.assertIsNone(self.recorder._timer)
+        result = self._get_result()
+        self.assertEqual(result['block_stats'], {'train': {'wall_time': 3.}})
+        self.assertTrue(result['is_finished'])
+
+        # The timer was cancelled
+        time.sleep(0.5)
+        self.assertEqual(self.upsert_multi.call_count, 2)
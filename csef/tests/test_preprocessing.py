@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+import pandas as pd
+
+from csef.data.preprocessing import make_lagged_windows, create_lagged_features, prepare_training_data
+
+
+class LaggedWindowsTestCase(unittest.TestCase):
+    """
+    Check the sliding window builder against the lagged features layout
+    """
+    def test_single_series_matches_lagged_features(self):
+        values = np.random.RandomState(2018).rand(100)
+
+        X, y = make_lagged_windows(values, 24)
+        df_lagged = create_lagged_features(values, lag=24)
+
+        self.assertEqual(X.shape, (76, 1, 24))
+        np.testing.assert_allclose(y, df_lagged['consumption'].values)
+        np.testing.assert_allclose(X[:, 0, :], df_lagged.drop('consumption', axis=1).values)
+
+    def test_batch_of_series(self):
+        values = np.arange(30, dtype=float).reshape(3, 10)
+
+        X, y = make_lagged_windows(values, 4, chronological=True)
+
+        self.assertEqual(X.shape, (18, 1, 4))
+        np.testing.assert_array_equal(X[6, 0], [10, 11, 12, 13])
+        self.assertEqual(y[6], 14)
+
+    def test_missing_values_are_dropped(self):
+        values = np.arange(21, dtype=float)
+        values[10] = np.nan
+
+        X, y, _ = prepare_training_data(pd.Series(values), 3)
+        df_lagged = create_lagged_features(values, lag=3)
+
+        self.assertEqual(X.shape, (14, 1, 3))
+        self.assertFalse(np.isnan(X).any() or np.isnan(y).any())
+        np.testing.assert_allclose(make_lagged_windows(values, 3)[0][:, 0, :],
+                                   df_lagged.drop('consumption', axis=1).values)
+
+    def test_short_series(self):
+        X, y = make_lagged_windows(np.arange(24, dtype=float), 24)
+
+        self.assertEqual(X.shape, (0, 1, 24))
+        self.assertEqual(y.shape, (0,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from csef.utils.result_store import SQLiteResultStore
+
+
+class SQLiteResultStoreTestCase(unittest.TestCase):
+    """
+    Check the indexed queries and the pagination of the embedded result store
+    """
+    def setUp(self):
+        self.store = SQLiteResultStore(':memory:')
+
+        self.store.upsert_multi([
+            (('Pipeline', 'lightgbm.yml', 'Result', session_id), {
+                'session_id': session_id,
+                'config_file': 'lightgbm.yml' if session_id % 2 else 'xgboost.yml',
+                'created': '2018-10-{:02d}'.format(session_id % 28 + 1),
+                'is_finished': True,
+                'score': {'auc': session_id % 10 / 10.},
+                'model': {'name': 'lgb' if session_id % 5 == 0 else 'xgb'}
+            })
+            for session_id in range(250)
+        ])
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_get(self):
+        result = self.store.get(('Pipeline', 'lightgbm.yml', 'Result', 12))
+
+        self.assertEqual(result['score'], {'auc': 0.2})
+        self.assertIsNone(self.store.get(('Pipeline', 'lightgbm.yml', 'Result', 1000)))
+
+    def test_query_filters(self):
+        results = self.store.query_result([('config_file', '=', 'lightgbm.yml'), ('score.auc', '>=', 0.8)], limit=500)
+
+        self.assertEqual(len(results), 25)
+        self.assertTrue(all(result['session_id'] % 2 == 1 for result in results))
+
+    def test_query_nested_string(self):
+        results = self.store.query_result([('model.name', '=', 'lgb'), ('score.auc', '=', 0.5)], limit=500)
+
+        self.assertEqual(len(results), 25)
+        self.assertTrue(all(result['session_id'] % 10 == 5 for result in results))
+
+    def test_pagination(self):
+        orders = ['-score.auc', 'created']
+        expected = self.store.query('Result', orders=orders, limit=1000)
+
+        records, cursor = self.store.query_page('Result', orders=orders, limit=40)
+        while cursor is not None:
+            page, cursor = self.store.query_page('Result', orders=orders, limit=40, cursor=cursor)
+            records += page
+
+        self.assertEqual(len(expected), 250)
+        self.assertEqual([record['session_id'] for record in records],
+                         [record['session_id'] for record in expected])
+        self.assertEqual(expected[0]['score']['auc'], 0.9)
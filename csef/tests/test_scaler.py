@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from csef.data.scaler import ScalerBank
+
+
+class ScalerBankTestCase(unittest.TestCase):
+    """
+    Check the bank scales each series like a MinMaxScaler fitted on that series
+    """
+    def setUp(self):
+        rng = np.random.RandomState(2018)
+        self.df = pd.DataFrame({
+            'series_id': np.repeat([30, 10, 20], 12),
+            'consumption': rng.rand(36) * 100
+        })
+        # A constant series
+        self.df.loc[self.df['series_id'] == 20, 'consumption'] = 5.
+
+        self.bank = ScalerBank().fit(self.df)
+
+    def test_matches_minmax_scaler(self):
+        for ser_id, ser_df in self.df.groupby('series_id'):
+            values = ser_df['consumption'].values
+            expected = MinMaxScaler(feature_range=(-1, 1)).fit_transform(values.reshape(-1, 1)).ravel()
+
+            np.testing.assert_allclose(self.bank.transform(values, ser_id), expected)
+            np.testing.assert_allclose(self.bank.get_scaler(ser_id).transform(values), expected)
+
+    def test_batch_inverse_transform(self):
+        ser_ids = np.array([20, 30, 10])
+        values = np.arange(12, dtype=float).reshape(3, 4)
+
+        scaled = self.bank.transform(values, ser_ids)
+        np.testing.assert_allclose(scaled[1], self.bank.transform(values[1], 30))
+        np.testing.assert_allclose(self.bank.inverse_transform(scaled, ser_ids), values)
+
+        with self.assertRaises(KeyError):
+            self.bank.transform(values, [20, 30, 40])
+
+    def test_save_and_load(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'scalers.npz')
+            self.bank.save(path)
+            bank = ScalerBank.load(path)
+        finally:
+            shutil.rmtree(folder)
+
+        self.assertEqual(bank.feature_range, (-1, 1))
+        np.testing.assert_array_equal(bank.series_ids, [10, 20, 30])
+        np.testing.assert_allclose(bank.transform([1., 50.], 10), self.bank.transform([1., 50.], 10))
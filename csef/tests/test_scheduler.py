@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from csef.pipeline.scheduler import BlockGraph, ParallelExecutor, SerialExecutor
+
+
+class FakeBlock(object):
+    def __init__(self, name, inputs_from=None):
+        self.name = name
+        self.inputs_from = inputs_from
+
+
+def build_graph(definitions):
+    return BlockGraph([FakeBlock(name, inputs_from) for name, inputs_from in definitions])
+
+
+class BlockGraphTestCase(unittest.TestCase):
+    """
+    Check the blocks are sorted in a topological order and the invalid pipelines are rejected
+    """
+    def test_topological_order(self):
+        graph = build_graph([
+            ('predict', ['train', 'features']),
+            ('train', 'features'),
+            ('load', None),
+            ('features', 'load'),
+            ('report', None)
+        ])
+
+        # The first block of the config is executed first among the ready blocks
+        self.assertEqual(graph.order, ['load', 'features', 'train', 'predict', 'report'])
+        self.assertEqual(graph.dependents['features'], ['predict', 'train'])
+        self.assertEqual(graph.dependencies['predict'], ['train', 'features'])
+        self.assertIn('train', graph)
+        self.assertEqual(graph['train'].name, 'train')
+
+    def test_cycle(self):
+        with self.assertRaisesRegex(ValueError, 'cycle'):
+            build_graph([('load', None), ('a', ['load', 'c']), ('b', 'a'), ('c', 'b')])
+
+    def test_unknown_input(self):
+        with self.assertRaisesRegex(ValueError, 'unknown block missing'):
+            build_graph([('load', None), ('train', 'missing')])
+
+    def test_duplicated_name(self):
+        with self.assertRaisesRegex(ValueError, 'duplicated'):
+            build_graph([('load', None), ('load', None)])
+
+
+class ExecutorTestCase(unittest.TestCase):
+    """
+    Check the executors run each block after its inputs, the parallel one runs the independent blocks together
+    """
+    def setUp(self):
+        self.graph = build_graph([
+            ('load', None),
+            ('features_a', 'load'),
+            ('features_b', 'load'),
+            ('train', ['features_a', 'features_b'])
+        ])
+        self.finished = []
+        self.lock = threading.Lock()
+
+    def _execute(self, block):
+        for input_name in self.graph.dependencies[block.name]:
+            self.assertIn(input_name, self.finished)
+
+        with self.lock:
+            self.finished.append(block.name)
+
+    def test_serial(self):
+        SerialExecutor().run(self.graph, self._execute)
+
+        self.assertEqual(self.finished, ['load', 'features_a', 'features_b', 'train'])
+
+    def test_parallel(self):
+        # Both features blocks must run at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def execute(block):
+            if block.name.startswith('features'):
+                barrier.wait()
+            self._execute(block)
+
+        ParallelExecutor({'n_workers': 2}).run(self.graph, execute)
+
+        self.assertEqual(self.finished[0], 'load')
+        self.assertEqual(sorted(self.finished[1:3]), ['features_a', 'features_b'])
+        self.assertEqual(self.finished[3], 'train')
+
+    def test_parallel_error(self):
+        def execute(block):
+            if block.name == 'features_a':
+                raise RuntimeError('Failed block')
+            if block.name == 'features_b':
+                time.sleep(0.3)
+            self._execute(block)
+
+        errors = []
+
+        def run():
+            try:
+                ParallelExecutor({'n_workers': 2}).run(self.graph, execute)
+            except RuntimeError as e:
+                errors.append(e)
+
+        n_threads = threading.active_count()
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(timeout=10)
+
+        # The error is raised in the caller once the running blocks are finished, no block starts after it
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([str(e) for e in errors], ['Failed block'])
+        self.assertEqual(self.finished, ['load', 'features_b'])
+        self.assertEqual(threading.active_count(), n_threads)
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+import unittest
+
+
+# The modules which must be imported only by the commands using them
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'tensorflow', 'google.cloud.datastore', 'google.cloud.storage']
+
+# The maximum time in seconds to import the module, far above the usual time but far below the heavy imports
+IMPORT_TIME_BUDGET = 1.5
+
+BENCHMARK_SCRIPT = '''
+import json, sys, time
+start_time = time.time()
+import {module}
+print(json.dumps({{
+    'time': time.time() - start_time,
+    'heavy_modules': [name for name in {heavy_modules!r} if name in sys.modules]
+}}))
+'''
+
+
+class StartupTestCase(unittest.TestCase):
+    """
+    Check the CLI starts without importing the cloud clients and the ML libraries, in a fresh process
+    """
+    def _benchmark_import(self, module):
+        output = subprocess.check_output([
+            sys.executable, '-c', BENCHMARK_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)
+        ])
+        return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+    def test_cli_import(self):
+        result = self._benchmark_import('csef.cli')
+
+        self.assertEqual(result['heavy_modules'], [])
+        self.assertLess(result['time'], IMPORT_TIME_BUDGET)
+
+    def test_pipeline_manager_import(self):
+        result = self._benchmark_import('csef.pipeline.manager')
+
+        self.assertEqual(result['heavy_modules'], [])
+        self.assertLess(result['time'], IMPORT_TIME_BUDGET)
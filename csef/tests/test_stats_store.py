@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from csef.utils.stats_store import StatsStore
+
+
+class StatsStoreTestCase(unittest.TestCase):
+    """
+    Check the arrays are stored natively and the series can be appended then read in parts
+    """
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_write_and_read(self):
+        store = StatsStore(self.folder)
+        importances = np.random.rand(5000)
+
+        store.write('fit_stats', {
+            'feature_importances': importances,
+            'evals_result': {'valid': {'auc': [0.5 + i / 1000. for i in range(200)]}},
+            'best_iteration': np.int64(199),
+            'names': ['a', 'b']
+        })
+
+        stats = store.read('fit_stats')
+        self.assertIsInstance(stats['feature_importances'], np.memmap)
+        np.testing.assert_array_equal(stats['feature_importances'], importances)
+        self.assertEqual(stats['evals_result']['valid']['auc'].shape, (200,))
+        self.assertEqual(stats['best_iteration'], 199)
+        self.assertEqual(stats['names'], ['a', 'b'])
+        self.assertEqual(store.keys(), ['fit_stats'])
+
+        # The arrays of the replaced data are removed
+        store.write('fit_stats', {'best_iteration': 10})
+        self.assertEqual(sorted(os.listdir(self.folder)), ['fit_stats.stats.json'])
+
+    def test_append_series(self):
+        store = StatsStore(self.folder)
+        store.write('training', {'fold': 1})
+
+        for i in range(10):
+            store.append('training', 'errors', [i, i + 0.5])
+        store.append('training', 'curve', np.ones((3, 2)))
+
+        stats = store.read('training')
+        self.assertEqual(stats['fold'], 1)
+        self.assertEqual(stats['errors'].shape, (20,))
+        self.assertEqual(stats['curve'].shape, (3, 2))
+        np.testing.assert_array_equal(store.read_series('training', 'errors', 4, 6), [2, 2.5])
+
+        with self.assertRaises(ValueError):
+            store.append('training', 'curve', np.ones((1, 3)))
@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from csef.data.preprocessing import prepare_training_data
+from csef.data.stream import SeriesStream
+
+
+class SeriesStreamTestCase(unittest.TestCase):
+    """
+    Check the stream gives the same samples as the series by series preparation of the training data
+    """
+    def setUp(self):
+        rng = np.random.RandomState(2018)
+        self.df = pd.DataFrame({
+            'series_id': np.repeat([3, 1, 2], 30),
+            'consumption': rng.rand(90) * 100
+        })
+
+        # Some gaps in the series
+        self.df.loc[[5, 6, 40, 89], 'consumption'] = np.nan
+
+    def test_same_samples_as_prepare_training_data(self):
+        stream = SeriesStream.from_frame(self.df, 4, prefetch=1)
+        samples = {ser_id: (X, y) for ser_id, X, y in stream}
+
+        self.assertEqual(sorted(samples), [1, 2, 3])
+
+        for ser_id, ser_data in self.df.groupby('series_id'):
+            X, y, scaler = prepare_training_data(ser_data['consumption'], 4)
+
+            self.assertFalse(np.isnan(samples[ser_id][0]).any())
+            np.testing.assert_allclose(samples[ser_id][0], X)
+            np.testing.assert_allclose(samples[ser_id][1], y)
+            np.testing.assert_allclose(stream.scaler_bank.get_scaler(ser_id).transform([10., 50.]),
+                                       scaler.transform([[10.], [50.]]).ravel())
+
+    def test_get_runs_by_chunks(self):
+        series_ids = np.array([5, 5, 5, 7, 7, 2, 2, 2, 2, 9])
+
+        for chunk_size in [1, 2, 3, 100]:
+            stream = SeriesStream(series_ids, np.zeros(10), 2, chunk_size=chunk_size)
+
+            np.testing.assert_array_equal(stream.get_runs(), [0, 3, 5, 9, 10])
+            self.assertEqual(len(stream), 4)
+
+        self.assertEqual(len(SeriesStream(np.zeros(0), np.zeros(0), 2)), 0)
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from csef.model.lstm import SimpleLSTM
+
+
+class MakeSubmissionTestCase(unittest.TestCase):
+    """
+    Check the series packed into batches give the same submission as the series one by one
+    """
+    @classmethod
+    def setUpClass(cls):
+        # The states are not kept between the batches, so the forecast of a series doesn't depend on its batch
+        cls.model = SimpleLSTM({'n_input': 4, 'n_nodes': 3, 'n_batch': 2, 'stateful': False})
+
+    def setUp(self):
+        rng = np.random.RandomState(2018)
+        pred_windows = {1: 'hourly', 2: 'daily', 3: 'hourly', 4: 'daily', 5: 'hourly', 6: 'daily'}
+        num_preds = {'hourly': 24, 'daily': 7, 'weekly': 2}
+
+        self.cold_start_test = pd.DataFrame({
+            'series_id': np.repeat(list(pred_windows), 30),
+            'consumption': rng.rand(30 * len(pred_windows)) * 100
+        })
+
+        submission_series = [ser_id for ser_id, pred_window in pred_windows.items()
+                             for _ in range(num_preds[pred_window])]
+        self.submission_df = pd.DataFrame({
+            'pred_id': np.arange(len(submission_series)),
+            'series_id': submission_series,
+            'prediction_window': [pred_windows[ser_id] for ser_id in submission_series],
+            'consumption': 0.
+        }).sample(frac=1, random_state=rng)
+
+    def test_pack_submission_batches(self):
+        pred_windows = self.submission_df.groupby('series_id')['prediction_window'].first()
+
+        self.assertEqual(self.model._pack_submission_batches(pred_windows, 2), [
+            ('hourly', [1, 3]), ('daily', [2, 4]), ('hourly', [5]), ('daily', [6])
+        ])
+        self.assertEqual(len(self.model._pack_submission_batches(pred_windows, 1)), 6)
+
+    def test_same_submission(self):
+        # The fine tuning changes the weights differently with the batches, it's checked separately
+        with mock.patch.object(self.model.model, 'fit') as fit:
+            expected = self.model.make_submission(self.submission_df, self.cold_start_test, series_per_batch=1)
+            self.assertEqual(fit.call_count, 6)
+
+            for series_per_batch in [2, 100]:
+                fit.reset_mock()
+                submission = self.model.make_submission(self.submission_df, self.cold_start_test,
+                                                        series_per_batch=series_per_batch)
+
+                pd.testing.assert_frame_equal(submission, expected, rtol=1e-5)
+
+                # Every batch is fine-tuned on the lagged samples of all its series
+                self.assertEqual([len(call[0][0]) for call in fit.call_args_list],
+                                 [2 * 26, 2 * 26, 26, 26] if series_per_batch == 2 else [3 * 26, 3 * 26])
+
+        self.assertTrue((expected['consumption'] != 0).all())
+        pd.testing.assert_frame_equal(expected.drop(columns='consumption'),
+                                      self.submission_df.drop(columns='consumption'))
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from csef.utils.transfer import LocalBucket, RemoteFile, TransferEngine, TransferError
+
+
+class FlakyBucket(LocalBucket):
+    """Fail the first download of each file"""
+
+    def __init__(self, root):
+        super(FlakyBucket, self).__init__(root)
+        self.failed = set()
+
+    def download(self, name, file_path):
+        if name not in self.failed:
+            self.failed.add(name)
+            with open(file_path, 'w') as f:
+                f.write('partial')
+            raise IOError('Connection reset')
+        super(FlakyBucket, self).download(name, file_path)
+
+
+class NoChecksumBucket(LocalBucket):
+    """A bucket without the md5 of the files, e.g. the composite objects"""
+
+    def list(self, prefix):
+        return [RemoteFile(remote_file.name, None, remote_file.size, remote_file.updated)
+                for remote_file in super(NoChecksumBucket, self).list(prefix)]
+
+
+class TransferEngineTestCase(unittest.TestCase):
+    """
+    Check the sync and upload against a local folder standing for the bucket
+    """
+    def setUp(self):
+        self.bucket_root = tempfile.mkdtemp()
+        self.local_root = tempfile.mkdtemp()
+
+        for i in range(5):
+            self._write(self.bucket_root, 'models/1/file{}.txt'.format(i), 'content {}'.format(i))
+
+    def tearDown(self):
+        shutil.rmtree(self.bucket_root)
+        shutil.rmtree(self.local_root)
+
+    @staticmethod
+    def _write(root, name, content):
+        path = os.path.join(root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_sync_skips_up_to_date_files(self):
+        engine = TransferEngine(LocalBucket(self.bucket_root), n_workers=3)
+
+        self.assertEqual(len(engine.sync_folder('models/1', self.local_root)), 5)
+        self._write(self.bucket_root, 'models/1/file0.txt', 'changed')
+
+        self.assertEqual(engine.sync_folder('models/1', self.local_root), ['models/1/file0.txt'])
+        with open(os.path.join(self.local_root, 'models/1/file0.txt')) as f:
+            self.assertEqual(f.read(), 'changed')
+
+    def test_download_retries_without_partial_files(self):
+        engine = TransferEngine(FlakyBucket(self.bucket_root), backoff=0)
+
+        self.assertEqual(len(engine.sync_folder('models', self.local_root)), 5)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.local_root, 'models/1'))),
+                         ['file{}.txt'.format(i) for i in range(5)])
+
+        with self.assertRaises(TransferError):
+            TransferEngine(FlakyBucket(self.bucket_root), max_retries=0) \
+                .sync_folder('models', tempfile.mkdtemp(dir=self.local_root))
+
+    def test_upload_folder(self):
+        engine = TransferEngine(LocalBucket(self.bucket_root))
+        self._write(self.local_root, 'models/1/file0.txt', 'content 0')
+        self._write(self.local_root, 'models/1/new.txt', 'new')
+
+        self.assertEqual(engine.upload_folder('models/1', self.local_root), ['models/1/new.txt'])
+        self.assertTrue(os.path.isfile(os.path.join(self.bucket_root, 'models/1/new.txt')))
+
+    def test_unknown_md5_compares_size_and_time(self):
+        engine = TransferEngine(NoChecksumBucket(self.bucket_root))
+
+        self.assertEqual(len(engine.sync_folder('models/1', self.local_root)), 5)
+        self.assertEqual(engine.sync_folder('models/1', self.local_root), [])
+
+        # A stale local file with the same size is downloaded again
+        self._write(self.local_root, 'models/1/file1.txt', 'stale   1')
+        os.utime(os.path.join(self.local_root, 'models/1/file1.txt'), (0, 0))
+        self.assertEqual(engine.sync_folder('models/1', self.local_root), ['models/1/file1.txt'])
+
+        # A changed local file with the same size is uploaded
+        self._write(self.local_root, 'models/1/file2.txt', 'changed 2')
+        os.utime(os.path.join(self.local_root, 'models/1/file2.txt'), (time.time() + 60, time.time() + 60))
+        self.assertEqual(engine.upload_folder('models/1', self.local_root), ['models/1/file2.txt'])
@@ -2,3 +2,7 @@ from .avg import generate_submission_avg # noqa
 from .geomean import generate_submission_geomean # noqa
 from .rankavg import generate_submission_rankavg # noqa
 from .vote import generate_submission_vote # noqa
+from .engine import blend_submission_files, generate_submissions # noqa
+from .vote import get_file_weights # noqa
+from .rank import rank_average, rankdata # noqa
+from .stacking import BlendingWeightsOptimizer, fit_blending_weights, generate_submission_blend # noqa
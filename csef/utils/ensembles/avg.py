@@ -1,24 +1,9 @@
 # -*- coding: utf-8 -*-
 
-from collections import defaultdict
 from glob import glob
 
+from .engine import blend_submission_files
+
 
 def generate_submission_avg(glob_files, loc_outfile, method="average"):
-    if method == "average":
-        scores = defaultdict(float)
-    with open(loc_outfile, "w") as outfile:
-        for i, glob_file in enumerate(glob(glob_files)):
-            print("Parsing: {glob_file}".format(glob_file=glob_file))
-            # sort glob_file by first column, ignoring the first line
-            lines = open(glob_file).readlines()
-            lines = [lines[0]] + sorted(lines[1:])
-            for e, line in enumerate(lines):
-                if i == 0 and e == 0:
-                    outfile.write(line)
-                if e > 0:
-                    row = line.strip().split(",")
-                    scores[(e, row[0])] += float(row[1])
-        for j, k in sorted(scores):
-            outfile.write("%s,%f\n" % (k, scores[(j, k)]/(i+1)))
-        print("Wrote to {loc_outfile}".format(loc_outfile=loc_outfile))
+    blend_submission_files(sorted(glob(glob_files)), loc_outfile, method='avg')
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""The streaming engine to blend many submission files."""
+
+import numpy as np
+import pandas as pd
+
+from .rank import rank_average
+
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def _is_sorted_by_id(file_path, chunk_size):
+    """Check the ids of a submission file are sorted, only the id column is read"""
+    last_id = None
+
+    for chunk in pd.read_csv(file_path, usecols=[0], chunksize=chunk_size):
+        ids = chunk.iloc[:, 0].values
+        if len(ids) == 0:
+            continue
+        if (last_id is not None and ids[0] < last_id) or np.any(ids[1:] < ids[:-1]):
+            return False
+        last_id = ids[-1]
+
+    return True
+
+
+def _iter_file_chunks(file_path, chunk_size, as_text=False):
+    """
+    Iterate the (ids, values) of a submission file chunk by chunk, sorted by id.
+    A file which is not sorted by id is loaded and sorted in memory.
+    The values are kept as written in the file if `as_text`.
+    """
+    value_column = pd.read_csv(file_path, nrows=0).columns[1]
+    read_kwargs = {'usecols': [0, 1], 'dtype': {value_column: str} if as_text else None}
+
+    def get_values(chunk):
+        values = chunk.iloc[:, 1].values
+        return values if as_text else values.astype(np.float64)
+
+    if _is_sorted_by_id(file_path, chunk_size):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, **read_kwargs):
+            yield chunk.iloc[:, 0].values, get_values(chunk)
+    else:
+        df = pd.read_csv(file_path, **read_kwargs)
+        df = df.sort_values(df.columns[0], kind='mergesort')
+
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            yield chunk.iloc[:, 0].values, get_values(chunk)
+
+
+class SubmissionMerger(object):
+    """
+    Merge the submission files as streams aligned on the id column (e.g. `pred_id`).
+
+    Each iteration gives the ids and the (n_rows, n_files) matrix of the values of the next rows,
+    so the memory is bounded by the chunk size times the number of files. The matrix has the
+    values as written in the files (strings) if `as_text`, the float values otherwise.
+    """
+
+    def __init__(self, files, chunk_size=DEFAULT_CHUNK_SIZE, as_text=False):
+        if not files:
+            raise ValueError('There is no submission file to merge!')
+
+        self.files = list(files)
+        self.chunk_size = chunk_size
+        self.as_text = as_text
+        self.columns = list(pd.read_csv(self.files[0], nrows=0).columns[:2])
+
+    def __iter__(self):
+        readers = [_iter_file_chunks(file_path, self.chunk_size, self.as_text) for file_path in self.files]
+        buffers = [None] * len(readers)
+
+        while True:
+            # Refill the consumed buffers
+            for i, reader in enumerate(readers):
+                while buffers[i] is None or len(buffers[i][0]) == 0:
+                    buffers[i] = next(reader, None)
+                    if buffers[i] is None:
+                        break
+
+            exhausted = [buffer is None for buffer in buffers]
+            if all(exhausted):
+                return
+            if any(exhausted):
+                raise ValueError('The submission files do not have the same ids!')
+
+            # Emit the rows up to the smallest last id of the buffers
+            bound = min(buffer[0][-1] for buffer in buffers)
+            sizes = [np.searchsorted(buffer[0], bound, side='right') for buffer in buffers]
+
+            ids = buffers[0][0][:sizes[0]]
+            for buffer, size in zip(buffers, sizes):
+                if size != len(ids) or not np.array_equal(buffer[0][:size], ids):
+                    raise ValueError('The submission files do not have the same ids!')
+
+            yield ids, np.column_stack([buffer[1][:size] for buffer, size in zip(buffers, sizes)])
+
+            buffers = [(buffer[0][size:], buffer[1][size:]) for buffer, size in zip(buffers, sizes)]
+
+
+def blend_avg(matrix, weights=None):
+    """The (weighted) mean of each row"""
+    return np.average(np.asarray(matrix, dtype=np.float64), axis=1, weights=weights)
+
+
+def blend_linear(matrix, weights=None):
+    """The weighted sum of each row, the weights are used as is"""
+    if weights is None:
+        weights = np.ones(matrix.shape[1])
+
+    return np.asarray(matrix, dtype=np.float64).dot(np.asarray(weights, dtype=np.float64))
+
+
+def blend_geomean(matrix, weights=None):
+    """The (weighted) geometric mean of each row, computed in log space"""
+    with np.errstate(divide='ignore'):
+        return np.exp(np.average(np.log(np.asarray(matrix, dtype=np.float64)), axis=1, weights=weights))
+
+
+def blend_vote(matrix, weights=None):
+    """
+    The value with the largest (weighted) number of votes in each row.
+    On a tie, the value given by the first file wins. The values can be the strings written in the files.
+    """
+    if weights is None:
+        weights = np.ones(matrix.shape[1])
+
+    weights = np.asarray(weights, dtype=np.float64)
+
+    # votes[r, j] is the total weight of the files agreeing with the file j on the row r
+    votes = np.empty(matrix.shape, dtype=np.float64)
+    for j in range(matrix.shape[1]):
+        votes[:, j] = (matrix == matrix[:, j:j + 1]).dot(weights)
+
+    return matrix[np.arange(len(matrix)), np.argmax(votes, axis=1)]
+
+
+def blend_rankavg(matrix, weights=None, ties='ordinal'):
+    """
+    The rank average of each row, scaled to [0, 1]. Each column is ranked by its values,
+    the average of the ranks is ranked again.
+    """
+    return rank_average(matrix, method=ties, weights=weights)
+
+
+STREAMING_BLENDS = {
+    'avg': blend_avg,
+    'linear': blend_linear,
+    'geomean': blend_geomean,
+    'vote': blend_vote
+}
+
+FULL_BLENDS = {
+    'rankavg': blend_rankavg
+}
+
+# The vote keeps the values of the files and the ranks are fractions, both are written as is
+FLOAT_FORMATS = {
+    'avg': '%f',
+    'linear': '%f',
+    'geomean': '%f',
+    'vote': None,
+    'rankavg': None
+}
+
+
+def _check_method(method):
+    if method not in STREAMING_BLENDS and method not in FULL_BLENDS:
+        raise ValueError('The blend method {} is not supported!'.format(method))
+
+
+def _write_rows(outfile, columns, ids, values, float_format):
+    pd.DataFrame({columns[0]: ids, columns[1]: values}, columns=columns) \
+        .to_csv(outfile, header=False, index=False, float_format=float_format)
+
+
+def blend_submission_files(files, loc_outfile, method='avg', weights=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                           ties='ordinal'):
+    """
+    Blend the submission files into one submission file
+    :param files: The list of submission files
+    :param loc_outfile: The path to the output file
+    :param method: The blend method, one of `avg`, `linear`, `geomean`, `vote` and `rankavg`
+    :param weights: The weight of each file. Default is the same weight for all files
+    :param chunk_size: The number of rows read per file at a time
+    :param ties: How the rank average ranks the ties, see `rank.rankdata`
+    """
+    _check_method(method)
+    float_format = FLOAT_FORMATS[method]
+
+    for file_path in files:
+        print("Parsing: {}".format(file_path))
+
+    # The votes are on the values as written in the files, which are written back as is
+    merger = SubmissionMerger(files, chunk_size, as_text=method == 'vote')
+
+    with open(loc_outfile, "w") as outfile:
+        outfile.write(','.join(merger.columns) + '\n')
+
+        if method in STREAMING_BLENDS:
+            blend = STREAMING_BLENDS[method]
+
+            for ids, matrix in merger:
+                _write_rows(outfile, merger.columns, ids, blend(matrix, weights), float_format)
+        else:
+            # The ranks need all rows of the files
+            chunks = list(merger)
+            if chunks:
+                ids = np.concatenate([chunk[0] for chunk in chunks])
+                matrix = np.concatenate([chunk[1] for chunk in chunks])
+                _write_rows(outfile, merger.columns, ids, FULL_BLENDS[method](matrix, weights, ties), float_format)
+
+    print("Wrote to {}".format(loc_outfile))
+
+
+def load_submission_matrix(files, mmap_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Load the submission files into one matrix aligned on the ids
+    :param files: The list of submission files
+    :param mmap_path: The file to memory-map the matrix to. Default is to keep it in memory
+    :param chunk_size: The number of rows read per file at a time
+    :return: The columns, the ids and the float32 matrix with shape (n_rows, n_files)
+    """
+    for file_path in files:
+        print("Parsing: {}".format(file_path))
+
+    merger = SubmissionMerger(files, chunk_size)
+    ids = []
+
+    if mmap_path is None:
+        blocks = [np.empty((0, len(merger.files)), dtype=np.float32)]
+
+        for chunk_ids, chunk in merger:
+            ids.append(chunk_ids)
+            blocks.append(chunk.astype(np.float32))
+
+        matrix = np.concatenate(blocks)
+    else:
+        with open(mmap_path, 'wb') as f:
+            for chunk_ids, chunk in merger:
+                ids.append(chunk_ids)
+                chunk.astype(np.float32).tofile(f)
+
+        n_rows = sum(len(chunk_ids) for chunk_ids in ids)
+        if n_rows > 0:
+            matrix = np.memmap(mmap_path, dtype=np.float32, mode='r', shape=(n_rows, len(merger.files)))
+        else:
+            matrix = np.empty((0, len(merger.files)), dtype=np.float32)
+
+    ids = np.concatenate(ids) if ids else np.empty(0)
+
+    return merger.columns, ids, matrix
+
+
+def write_blends(columns, ids, matrix, outputs, chunk_size=DEFAULT_CHUNK_SIZE, ties='ordinal'):
+    """
+    Write all blends of a submission matrix in one pass over its rows. The vote of the float matrix
+    can write the values in another format than the files, `blend_submission_files` keeps them as is.
+    :param columns: The id and value columns of the submission
+    :param ids: The ids of the rows
+    :param matrix: The submission matrix with shape (n_rows, n_files)
+    :param outputs: The list of (loc_outfile, method, weights), the weights can be None
+    :param chunk_size: The number of rows blended at a time
+    :param ties: How the rank average ranks the ties, see `rank.rankdata`
+    """
+    for _, method, _ in outputs:
+        _check_method(method)
+
+    # The ranks need all rows of the matrix
+    full_blends = {}
+    for i, (_, method, weights) in enumerate(outputs):
+        if method in FULL_BLENDS and len(ids) > 0:
+            full_blends[i] = FULL_BLENDS[method](matrix, weights, ties)
+
+    outfiles = []
+    try:
+        for loc_outfile, _, _ in outputs:
+            outfiles.append(open(loc_outfile, "w"))
+            outfiles[-1].write(','.join(columns) + '\n')
+
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start:start + chunk_size]
+            chunk = np.asarray(matrix[start:start + chunk_size])
+
+            for i, (outfile, (_, method, weights)) in enumerate(zip(outfiles, outputs)):
+                if method in STREAMING_BLENDS:
+                    values = STREAMING_BLENDS[method](chunk, weights)
+                else:
+                    values = full_blends[i][start:start + chunk_size]
+
+                _write_rows(outfile, columns, chunk_ids, values, FLOAT_FORMATS[method])
+    finally:
+        for outfile in outfiles:
+            outfile.close()
+
+    for loc_outfile, _, _ in outputs:
+        print("Wrote to {}".format(loc_outfile))
+
+
+def generate_submissions(files, outputs, mmap_path=None, chunk_size=DEFAULT_CHUNK_SIZE, ties='ordinal'):
+    """
+    Load the submission files once and write all blends of them
+    :param files: The list of submission files
+    :param outputs: The list of (loc_outfile, method, weights), the weights can be None
+    :param mmap_path: The file to memory-map the submission matrix to. Default is to keep it in memory
+    :param chunk_size: The number of rows processed at a time
+    :param ties: How the rank average ranks the ties, see `rank.rankdata`
+    """
+    for _, method, _ in outputs:
+        _check_method(method)
+
+    columns, ids, matrix = load_submission_matrix(files, mmap_path, chunk_size)
+    write_blends(columns, ids, matrix, outputs, chunk_size, ties)
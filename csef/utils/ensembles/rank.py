@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Vectorized ranks for the rank average blend."""
+
+import os
+import tempfile
+
+import numpy as np
+
+
+TIE_METHODS = ['ordinal', 'average', 'min', 'max', 'dense']
+
+# The columns longer than this are ranked with an external sort
+DEFAULT_RANK_CHUNK_SIZE = 5000000
+
+
+def rankdata(values, method='ordinal'):
+    """
+    Rank the values from 0, like `scipy.stats.rankdata` minus one
+    :param values: The 1-D values
+    :param method: How to rank the ties, one of `ordinal`, `average`, `min`, `max` and `dense`.
+        `ordinal` ranks the ties by their position
+    :return: The float64 ranks
+    """
+    if method not in TIE_METHODS:
+        raise ValueError('The tie method {} is not supported!'.format(method))
+
+    values = np.asarray(values)
+    order = np.argsort(values, kind='mergesort')
+    ranks = np.empty(len(values), dtype=np.float64)
+
+    if method == 'ordinal':
+        ranks[order] = np.arange(len(values))
+        return ranks
+
+    sorted_values = values[order]
+    is_first = np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]])
+    dense = np.cumsum(is_first) - 1
+
+    if method == 'dense':
+        ranks[order] = dense
+        return ranks
+
+    # The position of the first and the last value of each group of ties
+    starts = np.concatenate([np.flatnonzero(is_first), [len(values)]])
+    min_ranks = starts[dense]
+    max_ranks = starts[dense + 1] - 1
+
+    if method == 'min':
+        ranks[order] = min_ranks
+    elif method == 'max':
+        ranks[order] = max_ranks
+    else:
+        ranks[order] = (min_ranks + max_ranks) / 2.
+
+    return ranks
+
+
+def _write_sorted_runs(values, chunk_size, tmp_dir):
+    """Sort the values chunk by chunk into memory-mapped runs"""
+    runs = []
+
+    for i, start in enumerate(range(0, len(values), chunk_size)):
+        run = np.sort(np.asarray(values[start:start + chunk_size], dtype=np.float64), kind='mergesort')
+
+        run_path = os.path.join(tmp_dir, 'run{}.npy'.format(i))
+        np.save(run_path, run)
+        runs.append(np.load(run_path, mmap_mode='r'))
+
+    return runs
+
+
+def external_rankdata(values, method='ordinal', chunk_size=DEFAULT_RANK_CHUNK_SIZE, tmp_dir=None):
+    """
+    Rank the values like `rankdata` with an external sort, only a chunk of the values and its run
+    are held in memory besides the ranks. The `dense` method needs all values, it is not supported.
+    :param values: The 1-D values, can be memory-mapped
+    :param method: How to rank the ties, one of `ordinal`, `average`, `min` and `max`
+    :param chunk_size: The number of values sorted at a time
+    :param tmp_dir: The folder of the sorted runs. Default is a temporary folder
+    :return: The float64 ranks
+    """
+    if method not in TIE_METHODS:
+        raise ValueError('The tie method {} is not supported!'.format(method))
+    if method == 'dense':
+        raise ValueError('The dense ranks are not supported by the external sort!')
+
+    ranks = np.empty(len(values), dtype=np.float64)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as runs_dir:
+        runs = _write_sorted_runs(values, chunk_size, runs_dir)
+
+        for i, start in enumerate(range(0, len(values), chunk_size)):
+            # The sorted chunk is the run of the chunk, searching sorted values keeps the runs access sequential
+            order = np.argsort(np.asarray(values[start:start + chunk_size], dtype=np.float64), kind='mergesort')
+            chunk = np.asarray(runs[i])
+
+            # Count the values smaller than and equal to each value over all runs
+            n_less = np.zeros(len(chunk), dtype=np.int64)
+            n_less_equal = np.zeros(len(chunk), dtype=np.int64)
+            n_equal_before = np.zeros(len(chunk), dtype=np.int64)
+
+            for j, run in enumerate(runs):
+                if j == i:
+                    left = np.searchsorted(chunk, chunk, side='left')
+                    right = np.searchsorted(chunk, chunk, side='right')
+                else:
+                    left = np.searchsorted(run, chunk, side='left')
+                    right = np.searchsorted(run, chunk, side='right')
+
+                    # The ties of the previous chunks come first
+                    if j < i:
+                        n_equal_before += right - left
+
+                n_less += left
+                n_less_equal += right
+
+            if method == 'ordinal':
+                # Inside its own chunk, a tie is ranked by its position
+                chunk_ranks = n_less - np.searchsorted(chunk, chunk, side='left') + n_equal_before \
+                    + np.arange(len(chunk))
+            elif method == 'min':
+                chunk_ranks = n_less
+            elif method == 'max':
+                chunk_ranks = n_less_equal - 1
+            else:
+                chunk_ranks = (n_less + n_less_equal - 1) / 2.
+
+            ranks[start + order] = chunk_ranks
+
+    return ranks
+
+
+def rank_average(matrix, method='ordinal', weights=None, chunk_size=DEFAULT_RANK_CHUNK_SIZE):
+    """
+    Rank each column of the predictions, average the ranks of each row and rank the averages again
+    :param matrix: The predictions with shape (n_rows, n_models), can be memory-mapped
+    :param method: How to rank the ties, see `rankdata`
+    :param weights: The weight of each model. Default is the same weight for all models
+    :param chunk_size: The columns longer than this are ranked with an external sort.
+        None ranks them in memory
+    :return: The final ranks scaled to [0, 1]
+    """
+    n_rows, n_models = matrix.shape
+
+    if weights is None:
+        weights = np.ones(n_models)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    def _rank(values):
+        if chunk_size is not None and len(values) > chunk_size and method != 'dense':
+            return external_rankdata(values, method, chunk_size)
+        return rankdata(values, method)
+
+    average_ranks = np.zeros(n_rows, dtype=np.float64)
+    for j in range(n_models):
+        average_ranks += weights[j] * _rank(matrix[:, j])
+    average_ranks /= weights.sum()
+
+    return _rank(average_ranks) / max(n_rows - 1, 1)
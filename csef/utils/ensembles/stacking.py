@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Learn the blending weights of the models from their out-of-fold predictions."""
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cholesky, solve_triangular
+from scipy.optimize import nnls
+
+from .engine import blend_submission_files, load_submission_matrix
+
+
+def _weighted_nnls(X, y, sample_weight=None, ridge=1e-10):
+    """
+    Solve min ||sqrt(sample_weight) * (X.w - y)||^2 with w >= 0 on the normal equations,
+    so the solver only works on (n_models, n_models) matrices.
+    """
+    if sample_weight is None:
+        Xw = X
+    else:
+        Xw = X * sample_weight[:, np.newaxis]
+
+    gram = Xw.T.dot(X)
+    gram[np.diag_indices_from(gram)] += ridge * max(np.trace(gram) / len(gram), 1.)
+
+    # With gram = L.L^T, ||L^T.w - L^-1.X^T.y||^2 has the same minimizer
+    lower = cholesky(gram, lower=True)
+    rhs = solve_triangular(lower, Xw.T.dot(y), lower=True)
+
+    weights, _ = nnls(lower.T, rhs)
+    return weights
+
+
+class BlendingWeightsOptimizer(object):
+    """
+    Fit the non-negative weights of a linear blend of the models minimizing the MAE.
+
+    The weights start from the least squares solution and are refined by iteratively
+    reweighted least squares, each step is a small NNLS on the normal equations.
+    The models with a weight share below `min_weight` are dropped and the others refitted.
+    """
+
+    weights_ = None
+    mae_ = None
+
+    def __init__(self, max_iter=50, tol=1e-6, min_weight=0.01, eps=1e-6):
+        """
+        :param max_iter: The maximum number of reweighting iterations
+        :param tol: Stop when the relative improvement of the MAE is below this
+        :param min_weight: The minimum share of the total weight to keep a model
+        :param eps: The smallest residual used for the reweighting
+        """
+        self.max_iter = max_iter
+        self.tol = tol
+        self.min_weight = min_weight
+        self.eps = eps
+
+    @property
+    def selected_(self):
+        """The index of the models kept by the blend"""
+        return np.flatnonzero(self.weights_ > 0)
+
+    def _fit_mae(self, X, y):
+        weights = _weighted_nnls(X, y)
+        mae = np.abs(X.dot(weights) - y).mean()
+
+        for _ in range(self.max_iter):
+            residuals = np.abs(X.dot(weights) - y)
+            new_weights = _weighted_nnls(X, y, 1. / np.maximum(residuals, self.eps))
+            new_mae = np.abs(X.dot(new_weights) - y).mean()
+
+            if new_mae >= mae:
+                break
+
+            improvement = (mae - new_mae) / max(mae, self.eps)
+            weights, mae = new_weights, new_mae
+
+            if improvement < self.tol:
+                break
+
+        return weights, mae
+
+    def fit(self, predictions, y):
+        """
+        :param predictions: The out-of-fold predictions with shape (n_rows, n_models)
+        :param y: The targets
+        :return: self
+        """
+        X = np.asarray(predictions, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        weights, mae = self._fit_mae(X, y)
+
+        # Drop the weak models and refit the others
+        keep = weights > self.min_weight * weights.sum()
+        if 0 < keep.sum() < len(keep):
+            kept_weights, mae = self._fit_mae(X[:, keep], y)
+            weights = np.zeros(X.shape[1])
+            weights[keep] = kept_weights
+
+        self.weights_ = weights
+        self.mae_ = mae
+
+        return self
+
+    def predict(self, predictions):
+        """
+        :param predictions: The predictions with shape (n_rows, n_models)
+        :return: The blended predictions
+        """
+        return np.asarray(predictions, dtype=np.float64).dot(self.weights_)
+
+
+def _load_target(target, ids):
+    """Align the target, a Series indexed by id or a csv file of (id, target), on the ids"""
+    if not isinstance(target, pd.Series):
+        target = pd.read_csv(target, usecols=[0, 1], index_col=0).iloc[:, 0]
+
+    target = target.reindex(ids)
+    if target.isnull().any():
+        raise ValueError('The target is missing for {} ids!'.format(target.isnull().sum()))
+
+    return target.values
+
+
+def fit_blending_weights(oof_files, target, **kwargs):
+    """
+    Fit the blending weights of the models from their out-of-fold or holdout predictions
+    :param oof_files: The prediction files of the models, in the submission format
+    :param target: The target, a Series indexed by id or a csv file of (id, target)
+    :param kwargs: The parameters of `BlendingWeightsOptimizer`
+    :return: The fitted `BlendingWeightsOptimizer`
+    """
+    _, ids, matrix = load_submission_matrix(oof_files)
+
+    return BlendingWeightsOptimizer(**kwargs).fit(matrix, _load_target(target, ids))
+
+
+def generate_submission_blend(submission_files, loc_outfile, optimizer):
+    """
+    Blend the test submissions of the models with the fitted weights,
+    the models with a zero weight are not read
+    :param submission_files: The submission files, in the order of the out-of-fold files
+    :param loc_outfile: The path to the output file
+    :param optimizer: The fitted `BlendingWeightsOptimizer`
+    """
+    if len(submission_files) != len(optimizer.weights_):
+        raise ValueError('There are {} submission files for {} weights!'
+                         .format(len(submission_files), len(optimizer.weights_)))
+
+    selected = optimizer.selected_
+    blend_submission_files([submission_files[i] for i in selected], loc_outfile,
+                           method='linear', weights=optimizer.weights_[selected])
@@ -1,38 +1,30 @@
 # -*- coding: utf-8 -*-
 
-from collections import defaultdict, Counter
 from glob import glob
 import re
 
+from .engine import blend_submission_files
+
+
+def get_file_weights(files, weights="uniform"):
+    """ The weights of the files, `weighted` reads them from the `_w<weight>_` part of the file names"""
+    pattern = re.compile(r"(.)*_[w|W](\d*)_[.]*")
+    weight_list = [1]*len(files)
+
+    if weights == "weighted":
+        for i, file_path in enumerate(files):
+            weight = pattern.match(file_path)
+            if weight and weight.group(2):
+                print("Using weight: {}".format(weight.group(2)))
+                weight_list[i] = int(weight.group(2))
+            else:
+                print("Using weight: 1")
+
+    return weight_list
+
 
 def generate_submission_vote(glob_files, loc_outfile, method="average", weights="uniform"):
     """ Voting submission files support `uniform` and `weighted`"""
-    pattern = re.compile(r"(.)*_[w|W](\d*)_[.]*")
-    if method == "average":
-        scores = defaultdict(list)
-
-    with open(loc_outfile, "w") as outfile:
-        # weight_list may be usefull using a different method
-        weight_list = [1]*len(glob(glob_files))
-        for i, glob_file in enumerate(glob(glob_files)):
-            print("Parsing: {}".format(glob_file))
-            if weights == "weighted":
-                weight = pattern.match(glob_file)
-                if weight and weight.group(2):
-                    print("Using weight: {}".format(weight.group(2)))
-                    weight_list[i] = weight_list[i]*int(weight.group(2))
-                else:
-                    print("Using weight: 1")
-            # sort glob_file by first column, ignoring the first line
-            lines = open(glob_file).readlines()
-            lines = [lines[0]] + sorted(lines[1:])
-            for e, line in enumerate(lines):
-                if i == 0 and e == 0:
-                    outfile.write(line)
-                if e > 0:
-                    row = line.strip().split(",")
-                    for l in range(1, weight_list[i]+1):
-                        scores[(e, row[0])].append(row[1])
-        for j, k in sorted(scores):
-            outfile.write("%s,%s\n" % (k, Counter(scores[(j, k)]).most_common(1)[0][0]))
-        print("Wrote to {}".format(loc_outfile))
+    # The ties are won by the first file, in the glob order
+    files = glob(glob_files)
+    blend_submission_files(files, loc_outfile, method='vote', weights=get_file_weights(files, weights))
@@ -1,15 +1,15 @@
 # -*- coding: utf-8 -*-
 import os
-from datetime import datetime
-
-from google.cloud import datastore
-import numpy as np
-from pandas.core.indexes.base import Index
+import sys
 
 from csef.session import SessionManager
 from csef.utils.design_patterns import SingletonDecorator
 
 
+# The maximum number of entities in one call of the batch API
+MAX_BATCH_SIZE = 500
+
+
 @SingletonDecorator
 class GoogleDataStore(object):
 
@@ -17,29 +17,11 @@ class GoogleDataStore(object):
         """
         This class defines the wrapper for google datastore.
         """
-        self.client = datastore.Client()
-
-    def _update_default_data(self, data):
-        default = {
-            'created': datetime.now(),
-            'session_id': self.session_id,
-            'config_file': self.config_file
-        }
-
-        # In case we already has the created in the data
-        # we need to leave the created here to keep the timeline of process
-        if 'created' in data:
-            del default['created']
+        # The client is imported on the first use, it's slow to import
+        from google.cloud import datastore
 
-        default.update(data)
-
-        return default
-
-    def _build_pipeline_result_key(self, session_id):
-        return (
-            'Pipeline', self.config_file,
-            'Result', session_id
-        )
+        self.datastore = datastore
+        self.client = datastore.Client()
 
     @property
     def session_id(self):
@@ -62,13 +44,19 @@ class GoogleDataStore(object):
         """
         if path is None:
             path = []
+
+        # The data can't contain numpy arrays or pandas indexes if they're not imported
+        numpy = sys.modules.get('numpy')
+        pandas = sys.modules.get('pandas')
+
         if isinstance(data, dict):
             value = {k: self.normalize_data(v, path + [k])
                      for k, v in data.items()}
         elif isinstance(data, list):
             value = [self.normalize_data(elem, path + [[]])
                      for elem in data]
-        elif isinstance(data, np.ndarray) or isinstance(data, Index):
+        elif (numpy is not None and isinstance(data, numpy.ndarray)) or \
+                (pandas is not None and isinstance(data, pandas.Index)):
             value = data.tolist()
         else:
             value = data
@@ -87,26 +75,29 @@ class GoogleDataStore(object):
 
         pipeline_key = self.client.key(*key)
 
-        entity = datastore.Entity(key=pipeline_key)
+        entity = self.datastore.Entity(key=pipeline_key)
         entity.update(self.normalize_data(data))
 
         self.client.put(entity)
 
-    def upsert_pipeline_log(self, log_data):
+    def upsert_multi(self, records):
         """
-        Upsert the pipeline log
-        :param log_data: The log data
+        Update and insert many entities with the batch API
+        :param records: The list of tuple (key, data), the key in tuple type
         """
-        key = ('Pipeline', self.config_file, 'LogList', self.session_id, 'Log')
-        self.upsert(key, self._update_default_data(log_data))
 
-    def upsert_pipeline_result(self, result_data):
-        """
-        Upsert the pipeline result
-        :param result_data: The result data
-        """
-        key = self._build_pipeline_result_key(self.session_id)
-        self.upsert(key, self._update_default_data(result_data))
+        # Doesn't allow if the session flag set to false
+        if not self.remote_result:
+            return
+
+        entities = []
+        for key, data in records:
+            entity = self.datastore.Entity(key=self.client.key(*key))
+            entity.update(self.normalize_data(data))
+            entities.append(entity)
+
+        for start in range(0, len(entities), MAX_BATCH_SIZE):
+            self.client.put_multi(entities[start:start + MAX_BATCH_SIZE])
 
     def query(self, kind, filter_rules, orders=[], limit=100):
         """
@@ -169,15 +160,6 @@ class GoogleDataStore(object):
         storage_key = self.client.key(*key)
         return self.client.get(storage_key)
 
-    def get_result_by_session(self, session_id):
-        """
-        Get an entity with key
-        :param key: The tuple of key, example ('Pipeline', 'lightgbm-baseline', 'Result', '1234561')
-        :param session_id: The session id
-        :return: The dict of value
-        """
-        return self.get(self._build_pipeline_result_key(session_id))
-
     def delete(self, keys):
         """
         Delete one or multiple keys
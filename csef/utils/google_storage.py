@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-from google.cloud import storage
-
 from csef.utils.design_patterns import SingletonDecorator
 
 
@@ -11,6 +9,9 @@ class GoogleStorage(object):
         """
         This class defines the wrapper for google datastore.
         """
+        # The client is imported on the first use, it's slow to import
+        from google.cloud import storage
+
         self.client = storage.Client()
 
     def create_bucket(self, bucket_name):
@@ -4,7 +4,7 @@ import tarfile
 import importlib
 import json
 import operator
-import collections
+import collections.abc
 import os
 import shutil
 import yaml
@@ -119,7 +119,7 @@ def dict_deep_update(d, u):
     :return: The new dict
     """
     for k, v in u.items():
-        if isinstance(v, collections.Mapping):
+        if isinstance(v, collections.abc.Mapping):
             d[k] = dict_deep_update(d.get(k, {}), v)
         else:
             d[k] = v
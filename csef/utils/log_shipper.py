@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Ship the log records to the remote storage in batches from a background thread."""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+
+# The standard logger, the MLLogger would send its own errors back to the shipper
+logger = logging.getLogger(__name__)
+
+
+class _Control(object):
+    """The message asking the background thread to ship the batch, then to stop or to notify"""
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class SequentialKeyGenerator(object):
+    """
+    Generate increasing sequence numbers, based on the time in microseconds so the
+    numbers of a resumed session keep going after the ones already shipped
+    """
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._last = max(self._last + 1, int(time.time() * 1000000))
+            return self._last
+
+
+# The sequence numbers of the log records of the process
+log_sequence = SequentialKeyGenerator()
+
+
+class LogShipper(object):
+    """
+    Queue the log records and ship them in batches from a background thread. A batch is shipped when
+    it reaches `batch_size`, every `flush_interval` seconds, on `flush` and at the process exit.
+    When the queue is full the records are appended to `spill_file` or dropped.
+    """
+
+    def __init__(self, sink, max_queue_size=10000, batch_size=500, flush_interval=5., spill_file=None):
+        """
+        :param sink: The function taking the list of records to store, e.g. `get_result_store().upsert_multi`
+        :param max_queue_size: The maximum number of records waiting in the queue
+        :param batch_size: The maximum number of records per call of the sink
+        :param flush_interval: The maximum delay in seconds before a record is shipped
+        :param spill_file: The file to append the records to when the queue is full or the sink fails,
+            None to drop them
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_file = spill_file
+
+        self.n_shipped = 0
+        self.n_spilled = 0
+        self.n_dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._spill_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name='log-shipper', daemon=True)
+        self._thread.start()
+
+        atexit.register(self.close)
+
+    def emit(self, record):
+        """
+        Queue a record without blocking
+        :param record: The record, e.g. the tuple of (key, data)
+        """
+        if self._closed:
+            self._spill([record])
+            return
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._spill([record])
+
+    def flush(self, timeout=None):
+        """
+        Ship the queued records now and wait for them
+        :param timeout: The maximum time to wait in seconds
+        :return: True if the records were shipped in time
+        """
+        if self._closed:
+            return True
+
+        control = _Control()
+        try:
+            self._queue.put(control, timeout=timeout)
+        except queue.Full:
+            return False
+
+        return control.done.wait(timeout)
+
+    def close(self, timeout=10.):
+        """
+        Ship the queued records and stop the background thread
+        :param timeout: The maximum time to wait in seconds
+        """
+        if self._closed:
+            return
+
+        try:
+            self._queue.put(_Control(stop=True), timeout=timeout)
+        except queue.Full:
+            pass
+
+        self._thread.join(timeout)
+        self._closed = True
+
+    def _spill(self, records):
+        if self.spill_file is None:
+            self.n_dropped += len(records)
+            return
+
+        with self._spill_lock:
+            folder = os.path.dirname(self.spill_file)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+
+            with open(self.spill_file, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+            self.n_spilled += len(records)
+
+    def _ship(self, batch):
+        if not batch:
+            return
+
+        try:
+            self.sink(batch)
+            self.n_shipped += len(batch)
+        except Exception:
+            logger.exception('Failed to ship {} log records'.format(len(batch)))
+            self._spill(batch)
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _Control):
+                self._ship(batch)
+                batch, deadline = [], None
+
+                item.done.set()
+                if item.stop:
+                    return
+                continue
+
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.time() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (deadline is not None and time.time() >= deadline):
+                self._ship(batch)
+                batch, deadline = [], None
+
+
+def _upsert_to_result_store(records):
+    # The result store of the session is resolved at each batch
+    from csef.utils.result_store import get_result_store
+    get_result_store().upsert_multi(records)
+
+
+_shipper = None
+_shipper_lock = threading.Lock()
+
+
+def get_log_shipper():
+    """
+    Get the log shipper of the process, it ships the records to the result store of the session
+    :return: The `LogShipper`
+    """
+    global _shipper
+
+    with _shipper_lock:
+        if _shipper is None:
+            from csef.utils.helper import get_proj_home
+
+            _shipper = LogShipper(
+                _upsert_to_result_store,
+                spill_file=os.path.join(get_proj_home(), 'logs', 'remote-log-spill.jsonl')
+            )
+
+    return _shipper
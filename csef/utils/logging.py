@@ -7,7 +7,8 @@ import time
 from hashids import Hashids
 import logging
 
-from csef.utils.google_datastore import GoogleDataStore
+from csef.utils.result_store import get_result_store
+from csef.utils.log_shipper import get_log_shipper
 from csef.session import SessionManager
 
 
@@ -84,12 +85,12 @@ class MLLogger(object):
         """
         self.logger.log(level, message, extra=dict(self.extra, **extra))
 
-        # Log on the cloud
+        # Log on the cloud, the records are shipped in batches by a background thread
         if self.remote_log:
-            GoogleDataStore().upsert_pipeline_log({
+            get_log_shipper().emit(get_result_store().build_pipeline_log_record({
                 'message': message,
                 'level': level
-            })
+            }))
 
     def error(self, message, extra={}):
         """
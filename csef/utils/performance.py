@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
-from csef.data import preprocessing
-
 """The performance collection utils."""
 
 import time
@@ -60,28 +58,38 @@ def measure_mae(actual, predicted):
 
 # walk-forward validation for univariate data
 def walk_forward_validation(model_class, train, test, cfg, group_col='series_id', train_col='consumption'):
-    errors = []
-
     # fit model
     model = model_class(cfg)
     model.fit(train)
 
-    # do reset state before evaluation
-    model.reset_states()
+    # the scalers of the train series are fitted by the model
+    scaler_bank = model.scaler_bank
 
-    for ser_id, ser_data in test.groupby(group_col):
-        ser_train_data = train[train[group_col] == ser_id][train_col]
+    train_rows = train.groupby(group_col).indices
+    test_rows = test.groupby(group_col).indices
+    train_vals = train[train_col].values
+    test_vals = test[train_col].values
 
-        _, _, scaler = preprocessing.prepare_training_data(ser_train_data, 24)
-        yhat = model.predict(ser_train_data, scaler)
+    ser_ids = np.array(list(test_rows))
+    num_pred_hours = max(len(rows) for rows in test_rows.values())
 
-        ser_data_vals = ser_data[train_col].values
-        error = measure_mae(ser_data_vals, yhat)
+    # forecast all series together, each one starts from the reset states
+    windows = np.stack([scaler_bank.transform(train_vals[train_rows[ser_id]], ser_id)[-model.n_input:]
+                        for ser_id in ser_ids])
+    yhats = model.forecast(windows, num_pred_hours=num_pred_hours, reset_states=True)
+    yhats = scaler_bank.inverse_transform(yhats, ser_ids)
+
+    errors = []
+
+    for ser_id, yhat in zip(ser_ids, yhats):
+        ser_data_vals = test_vals[test_rows[ser_id]]
+        error = measure_mae(ser_data_vals, yhat[:len(ser_data_vals)])
 
         print('Id: {}, Error: {}'.format(ser_id, error))
 
         errors.append(error)
-        model.reset_states()
+
+    model.reset_states()
 
     # estimate prediction error
     error = np.mean(errors)
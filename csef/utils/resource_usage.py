@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Memory usage of the current process."""
+import os
+import resource
+import sys
+
+
+def _read_proc_status(field):
+    """Read a memory field (in kB) of /proc/self/status, None if not available"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+
+    return None
+
+
+def get_current_rss():
+    """
+    Get the resident set size of the process
+    :return: The RSS in bytes, None if not available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def get_peak_rss():
+    """
+    Get the peak resident set size of the process since the start or the last `reset_peak_rss`
+    :return: The peak RSS in bytes
+    """
+    peak_rss = _read_proc_status('VmHWM')
+    if peak_rss is not None:
+        return peak_rss
+
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS to the current RSS, only supported on Linux
+    :return: True if reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def format_bytes(n_bytes):
+    """Format a number of bytes for the logs, e.g. 1.5GB"""
+    if n_bytes is None:
+        return 'n/a'
+
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n_bytes) < 1024:
+            return '{:.1f}{}'.format(n_bytes, unit)
+        n_bytes /= 1024.
+
+    return '{:.1f}TB'.format(n_bytes)
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""The backends storing the pipeline results and logs: Google Datastore or an embedded SQLite database."""
+import base64
+import json
+import numbers
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+from csef.session import SessionManager
+from csef.utils.log_shipper import log_sequence
+
+
+# The columns of the entities with an index, the other properties are filtered with the metrics
+INDEXED_COLUMNS = ('session_id', 'config_file', 'created')
+OPERATORS = ('=', '<', '<=', '>', '>=')
+
+# The smallest value in SQLite, it replaces the missing values when ordering
+MISSING_VALUE = '-9e999'
+
+
+class BaseResultStore(object):
+    """
+    The interface of the storage of the pipeline results and logs. The records are the tuples of (key, data),
+    the key is a tuple of kinds and names like ('Pipeline', 'lightgbm-baseline', 'Result', 1234561).
+
+    The sub classes implement `upsert_multi`, `get` and `query_page`.
+    """
+
+    @property
+    def session_id(self):
+        return SessionManager().session_id
+
+    @property
+    def config_file(self):
+        return SessionManager().get_prop('config_file')
+
+    def _update_default_data(self, data, session_id=None):
+        default = {
+            'created': datetime.now(),
+            'session_id': self.session_id if session_id is None else session_id,
+            'config_file': self.config_file
+        }
+
+        # Keep the created in the data to keep the timeline of process
+        default.update(data)
+
+        return default
+
+    def _build_pipeline_result_key(self, session_id):
+        return (
+            'Pipeline', self.config_file,
+            'Result', session_id
+        )
+
+    def upsert_multi(self, records):
+        """
+        Update and insert many records
+        :param records: The list of tuple (key, data), the key in tuple type
+        """
+        raise NotImplementedError()
+
+    def get(self, key):
+        """
+        Get the data of a key
+        :param key: The tuple of key, example ('Pipeline', 'lightgbm-baseline', 'Result', 1234561)
+        :return: The dict of value, None if not found
+        """
+        raise NotImplementedError()
+
+    def query_page(self, kind, filter_rules=(), orders=(), limit=100, cursor=None):
+        """
+        Query a page of records
+        :param kind: The kind of records, e.g. Result or Log
+        :param filter_rules: The filter rules, the list of tuple (property, operator, value)
+        :param orders: The properties to order by, prefixed with '-' for the descending order
+        :param limit: The number of records of the page
+        :param cursor: The cursor returned with the previous page, None for the first page
+        :return: The tuple of (list of records, cursor of the next page or None if it's the last page)
+        """
+        raise NotImplementedError()
+
+    def upsert(self, key, data):
+        """
+        Update and insert with key
+        :param key: The key in tuple type
+        :param data: The data
+        """
+        self.upsert_multi([(key, data)])
+
+    def build_pipeline_log_record(self, log_data, sequence=None):
+        """
+        Build the record of a pipeline log, each log has its own key in the session
+        :param log_data: The log data
+        :param sequence: The sequence number of the log, default is the next one
+        :return: The tuple (key, data)
+        """
+        if sequence is None:
+            sequence = log_sequence.next()
+
+        key = ('Pipeline', self.config_file, 'LogList', self.session_id, 'Log', sequence)
+        return key, self._update_default_data(log_data)
+
+    def upsert_pipeline_log(self, log_data):
+        """
+        Upsert the pipeline log
+        :param log_data: The log data
+        """
+        self.upsert(*self.build_pipeline_log_record(log_data))
+
+    def upsert_pipeline_result(self, result_data, session_id=None):
+        """
+        Upsert the pipeline result
+        :param result_data: The result data
+        :param session_id: The session of the result, default is the current session
+        """
+        if session_id is None:
+            session_id = self.session_id
+
+        key = self._build_pipeline_result_key(session_id)
+        self.upsert(key, self._update_default_data(result_data, session_id))
+
+    def get_result_by_session(self, session_id):
+        """
+        Get the pipeline result of a session
+        :param session_id: The session id
+        :return: The dict of value
+        """
+        return self.get(self._build_pipeline_result_key(session_id))
+
+    def query(self, kind, filter_rules=(), orders=(), limit=100):
+        """
+        Query the first records
+        :param kind: The kind of records
+        :param filter_rules: filter rule in array of tuple
+        :param orders: The order rules
+        :param limit: The limit number of records return when do query. Default is 100
+        :return: List of results
+        """
+        return self.query_page(kind, filter_rules, orders, limit)[0]
+
+    def query_log(self, filter_rules=(), orders=(), limit=100):
+        return self.query('Log', filter_rules, orders, limit)
+
+    def query_result(self, filter_rules=(), orders=(), limit=100):
+        return self.query('Result', filter_rules, orders, limit)
+
+    def iter_query(self, kind, filter_rules=(), orders=(), page_size=1000):
+        """
+        Iterate over all the records of a query, page by page
+        :return: The generator of records
+        """
+        cursor = None
+        while True:
+            records, cursor = self.query_page(kind, filter_rules, orders, page_size, cursor)
+            for record in records:
+                yield record
+
+            if cursor is None:
+                return
+
+
+class DatastoreResultStore(BaseResultStore):
+    """The results in Google Datastore, only stored if the session enables `remote_result`"""
+
+    def __init__(self):
+        from csef.utils.google_datastore import GoogleDataStore
+        self.datastore = GoogleDataStore()
+
+    def upsert_multi(self, records):
+        self.datastore.upsert_multi(records)
+
+    def get(self, key):
+        return self.datastore.get(key)
+
+    def query_page(self, kind, filter_rules=(), orders=(), limit=100, cursor=None):
+        # Doesn't allow if the session flag set to false
+        if not self.datastore.remote_result:
+            return [], None
+
+        query = self.datastore.client.query(kind=kind)
+
+        for filter_rule in filter_rules:
+            query.add_filter(*filter_rule)
+
+        if orders:
+            query.order = list(orders)
+
+        iterator = query.fetch(limit=limit, start_cursor=cursor)
+        records = list(next(iterator.pages))
+        next_cursor = iterator.next_page_token
+
+        if len(records) < limit or not next_cursor:
+            next_cursor = None
+        elif isinstance(next_cursor, bytes):
+            next_cursor = next_cursor.decode('ascii')
+
+        return records, next_cursor
+
+
+def _to_builtin(value):
+    """Convert the numpy values to the python ones, they can't exist if numpy is not imported"""
+    numpy = sys.modules.get('numpy')
+
+    if numpy is not None:
+        if isinstance(value, numpy.ndarray):
+            return value.tolist()
+        if isinstance(value, numpy.generic):
+            return value.item()
+
+    return value
+
+
+def _json_default(value):
+    value = _to_builtin(value)
+    if isinstance(value, (list, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _get_metrics(data, prefix=''):
+    """Flatten the numeric values of the nested dicts, e.g. {'block_stats': {'train': {'wall_time': 1}}}"""
+    metrics = []
+
+    for key, value in data.items():
+        name = prefix + str(key)
+
+        if isinstance(value, dict):
+            metrics += _get_metrics(value, name + '.')
+        elif isinstance(value, numbers.Real):
+            metrics.append((name, float(value)))
+
+    return metrics
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
+
+class SQLiteResultStore(BaseResultStore):
+    """
+    The results in an embedded SQLite database, it works offline and queries hundreds of sessions in milliseconds.
+
+    The session id, the config file and the created time are indexed columns. The numeric values of the data
+    (flattened with dots, e.g. `block_stats.train.wall_time`) are also stored in an indexed metrics table,
+    so they can be filtered and ordered. The pages use the keyset pagination.
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: The path to the database file, ':memory:' for a temporary database
+        """
+        self.db_path = db_path
+
+        if db_path != ':memory:' and not os.path.isdir(os.path.dirname(os.path.abspath(db_path))):
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        # The connection is shared by the threads, e.g. the log shipper
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+
+        with self._lock, self.connection:
+            if db_path != ':memory:':
+                self.connection.execute('PRAGMA journal_mode=WAL')
+
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS entities (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    session_id INTEGER,
+                    config_file TEXT,
+                    created TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entities_session_id ON entities (kind, session_id);
+                CREATE INDEX IF NOT EXISTS entities_config_file ON entities (kind, config_file);
+                CREATE INDEX IF NOT EXISTS entities_created ON entities (kind, created);
+
+                CREATE TABLE IF NOT EXISTS metrics (
+                    key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value REAL,
+                    PRIMARY KEY (key, name)
+                );
+                CREATE INDEX IF NOT EXISTS metrics_value ON metrics (name, value);
+            ''')
+
+    @staticmethod
+    def _normalize_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return _to_builtin(value)
+
+    def upsert_multi(self, records):
+        entities = []
+        metrics = []
+
+        for key, data in records:
+            entity_key = json.dumps(list(key), default=_json_default)
+            entities.append((
+                entity_key, key[-2], self._normalize_value(data.get('session_id')), data.get('config_file'),
+                self._normalize_value(data.get('created')), json.dumps(data, default=_json_default)
+            ))
+            metrics += [(entity_key, name, value) for name, value in _get_metrics(data)]
+
+        with self._lock, self.connection:
+            self.connection.executemany('DELETE FROM metrics WHERE key = ?', [(entity[0],) for entity in entities])
+            self.connection.executemany('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)', entities)
+            self.connection.executemany('INSERT INTO metrics VALUES (?, ?, ?)', metrics)
+
+    def get(self, key):
+        entity_key = json.dumps(list(key), default=_json_default)
+
+        with self._lock:
+            row = self.connection.execute('SELECT data FROM entities WHERE key = ?', (entity_key,)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    @staticmethod
+    def _get_expression(prop):
+        """The SQL expression and its params of a property"""
+        if prop in INDEXED_COLUMNS:
+            return 'entities.{}'.format(prop), []
+
+        return '(SELECT value FROM metrics WHERE metrics.key = entities.key AND metrics.name = ?)', [prop]
+
+    @staticmethod
+    def _get_json_path(prop):
+        """The JSON path of a property, the dots separate the keys of the nested dicts"""
+        return '$' + ''.join('."{}"'.format(key.replace('"', '\\"')) for key in prop.split('.'))
+
+    def _build_filters(self, kind, filter_rules):
+        """
+        Build the conditions of the filter rules
+        :return: The tuple of (list of conditions, list of params)
+        """
+        conditions = ['entities.kind = ?']
+        params = [kind]
+
+        for prop, operator, value in filter_rules:
+            if operator not in OPERATORS:
+                raise ValueError('The operator {} is not supported, use one of {}'.format(operator, OPERATORS))
+
+            value = self._normalize_value(value)
+
+            if prop in INDEXED_COLUMNS:
+                conditions.append('entities.{} {} ?'.format(prop, operator))
+                params.append(value)
+            elif isinstance(value, str):
+                conditions.append('json_extract(entities.data, ?) {} ?'.format(operator))
+                params += [self._get_json_path(prop), value]
+            else:
+                conditions.append('entities.key IN (SELECT key FROM metrics WHERE name = ? AND value {} ?)'
+                                  .format(operator))
+                params += [prop, value]
+
+        return conditions, params
+
+    def _get_order_keys(self, orders):
+        """The tuples of (expression, params, descending) to order by, they end with the rowid for a total order"""
+        order_keys = []
+
+        for order in orders:
+            descending = order.startswith('-')
+            expression, params = self._get_expression(order.lstrip('-'))
+            order_keys.append(('COALESCE({}, {})'.format(expression, MISSING_VALUE), params, descending))
+        order_keys.append(('entities.rowid', [], False))
+
+        return order_keys
+
+    @staticmethod
+    def _build_cursor_condition(order_keys, last_values):
+        """
+        Build the condition selecting only the records after the last one of the previous page
+        :return: The tuple of (condition, list of params)
+        """
+        after_conditions = []
+        params = []
+
+        for i, (expression, expression_params, descending) in enumerate(order_keys):
+            parts = []
+            for j, (previous_expression, previous_params, _) in enumerate(order_keys[:i]):
+                parts.append('{} = ?'.format(previous_expression))
+                params += previous_params + [last_values[j]]
+
+            parts.append('{} {} ?'.format(expression, '<' if descending else '>'))
+            params += expression_params + [last_values[i]]
+
+            after_conditions.append('({})'.format(' AND '.join(parts)))
+
+        return '({})'.format(' OR '.join(after_conditions)), params
+
+    def query_page(self, kind, filter_rules=(), orders=(), limit=100, cursor=None):
+        conditions, where_params = self._build_filters(kind, filter_rules)
+        order_keys = self._get_order_keys(orders)
+
+        if cursor is not None:
+            condition, params = self._build_cursor_condition(order_keys, _decode_cursor(cursor))
+            conditions.append(condition)
+            where_params += params
+
+        select_params = [param for _, params, _ in order_keys for param in params]
+        order_params = list(select_params)
+
+        sql = 'SELECT entities.data, {} FROM entities WHERE {} ORDER BY {} LIMIT ?'.format(
+            ', '.join(expression for expression, _, _ in order_keys),
+            ' AND '.join(conditions),
+            ', '.join('{} {}'.format(expression, 'DESC' if descending else 'ASC')
+                      for expression, _, descending in order_keys)
+        )
+
+        with self._lock:
+            rows = self.connection.execute(sql, select_params + where_params + order_params + [limit]).fetchall()
+
+        records = [json.loads(row[0]) for row in rows]
+        next_cursor = _encode_cursor(list(rows[-1][1:])) if len(rows) == limit else None
+
+        return records, next_cursor
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+_result_stores = {}
+_result_stores_lock = threading.Lock()
+
+
+def get_result_store():
+    """
+    Get the result store chosen by the session prop `result_store`: `datastore` (default) or `sqlite`.
+    The SQLite database is the prop `result_store_path`, default is `<PROJ_HOME>/results.sqlite`
+    :return: The result store
+    """
+    backend = SessionManager().get_prop('result_store') or 'datastore'
+
+    if backend == 'datastore':
+        store_key = (backend,)
+    elif backend == 'sqlite':
+        from csef.utils.helper import get_proj_home
+
+        db_path = SessionManager().get_prop('result_store_path') or os.path.join(get_proj_home(), 'results.sqlite')
+        store_key = (backend, db_path)
+    else:
+        raise ValueError('The result store {} is not supported, use datastore or sqlite'.format(backend))
+
+    with _result_stores_lock:
+        if store_key not in _result_stores:
+            _result_stores[store_key] = DatastoreResultStore() if backend == 'datastore' \
+                else SQLiteResultStore(store_key[1])
+
+    return _result_stores[store_key]
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Binary store of the big stats of a session, e.g. the feature importances and the eval curves."""
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_SUFFIX = '.stats.json'
+ARRAY_REF = '$array'
+
+
+class StatsStore(object):
+    """
+    Store the stats of a session in its folder. The numeric arrays are kept natively in `.npy` files,
+    memory-mapped when read, and the rest of the data in a small JSON manifest. The series can be appended
+    during the training, they're raw `.bin` files growing at the end.
+
+    The files stay directly in the folder (`<key>.stats.json`, `<key>.<n>.npy`, `<key>.<name>.bin`)
+    so they're uploaded and synced with the other files of the session.
+    """
+
+    # The numeric lists with less elements are kept in the manifest
+    min_array_size = 100
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+
+    def _get_path(self, file_name):
+        return os.path.join(self.folder, file_name)
+
+    def _load_manifest(self, key):
+        manifest_file = self._get_path(key + MANIFEST_SUFFIX)
+
+        if not os.path.isfile(manifest_file):
+            return None
+
+        with open(manifest_file) as f:
+            return json.load(f)
+
+    def _write_manifest(self, key, manifest):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+        manifest_file = self._get_path(key + MANIFEST_SUFFIX)
+
+        with open(manifest_file + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True, default=str)
+        os.replace(manifest_file + '.tmp', manifest_file)
+
+    def _as_array(self, value):
+        """Convert a value to a numeric array to store natively, None if it's kept in the manifest"""
+        if isinstance(value, (pd.Series, pd.Index)):
+            value = value.values
+
+        if isinstance(value, list):
+            if len(value) < self.min_array_size:
+                return None
+            try:
+                value = np.asarray(value)
+            except ValueError:
+                return None
+
+        if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf' and value.ndim > 0:
+            return value
+
+        return None
+
+    def keys(self):
+        """The keys of the stats in the store"""
+        if not os.path.isdir(self.folder):
+            return []
+
+        return sorted(file_name[:-len(MANIFEST_SUFFIX)] for file_name in os.listdir(self.folder)
+                      if file_name.endswith(MANIFEST_SUFFIX))
+
+    def __contains__(self, key):
+        return os.path.isfile(self._get_path(key + MANIFEST_SUFFIX))
+
+    def write(self, key, data):
+        """
+        Write the stats, replace the data of the key but keep its series
+        :param key: The key of the stats, also the prefix of its files
+        :param data: The data, the dicts and lists can contain numpy arrays
+        """
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+        array_files = []
+
+        def encode(value):
+            array = self._as_array(value)
+            if array is not None:
+                file_name = '{}.{}.npy'.format(key, len(array_files))
+                array_files.append(file_name)
+
+                with open(self._get_path(file_name + '.tmp'), 'wb') as f:
+                    np.save(f, array)
+                os.replace(self._get_path(file_name + '.tmp'), self._get_path(file_name))
+
+                return {ARRAY_REF: file_name}
+
+            if isinstance(value, dict):
+                return {str(k): encode(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [encode(elem) for elem in value]
+            if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+                return value.tolist()
+            if isinstance(value, np.generic):
+                return value.item()
+
+            return value
+
+        with self._lock:
+            old_manifest = self._load_manifest(key) or {}
+            manifest = {
+                'data': encode(data),
+                'arrays': array_files,
+                'series': old_manifest.get('series', {})
+            }
+            self._write_manifest(key, manifest)
+
+            # Remove the arrays of the previous data
+            for file_name in set(old_manifest.get('arrays', [])) - set(array_files):
+                if os.path.isfile(self._get_path(file_name)):
+                    os.remove(self._get_path(file_name))
+
+    def append(self, key, name, values):
+        """
+        Append values at the end of a series, e.g. the eval metric of each iteration
+        :param key: The key of the stats
+        :param name: The name of the series
+        :param values: A value or an array of values, the rows of a 2D array are appended
+        """
+        values = np.asarray(values)
+        if values.ndim == 0:
+            values = values.reshape(1)
+
+        with self._lock:
+            manifest = self._load_manifest(key) or {'data': {}, 'arrays': [], 'series': {}}
+            series = manifest['series'].get(name)
+
+            if series is None:
+                series = manifest['series'][name] = {
+                    'file': '{}.{}.bin'.format(key, re.sub(r'[^\w\-]', '_', name)),
+                    'dtype': values.dtype.str,
+                    'shape': [0] + list(values.shape[1:])
+                }
+
+            if list(values.shape[1:]) != series['shape'][1:]:
+                raise ValueError('The values of the series {} must have the shape (n, {})'
+                                 .format(name, ', '.join(map(str, series['shape'][1:]))))
+
+            with open(self._get_path(series['file']), 'ab') as f:
+                f.write(np.ascontiguousarray(values, dtype=series['dtype']).tobytes())
+
+            series['shape'][0] += len(values)
+            self._write_manifest(key, manifest)
+
+    def _read_series(self, series, lazy=True):
+        shape = tuple(series['shape'])
+
+        if shape[0] == 0:
+            return np.empty(shape, dtype=series['dtype'])
+
+        values = np.memmap(self._get_path(series['file']), dtype=series['dtype'], mode='r', shape=shape)
+
+        return values if lazy else np.array(values)
+
+    def read(self, key, lazy=True):
+        """
+        Read the stats, the series are added to the data if it's a dict
+        :param key: The key of the stats
+        :param lazy: Memory-map the arrays, only the parts used are read
+        :return: The data
+        """
+        manifest = self._load_manifest(key)
+        if manifest is None:
+            raise KeyError('No stats {} in {}'.format(key, self.folder))
+
+        def decode(value):
+            if isinstance(value, dict):
+                if ARRAY_REF in value:
+                    return np.load(self._get_path(value[ARRAY_REF]), mmap_mode='r' if lazy else None)
+                return {k: decode(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [decode(elem) for elem in value]
+            return value
+
+        data = decode(manifest['data'])
+
+        if isinstance(data, dict):
+            for name, series in manifest['series'].items():
+                data[name] = self._read_series(series, lazy)
+
+        return data
+
+    def read_series(self, key, name, start=None, stop=None):
+        """
+        Read a part of a series
+        :param key: The key of the stats
+        :param name: The name of the series
+        :param start: The first row, default is the beginning
+        :param stop: The row after the last one, default is the end
+        :return: The numpy array of the rows
+        """
+        manifest = self._load_manifest(key)
+        if manifest is None or name not in manifest['series']:
+            raise KeyError('No series {} of the stats {} in {}'.format(name, key, self.folder))
+
+        return np.array(self._read_series(manifest['series'][name])[start:stop])
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""Parallel and resumable transfer of files between the local folders and a bucket."""
+import base64
+import binascii
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from csef.utils.helper import md5sum
+from csef.utils.logging import getLogger
+
+
+logger = getLogger(logger_name=__name__)
+
+PART_SUFFIX = '.part'
+
+
+class RemoteFile(object):
+    """A file in the bucket, `md5` is the hex digest and `updated` the timestamp of the last change, None if unknown"""
+
+    def __init__(self, name, md5=None, size=None, updated=None):
+        self.name = name
+        self.md5 = md5
+        self.size = size
+        self.updated = updated
+
+
+def is_same_file(file_path, remote_file, local_is_newer):
+    """
+    Check the local file and the remote file have the same content. Without the md5 of the remote file,
+    they must have the same size and the copy must be more recent than the original.
+    :param file_path: The local file
+    :param remote_file: The `RemoteFile`
+    :param local_is_newer: True if the local file is the copy (download), False if it's the original (upload)
+    :return: True if the file doesn't need to be transferred
+    """
+    if remote_file.md5 is not None:
+        return md5sum(file_path) == remote_file.md5
+
+    if remote_file.size is None or remote_file.updated is None or os.path.getsize(file_path) != remote_file.size:
+        return False
+
+    local_updated = os.path.getmtime(file_path)
+
+    return local_updated >= remote_file.updated if local_is_newer else remote_file.updated >= local_updated
+
+
+class GoogleStorageBucket(object):
+    """The Google Cloud Storage bucket, each thread uses its own client"""
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self._local = threading.local()
+
+    def _get_bucket(self):
+        if not hasattr(self._local, 'bucket'):
+            from google.cloud import storage
+            self._local.bucket = storage.Client().get_bucket(self.bucket_name)
+        return self._local.bucket
+
+    def list(self, prefix):
+        files = []
+        for blob in self._get_bucket().list_blobs(prefix=prefix):
+            # The blob md5 is the base64 of the digest
+            md5 = binascii.hexlify(base64.b64decode(blob.md5_hash)).decode('ascii') if blob.md5_hash else None
+            updated = blob.updated.timestamp() if blob.updated else None
+            files.append(RemoteFile(blob.name, md5, blob.size, updated))
+        return files
+
+    def download(self, name, file_path):
+        self._get_bucket().blob(name).download_to_filename(file_path)
+
+    def upload(self, file_path, name):
+        self._get_bucket().blob(name).upload_from_filename(file_path)
+
+
+class LocalBucket(object):
+    """A local folder standing for a bucket, e.g. for the tests"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def list(self, prefix):
+        files = []
+        for folder, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                file_path = os.path.join(folder, file_name)
+                name = os.path.relpath(file_path, self.root).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    files.append(RemoteFile(name, md5sum(file_path), os.path.getsize(file_path),
+                                            os.path.getmtime(file_path)))
+        return sorted(files, key=lambda remote_file: remote_file.name)
+
+    def download(self, name, file_path):
+        shutil.copyfile(os.path.join(self.root, name), file_path)
+
+    def upload(self, file_path, name):
+        destination = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(destination)):
+            os.makedirs(os.path.dirname(destination))
+
+        shutil.copyfile(file_path, destination + PART_SUFFIX)
+        os.replace(destination + PART_SUFFIX, destination)
+
+
+class TransferError(Exception):
+    """Some files could not be transferred"""
+
+    def __init__(self, failed):
+        self.failed = failed
+        super(TransferError, self).__init__('Failed to transfer {} files: {}'.format(len(failed), sorted(failed)))
+
+
+class TransferEngine(object):
+    """
+    Transfer the files with a bounded thread pool. The files with the same md5 on both sides are skipped,
+    or with the same size and an up to date copy when the remote md5 is unknown. The downloads are written
+    to a `.part` file then renamed, each transfer is retried with a backoff.
+    """
+
+    def __init__(self, bucket, n_workers=8, max_retries=3, backoff=1.):
+        """
+        :param bucket: The bucket, e.g. `GoogleStorageBucket` or `LocalBucket`
+        :param n_workers: The number of parallel transfers
+        :param max_retries: The number of retries of a failed transfer
+        :param backoff: The delay in seconds before the first retry, doubled at each retry
+        """
+        self.bucket = bucket
+        self.n_workers = n_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _retry(self, func, description):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func()
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning('Failed to {} ({}), retry in {}s'.format(description, e, delay))
+                time.sleep(delay)
+
+    def _run(self, tasks):
+        """
+        Run the transfer tasks in the thread pool
+        :param tasks: The dict of name to the function doing the transfer, it returns True if transferred
+        :return: The list of the transferred names
+        """
+        transferred = []
+        failed = {}
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            futures = {pool.submit(task): name for name, task in tasks.items()}
+
+            for future, name in futures.items():
+                try:
+                    if future.result():
+                        transferred.append(name)
+                except Exception as e:
+                    failed[name] = e
+
+        if failed:
+            raise TransferError(failed)
+
+        return transferred
+
+    def _download(self, remote_file, file_path):
+        # The local file is up to date
+        if os.path.isfile(file_path) and is_same_file(file_path, remote_file, local_is_newer=True):
+            return False
+
+        folder = os.path.dirname(file_path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        def download():
+            part_file_path = file_path + PART_SUFFIX
+            try:
+                self.bucket.download(remote_file.name, part_file_path)
+
+                # Keep the time of the remote file to compare them without the md5
+                if remote_file.updated is not None:
+                    os.utime(part_file_path, (remote_file.updated, remote_file.updated))
+                os.replace(part_file_path, file_path)
+            finally:
+                if os.path.isfile(part_file_path):
+                    os.remove(part_file_path)
+
+        self._retry(download, 'download {}'.format(remote_file.name))
+        logger.info('Downloaded file {}'.format(file_path))
+
+        return True
+
+    def _upload(self, file_path, name, remote_file=None):
+        # The remote file is up to date
+        if remote_file is not None and is_same_file(file_path, remote_file, local_is_newer=False):
+            return False
+
+        self._retry(lambda: self.bucket.upload(file_path, name), 'upload {}'.format(name))
+        logger.info('Uploaded file {}'.format(file_path))
+
+        return True
+
+    def download_files(self, remote_files, local_root, get_file_path=None):
+        """
+        Download the remote files
+        :param remote_files: The list of `RemoteFile`
+        :param local_root: The local folder matching the root of the bucket
+        :param get_file_path: The function giving the local path of a remote file, default is its name under the root
+        :return: The list of the downloaded names
+        """
+        if get_file_path is None:
+            def get_file_path(remote_file):
+                return os.path.join(local_root, remote_file.name)
+
+        return self._run({
+            remote_file.name: (lambda remote_file=remote_file: self._download(remote_file, get_file_path(remote_file)))
+            for remote_file in remote_files
+        })
+
+    def sync_folder(self, prefix, local_root, filter_func=None):
+        """
+        Download the files of the bucket with the prefix to the same path under the local root
+        :param prefix: The prefix of the names, e.g. the folder `models/<session_id>`
+        :param local_root: The local folder matching the root of the bucket
+        :param filter_func: The function selecting the `RemoteFile` to download, default is all
+        :return: The list of the downloaded names
+        """
+        remote_files = self.bucket.list(prefix)
+        if filter_func is not None:
+            remote_files = [remote_file for remote_file in remote_files if filter_func(remote_file)]
+
+        return self.download_files(remote_files, local_root)
+
+    def upload_files(self, files, prefix=None):
+        """
+        Upload the local files, the files already in the bucket with the same md5 are skipped
+        :param files: The dict of local path to the name in the bucket
+        :param prefix: The prefix to list the existing files in the bucket, default is their common folder
+        :return: The list of the uploaded names
+        """
+        if prefix is None:
+            prefix = os.path.commonprefix(list(files.values())).rpartition('/')[0]
+
+        remote_files = {remote_file.name: remote_file for remote_file in self.bucket.list(prefix)}
+
+        return self._run({
+            name: (lambda file_path=file_path, name=name: self._upload(file_path, name, remote_files.get(name)))
+            for file_path, name in files.items()
+        })
+
+    def upload_folder(self, folder, local_root):
+        """
+        Upload the files directly in a local folder, the sub folders are not uploaded
+        :param folder: The folder relative to the local root, also its name in the bucket
+        :param local_root: The local folder matching the root of the bucket
+        :return: The list of the uploaded names
+        """
+        root_folder = os.path.join(local_root, folder)
+
+        files = {}
+        for file_name in os.listdir(root_folder):
+            file_path = os.path.join(root_folder, file_name)
+            if os.path.isfile(file_path) and not file_name.endswith(PART_SUFFIX):
+                files[file_path] = '{}/{}'.format(folder, file_name)
+
+        return self.upload_files(files, prefix=folder)